@@ -4,14 +4,15 @@ import smtplib
 from email.mime.text import MIMEText           
 from email.mime.multipart import MIMEMultipart  
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Awaitable
 import os
 from dotenv import load_dotenv
-import pg8000
+import asyncpg
 import json
 import asyncio
-import concurrent.futures
-from urllib.parse import urlparse
+import hmac
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv()
 print(f"🔍 DEBUG - SMTP_PASSWORD from env: {os.getenv('SMTP_PASSWORD')}")
@@ -23,84 +24,177 @@ SMTP_USERNAME = os.getenv("SMTP_USERNAME")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Password hashing configuration
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", 100000))
+LEGACY_HASH_ITERATIONS = 100000  # "salt:hash" strings written before iterations were recorded
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 8))  # waiting jobs beyond running ones
+
+class HashingBusyError(Exception):
+    """Raised when the password hashing pool is saturated"""
+    pass
+
+# Dedicated pool so PBKDF2 never runs on the event loop or starves other thread work
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="pbkdf2")
+_hash_in_flight = 0
+hashing_stats = {
+    "completed": 0,
+    "rejected": 0,
+    "cancelled": 0,
+    "rehashed": 0
+}
+
+async def run_hashing_job(func, *args):
+    """Run a hashing function on the bounded pool, rejecting fast when saturated"""
+    global _hash_in_flight
+    if _hash_in_flight >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT:
+        hashing_stats["rejected"] += 1
+        raise HashingBusyError("Password hashing is saturated, please retry")
+    
+    _hash_in_flight += 1
+    loop = asyncio.get_running_loop()
+    job = _hash_executor.submit(func, *args)
+    waiter = asyncio.wrap_future(job)
+    
+    def _account(finished_job):
+        global _hash_in_flight
+        _hash_in_flight -= 1
+        if finished_job.cancelled() or waiter.cancelled():
+            hashing_stats["cancelled"] += 1
+        elif finished_job.exception() is None:
+            hashing_stats["completed"] += 1
+    
+    def _finished(finished_job):
+        # Runs when the thread is done (or the job is dropped before it starts),
+        # so a request cancelled mid-hash keeps its slot until PBKDF2 finishes
+        try:
+            loop.call_soon_threadsafe(_account, finished_job)
+        except RuntimeError:
+            pass  # loop already closed (shutdown)
+    
+    job.add_done_callback(_finished)
+    return await waiter
+
+def get_hashing_stats() -> Dict[str, Any]:
+    """Snapshot of the hashing pool for operators"""
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue_limit": PASSWORD_HASH_QUEUE_LIMIT,
+        "iterations": PASSWORD_HASH_ITERATIONS,
+        "in_flight": _hash_in_flight,
+        **hashing_stats
+    }
+
 class AdminAuthManager:
-    def get_db_connection(self):
-        """Get PostgreSQL database connection using pg8000 (pure Python)"""
+    def __init__(
+        self,
+        acquire: Optional[Callable[[], Awaitable[Any]]] = None,
+        release: Optional[Callable[[Any], Awaitable[None]]] = None
+    ):
+        """Use the application's pool via acquire/release, or standalone connections if omitted"""
+        self._acquire = acquire
+        self._release = release
+    
+    async def get_db_connection(self):
+        """Get PostgreSQL connection (from the shared pool when configured)"""
         try:
-            # Parse DATABASE_URL
-            url = urlparse(DATABASE_URL)
-            
-            conn = pg8000.connect(
-                host=url.hostname,
-                port=url.port or 5432,
-                user=url.username,
-                password=url.password,
-                database=url.path[1:] if url.path else None,  # Remove leading '/'
-                ssl_context=True  # Add SSL support for Render
-            )
-            return conn
+            if self._acquire:
+                return await self._acquire()
+            return await asyncpg.connect(DATABASE_URL)
         except Exception as e:
             print(f"❌ Database connection error: {e}")
             raise
     
-    def run_in_thread(self, func, *args, **kwargs):
-        """Run synchronous database operations in a thread"""
-        try:
-            # Check if we're in an event loop
-            loop = asyncio.get_running_loop()
-            # If we are, run in a thread
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(func, *args, **kwargs)
-                return future.result()
-        except RuntimeError:
-            # No event loop, run directly
-            return func(*args, **kwargs)
-        
-    def hash_password(self, password: str) -> str:
-        """Hash password with salt"""
+    async def release_db_connection(self, conn):
+        """Return connection to the pool, or close a standalone connection"""
+        if self._release:
+            await self._release(conn)
+        else:
+            await conn.close()
+    
+    def _parse_hash(self, hash_string: str):
+        """Split a stored hash into (iterations, salt, hex digest)"""
+        if hash_string.startswith("pbkdf2_sha256$"):
+            _, iterations, salt, password_hash = hash_string.split('$')
+            return int(iterations), salt, password_hash
+        salt, password_hash = hash_string.split(':')
+        return LEGACY_HASH_ITERATIONS, salt, password_hash
+    
+    def hash_password(self, password: str, iterations: int = None) -> str:
+        """Hash password with salt, recording the iteration count"""
+        iterations = iterations or PASSWORD_HASH_ITERATIONS
         salt = secrets.token_hex(16)
-        password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-        return f"{salt}:{password_hash.hex()}"
+        password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), iterations)
+        return f"pbkdf2_sha256${iterations}${salt}${password_hash.hex()}"
     
     def verify_password(self, password: str, hash_string: str) -> bool:
-        """Verify password against hash"""
+        """Verify password against hash (current or legacy format)"""
         try:
-            salt, password_hash = hash_string.split(':')
-            return hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000).hex() == password_hash
+            iterations, salt, password_hash = self._parse_hash(hash_string)
+            candidate = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), iterations).hex()
+            return hmac.compare_digest(candidate, password_hash)
         except:
             return False
     
-    def _check_first_time_setup(self) -> bool:
-        """Check if admin setup is needed (no admin exists) - sync version"""
+    def needs_rehash(self, hash_string: str) -> bool:
+        """True if the hash uses the legacy format or fewer iterations than configured"""
+        try:
+            iterations, _, _ = self._parse_hash(hash_string)
+            return not hash_string.startswith("pbkdf2_sha256$") or iterations < PASSWORD_HASH_ITERATIONS
+        except ValueError:
+            return False
+    
+    async def hash_password_async(self, password: str) -> str:
+        """Hash password on the bounded hashing pool"""
+        return await run_hashing_job(self.hash_password, password)
+    
+    async def verify_password_async(self, password: str, hash_string: str) -> bool:
+        """Verify password on the bounded hashing pool"""
+        return await run_hashing_job(self.verify_password, password, hash_string)
+    
+    async def _get_admin_profile(self, conn, for_update: bool = False) -> Optional[Dict[str, Any]]:
+        """Load the admin profile JSON from app_settings"""
+        query = "SELECT setting_value FROM app_settings WHERE setting_key = $1"
+        if for_update:
+            query += " FOR UPDATE"
+        admin_row = await conn.fetchrow(query, "admin_profile")
+        return json.loads(admin_row["setting_value"]) if admin_row else None
+    
+    async def _save_admin_profile(self, conn, admin: Dict[str, Any]):
+        """Write the admin profile JSON back to app_settings"""
+        await conn.execute("""
+            UPDATE app_settings 
+            SET setting_value = $1, updated_at = $2 
+            WHERE setting_key = $3
+        """,
+        json.dumps(admin), datetime.utcnow(), "admin_profile"
+        )
+    
+    async def check_first_time_setup(self) -> bool:
+        """Check if admin setup is needed (no admin exists)"""
         try:
-            conn = self.get_db_connection()
+            conn = await self.get_db_connection()
             try:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT * FROM app_settings WHERE setting_key = %s",
-                    ("admin_profile",)
+                admin_exists = await conn.fetchval(
+                    "SELECT 1 FROM app_settings WHERE setting_key = $1",
+                    "admin_profile"
                 )
-                admin_row = cursor.fetchone()
-                return admin_row is None
+                return admin_exists is None
             finally:
-                conn.close()
+                await self.release_db_connection(conn)
         except Exception as e:
             print(f"Error checking first-time setup: {e}")
             return True  # Assume first time if error
     
-    def check_first_time_setup(self) -> bool:
-        """Check if admin setup is needed (async-safe wrapper)"""
-        return self.run_in_thread(self._check_first_time_setup)
-    
-    def _create_admin(self, name: str, email: str, password: str) -> Dict[str, Any]:
-        """Create the first admin account - sync version"""
+    async def create_admin(self, name: str, email: str, password: str) -> Dict[str, Any]:
+        """Create the first admin account"""
         try:
             # Check if admin already exists
-            if not self._check_first_time_setup():
+            if not await self.check_first_time_setup():
                 return {"success": False, "error": "Admin already exists"}
             
             # Hash password
-            password_hash = self.hash_password(password)
+            password_hash = await self.hash_password_async(password)
             
             # Create admin record
             admin_data = {
@@ -114,19 +208,20 @@ class AdminAuthManager:
                 "reset_expires": None
             }
             
-            conn = self.get_db_connection()
+            conn = await self.get_db_connection()
             try:
-                cursor = conn.cursor()
                 # Store admin profile in app_settings table
-                cursor.execute("""
+                result = await conn.execute("""
                     INSERT INTO app_settings (setting_key, setting_value, updated_at, updated_by)
-                    VALUES (%s, %s, %s, %s)
+                    VALUES ($1, $2, $3, $4)
+                    ON CONFLICT (setting_key) DO NOTHING
                 """,
-                ("admin_profile", json.dumps(admin_data), datetime.utcnow(), "system")
+                "admin_profile", json.dumps(admin_data), datetime.utcnow(), "system"
                 )
-                conn.commit()
+                if result == "INSERT 0 0":
+                    return {"success": False, "error": "Admin already exists"}
             finally:
-                conn.close()
+                await self.release_db_connection(conn)
             
             return {
                 "success": True,
@@ -137,117 +232,110 @@ class AdminAuthManager:
                 }
             }
             
+        except HashingBusyError:
+            raise
         except Exception as e:
             print(f"Error creating admin: {e}")
             return {"success": False, "error": str(e)}
     
-    def create_admin(self, name: str, email: str, password: str) -> Dict[str, Any]:
-        """Create admin account (async-safe wrapper)"""
-        return self.run_in_thread(self._create_admin, name, email, password)
-    
-    def _authenticate_admin(self, email: str, password: str) -> Dict[str, Any]:
-        """Authenticate admin login - sync version"""
+    async def authenticate_admin(self, email: str, password: str) -> Dict[str, Any]:
+        """Authenticate admin login"""
         try:
-            conn = self.get_db_connection()
+            # Read the profile and give the connection back before hashing,
+            # so a login burst can't hold every pooled connection
+            conn = await self.get_db_connection()
             try:
-                cursor = conn.cursor()
-                # Get admin record
-                cursor.execute(
-                    "SELECT * FROM app_settings WHERE setting_key = %s",
-                    ("admin_profile",)
-                )
-                admin_row = cursor.fetchone()
-                
-                if not admin_row:
-                    return {"success": False, "error": "Admin not found"}
-                
-                # pg8000 returns tuples, so we need to map to dict
-                admin = json.loads(admin_row[1])  # setting_value is at index 1
-                
-                # Check email and password
-                if admin.get("email") != email:
-                    return {"success": False, "error": "Invalid credentials"}
-                
-                if not self.verify_password(password, admin.get("password_hash", "")):
-                    return {"success": False, "error": "Invalid credentials"}
-                
-                # Update last login
-                admin["last_login"] = datetime.utcnow().isoformat()
-                
-                cursor.execute("""
-                    UPDATE app_settings 
-                    SET setting_value = %s, updated_at = %s 
-                    WHERE setting_key = %s
-                """,
-                (json.dumps(admin), datetime.utcnow(), "admin_profile")
-                )
-                conn.commit()
-                
-                return {
-                    "success": True,
-                    "admin": {
-                        "user_id": "ADMIN",
-                        "name": admin.get("name"),
-                        "email": admin.get("email"),
-                        "is_admin": True
-                    }
-                }
+                admin = await self._get_admin_profile(conn)
+            finally:
+                await self.release_db_connection(conn)
+            
+            if not admin:
+                return {"success": False, "error": "Admin not found"}
+            
+            # Check email and password
+            if admin.get("email") != email:
+                return {"success": False, "error": "Invalid credentials"}
+            
+            stored_hash = admin.get("password_hash", "")
+            if not await self.verify_password_async(password, stored_hash):
+                return {"success": False, "error": "Invalid credentials"}
+            
+            # Transparently upgrade legacy or under-strength hashes
+            upgraded_hash = None
+            if self.needs_rehash(stored_hash):
+                try:
+                    upgraded_hash = await self.hash_password_async(password)
+                except HashingBusyError:
+                    pass  # try again on a later login
+            
+            # Update last login
+            conn = await self.get_db_connection()
+            try:
+                async with conn.transaction():
+                    admin = await self._get_admin_profile(conn, for_update=True)
+                    if not admin:
+                        return {"success": False, "error": "Admin not found"}
+                    admin["last_login"] = datetime.utcnow().isoformat()
+                    if upgraded_hash and admin.get("password_hash") == stored_hash:
+                        admin["password_hash"] = upgraded_hash
+                        hashing_stats["rehashed"] += 1
+                    await self._save_admin_profile(conn, admin)
             finally:
-                conn.close()
+                await self.release_db_connection(conn)
             
+            return {
+                "success": True,
+                "admin": {
+                    "user_id": "ADMIN",
+                    "name": admin.get("name"),
+                    "email": admin.get("email"),
+                    "is_admin": True
+                }
+            }
+            
+        except HashingBusyError:
+            raise
         except Exception as e:
             print(f"Error authenticating admin: {e}")
             return {"success": False, "error": str(e)}
     
-    def authenticate_admin(self, email: str, password: str) -> Dict[str, Any]:
-        """Authenticate admin (async-safe wrapper)"""
-        return self.run_in_thread(self._authenticate_admin, email, password)
-    
-    def _update_admin_profile(self, current_email: str, new_name: str = None, new_email: str = None, new_password: str = None) -> Dict[str, Any]:
-        """Update admin profile - sync version"""
+    async def update_admin_profile(self, current_email: str, new_name: str = None, new_email: str = None, new_password: str = None) -> Dict[str, Any]:
+        """Update admin profile"""
         try:
-            conn = self.get_db_connection()
+            # Hash outside the transaction so the row lock is held briefly
+            new_password_hash = None
+            if new_password and new_password.strip():
+                new_password_hash = await self.hash_password_async(new_password)
+            
+            conn = await self.get_db_connection()
             try:
-                cursor = conn.cursor()
-                # Get current admin
-                cursor.execute(
-                    "SELECT * FROM app_settings WHERE setting_key = %s",
-                    ("admin_profile",)
-                )
-                admin_row = cursor.fetchone()
-                
-                if not admin_row:
-                    return {"success": False, "error": "Admin not found"}
-                
-                admin = json.loads(admin_row[1])  # setting_value is at index 1
-                
-                # Verify current email
-                if admin.get("email") != current_email:
-                    return {"success": False, "error": "Current email doesn't match"}
-                
-                # Update fields
-                if new_name and new_name.strip():
-                    admin["name"] = new_name.strip()
-                
-                if new_email and new_email.strip():
-                    admin["email"] = new_email.strip()
-                
-                if new_password and new_password.strip():
-                    admin["password_hash"] = self.hash_password(new_password)
-                
-                admin["updated_at"] = datetime.utcnow().isoformat()
-                
-                print(f"🔄 Updating admin profile")
-                
-                # Update admin record
-                cursor.execute("""
-                    UPDATE app_settings 
-                    SET setting_value = %s, updated_at = %s 
-                    WHERE setting_key = %s
-                """,
-                (json.dumps(admin), datetime.utcnow(), "admin_profile")
-                )
-                conn.commit()
+                async with conn.transaction():
+                    # Get current admin
+                    admin = await self._get_admin_profile(conn, for_update=True)
+                    
+                    if not admin:
+                        return {"success": False, "error": "Admin not found"}
+                    
+                    # Verify current email
+                    if admin.get("email") != current_email:
+                        return {"success": False, "error": "Current email doesn't match"}
+                    
+                    # Update fields
+                    if new_name and new_name.strip():
+                        admin["name"] = new_name.strip()
+                    
+                    if new_email and new_email.strip():
+                        admin["email"] = new_email.strip()
+                    
+                    if new_password_hash:
+                        admin["password_hash"] = new_password_hash
+                    
+                    admin["updated_at"] = datetime.utcnow().isoformat()
+                    
+                    print(f"🔄 Updating admin profile")
+                    
+                    # Update admin record
+                    await self._save_admin_profile(conn, admin)
                 
                 return {
                     "success": True,
@@ -258,61 +346,47 @@ class AdminAuthManager:
                     }
                 }
             finally:
-                conn.close()
+                await self.release_db_connection(conn)
             
+        except HashingBusyError:
+            raise
         except Exception as e:
             print(f"❌ Error updating admin profile: {e}")
             import traceback
             traceback.print_exc()
             return {"success": False, "error": str(e)}
     
-    def update_admin_profile(self, current_email: str, new_name: str = None, new_email: str = None, new_password: str = None) -> Dict[str, Any]:
-        """Update admin profile (async-safe wrapper)"""
-        return self.run_in_thread(self._update_admin_profile, current_email, new_name, new_email, new_password)
-    
-    def _generate_reset_token(self, email: str) -> Dict[str, Any]:
-        """Generate password reset token - SECURE VERSION - sync"""
+    async def generate_reset_token(self, email: str) -> Dict[str, Any]:
+        """Generate password reset token - SECURE VERSION"""
         try:
-            conn = self.get_db_connection()
+            conn = await self.get_db_connection()
             try:
-                cursor = conn.cursor()
-                # Get admin record first
-                cursor.execute(
-                    "SELECT * FROM app_settings WHERE setting_key = %s",
-                    ("admin_profile",)
-                )
-                admin_row = cursor.fetchone()
-                
-                if not admin_row:
-                    print(f"❌ Admin account not found in database")
-                    return {"success": False, "error": "Admin not found"}
-                
-                admin = json.loads(admin_row[1])  # setting_value is at index 1
-                admin_email = admin.get("email")
-                
-                # SECURITY CHECK: Only allow reset for the actual admin email
-                if admin_email != email:
-                    print(f"🚨 Security blocked: Attempted reset for '{email}' but admin email is '{admin_email}'")
-                    return {"success": False, "error": "Email must match admin email for reset"}
-                
-                print(f"✅ Email verification passed: {email} matches admin email")
-                
-                # Generate reset token
-                reset_token = secrets.token_urlsafe(32)
-                reset_expires = (datetime.utcnow() + timedelta(hours=1)).isoformat()
-                
-                # Save reset token
-                admin["reset_token"] = reset_token
-                admin["reset_expires"] = reset_expires
-                
-                cursor.execute("""
-                    UPDATE app_settings 
-                    SET setting_value = %s, updated_at = %s 
-                    WHERE setting_key = %s
-                """,
-                (json.dumps(admin), datetime.utcnow(), "admin_profile")
-                )
-                conn.commit()
+                async with conn.transaction():
+                    # Get admin record first
+                    admin = await self._get_admin_profile(conn, for_update=True)
+                    
+                    if not admin:
+                        print(f"❌ Admin account not found in database")
+                        return {"success": False, "error": "Admin not found"}
+                    
+                    admin_email = admin.get("email")
+                    
+                    # SECURITY CHECK: Only allow reset for the actual admin email
+                    if admin_email != email:
+                        print(f"🚨 Security blocked: Attempted reset for '{email}' but admin email is '{admin_email}'")
+                        return {"success": False, "error": "Email must match admin email for reset"}
+                    
+                    print(f"✅ Email verification passed: {email} matches admin email")
+                    
+                    # Generate reset token
+                    reset_token = secrets.token_urlsafe(32)
+                    reset_expires = (datetime.utcnow() + timedelta(hours=1)).isoformat()
+                    
+                    # Save reset token
+                    admin["reset_token"] = reset_token
+                    admin["reset_expires"] = reset_expires
+                    
+                    await self._save_admin_profile(conn, admin)
                 
                 return {
                     "success": True,
@@ -320,75 +394,62 @@ class AdminAuthManager:
                     "admin_name": admin.get("name", "Admin")
                 }
             finally:
-                conn.close()
+                await self.release_db_connection(conn)
             
         except Exception as e:
             print(f"Error generating reset token: {e}")
             return {"success": False, "error": "An error occurred. Please try again."}
     
-    def generate_reset_token(self, email: str) -> Dict[str, Any]:
-        """Generate reset token (async-safe wrapper)"""
-        return self.run_in_thread(self._generate_reset_token, email)
-    
-    def _reset_password(self, token: str, new_password: str) -> Dict[str, Any]:
-        """Reset password with token - sync version"""
+    async def reset_password(self, token: str, new_password: str) -> Dict[str, Any]:
+        """Reset password with token"""
         try:
-            conn = self.get_db_connection()
+            # Hash outside the transaction so the row lock is held briefly
+            new_password_hash = await self.hash_password_async(new_password)
+            
+            conn = await self.get_db_connection()
             try:
-                cursor = conn.cursor()
-                # Get admin record
-                cursor.execute(
-                    "SELECT * FROM app_settings WHERE setting_key = %s",
-                    ("admin_profile",)
-                )
-                admin_row = cursor.fetchone()
-                
-                if not admin_row:
-                    return {"success": False, "error": "Admin not found"}
-                
-                admin = json.loads(admin_row[1])  # setting_value is at index 1
-                
-                # Check token
-                if admin.get("reset_token") != token:
-                    return {"success": False, "error": "Invalid reset token"}
-                
-                # Check expiration
-                reset_expires = admin.get("reset_expires")
-                if not reset_expires or datetime.fromisoformat(reset_expires) < datetime.utcnow():
-                    return {"success": False, "error": "Reset token expired"}
-                
-                # Hash new password
-                admin["password_hash"] = self.hash_password(new_password)
-                
-                # Clear reset token
-                admin["reset_token"] = None
-                admin["reset_expires"] = None
-                admin["updated_at"] = datetime.utcnow().isoformat()
-                
-                # Update password and clear reset token
-                cursor.execute("""
-                    UPDATE app_settings 
-                    SET setting_value = %s, updated_at = %s 
-                    WHERE setting_key = %s
-                """,
-                (json.dumps(admin), datetime.utcnow(), "admin_profile")
-                )
-                conn.commit()
+                async with conn.transaction():
+                    # Get admin record
+                    admin = await self._get_admin_profile(conn, for_update=True)
+                    
+                    if not admin:
+                        return {"success": False, "error": "Admin not found"}
+                    
+                    # Check token
+                    if admin.get("reset_token") != token:
+                        return {"success": False, "error": "Invalid reset token"}
+                    
+                    # Check expiration
+                    reset_expires = admin.get("reset_expires")
+                    if not reset_expires or datetime.fromisoformat(reset_expires) < datetime.utcnow():
+                        return {"success": False, "error": "Reset token expired"}
+                    
+                    admin["password_hash"] = new_password_hash
+                    
+                    # Clear reset token
+                    admin["reset_token"] = None
+                    admin["reset_expires"] = None
+                    admin["updated_at"] = datetime.utcnow().isoformat()
+                    
+                    # Update password and clear reset token
+                    await self._save_admin_profile(conn, admin)
                 
                 return {
                     "success": True,
                     "message": "Password reset successfully"
                 }
             finally:
-                conn.close()
+                await self.release_db_connection(conn)
             
+        except HashingBusyError:
+            raise
         except Exception as e:
             print(f"Error resetting password: {e}")
             return {"success": False, "error": str(e)}
     
-    def reset_password(self, token: str, new_password: str) -> Dict[str, Any]:
-        """Reset password (async-safe wrapper)"""
-        return self.run_in_thread(self._reset_password, token, new_password)
+    async def send_reset_email_async(self, email: str, reset_token: str, admin_name: str) -> bool:
+        """Send password reset email without blocking the event loop"""
+        return await asyncio.to_thread(self.send_reset_email, email, reset_token, admin_name)
     
     def send_reset_email(self, email: str, reset_token: str, admin_name: str) -> bool:
         """Send password reset email with environment-aware reset link"""
@@ -465,4 +526,26 @@ Reset expires: {(datetime.utcnow() + timedelta(hours=1)).strftime('%Y-%m-%d %I:%
             
         except Exception as e:
             print(f"❌ Error sending email: {e}")
-            return False
\ No newline at end of file
+            return False
+
+if __name__ == "__main__":
+    # Concurrent login throughput benchmark: python admin_auth.py [concurrent_logins]
+    import sys
+    
+    async def _benchmark(total: int):
+        manager = AdminAuthManager()
+        stored_hash = manager.hash_password("Benchmark1")
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(manager.verify_password_async("Benchmark1", stored_hash) for _ in range(total)),
+            return_exceptions=True
+        )
+        elapsed = time.perf_counter() - started
+        verified = sum(1 for result in results if result is True)
+        rejected = sum(1 for result in results if isinstance(result, HashingBusyError))
+        print(f"🔐 {total} concurrent logins, {PASSWORD_HASH_WORKERS} workers, "
+              f"{PASSWORD_HASH_ITERATIONS} iterations")
+        print(f"✅ verified {verified}, ⛔ rejected {rejected} in {elapsed:.2f}s "
+              f"({verified / elapsed:.1f} verifications/s)")
+    
+    asyncio.run(_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
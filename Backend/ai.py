@@ -0,0 +1,568 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+import asyncpg
+
+from cache import TTLCache, MISSING
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Gemini calls are blocking and slow, so they run on their own small pool
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", 30))
+AI_MAX_WORKERS = int(os.getenv("AI_MAX_WORKERS", 4))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", 3600))  # seconds
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", 64))  # distinct inventories
+# Use a canned local model instead of Gemini (development and load tests)
+AI_STUB_MODEL = os.getenv("AI_STUB_MODEL", "false").lower() == "true"
+AI_STUB_DELAY = float(os.getenv("AI_STUB_DELAY", 2.0))  # seconds per stub response
+# Size cap for the materials list in the prompt (most common materials first)
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", 1500))
+AI_MAX_MATERIAL_GROUPS = int(os.getenv("AI_MAX_MATERIAL_GROUPS", 500))  # rows fetched from the database
+# Outstanding model calls across all requests, and how long a new one waits for a slot
+AI_MAX_CONCURRENT_CALLS = int(os.getenv("AI_MAX_CONCURRENT_CALLS", AI_MAX_WORKERS))
+AI_QUEUE_TIMEOUT = float(os.getenv("AI_QUEUE_TIMEOUT", 10))  # seconds
+# Per-user sliding window: at most AI_USER_QUOTA requests per AI_USER_QUOTA_WINDOW seconds
+AI_USER_QUOTA = int(os.getenv("AI_USER_QUOTA", 10))
+AI_USER_QUOTA_WINDOW = float(os.getenv("AI_USER_QUOTA_WINDOW", 600))
+
+GENERATION_CONFIG = {
+    'max_output_tokens': 2000,
+    'temperature': 0.8,
+}
+
+ai_executor = ThreadPoolExecutor(max_workers=AI_MAX_WORKERS, thread_name_prefix="gemini")
+
+# Generated recommendations keyed by materials fingerprint
+recommendation_cache = TTLCache("ai_recommendations", max_size=AI_CACHE_SIZE, ttl=AI_CACHE_TTL)
+
+# Recommendation requests handled by this worker
+ai_stats: Dict[str, int] = {
+    "served": 0,
+    "cache_hits": 0,
+    "coalesced": 0,
+    "model_calls": 0,
+    "throttled_user": 0,
+    "throttled_busy": 0,
+    "abandoned": 0,
+    "errors": 0
+}
+
+class AITimeoutError(Exception):
+    """The model did not answer within AI_TIMEOUT_SECONDS"""
+
+class AIThrottled(Exception):
+    """Request refused by the per-user quota or the model concurrency cap"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class AIStreamAbandoned(Exception):
+    """Every request waiting on a generation went away, so it was cancelled"""
+
+class StubModel:
+    """Stand-in for genai.GenerativeModel with a fixed delay and canned text"""
+
+    def __init__(self, delay: float = AI_STUB_DELAY):
+        self.delay = delay
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.calls += 1
+        text = f"1. **Stub** suggestion for a {len(prompt)}-character prompt\n2. Reuse *everything* twice\n"
+        if stream:
+            return self._stream(text)
+        time.sleep(self.delay)
+        return SimpleNamespace(text=text)
+
+    def _stream(self, text: str):
+        """Yield the canned text a few words at a time, spreading the delay out"""
+        words = text.split(" ")
+        pieces = [" ".join(words[i:i + 3]) + " " for i in range(0, len(words), 3)]
+        for piece in pieces:
+            time.sleep(self.delay / len(pieces))
+            yield SimpleNamespace(text=piece)
+
+# One row per (name, category) with its count; the window totals are computed
+# before LIMIT so the prompt can still mention what was left out
+MATERIAL_GROUPS_QUERY = """
+    SELECT name, category, COUNT(*) AS count,
+           SUM(COUNT(*)) OVER () AS total_items,
+           COUNT(*) OVER () AS total_groups
+    FROM items
+    WHERE approved = true
+    GROUP BY name, category
+    ORDER BY count DESC, name, category
+    LIMIT $1
+"""
+
+async def fetch_material_groups(conn, limit: int = AI_MAX_MATERIAL_GROUPS) -> Tuple[List[Any], int, int]:
+    """Approved materials grouped by (name, category); returns (rows, total_items, total_groups)"""
+    rows = await conn.fetch(MATERIAL_GROUPS_QUERY, limit)
+    if not rows:
+        return [], 0, 0
+    return rows, int(rows[0]["total_items"]), rows[0]["total_groups"]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)"""
+    return math.ceil(len(text) / 4)
+
+def build_materials_context(groups: List[Any], total_items: int, total_groups: int,
+                            token_budget: int = AI_PROMPT_TOKEN_BUDGET) -> Tuple[str, List[Tuple[str, str, int]]]:
+    """Materials list for the prompt, cut off at token_budget.
+
+    groups must be sorted most common first. Returns the context text and
+    the (name, category, count) groups that made it in.
+    """
+    lines: List[str] = []
+    included: List[Tuple[str, str, int]] = []
+    # Keep room for the "...and N more" line
+    remaining_budget = token_budget - estimate_tokens(f"- ...and {total_items} more items of {total_groups} other kinds")
+    for group in groups:
+        line = f"- {group['name']} ({group['category']}) x{group['count']}"
+        cost = estimate_tokens(line) + 1
+        if cost > remaining_budget:
+            break
+        remaining_budget -= cost
+        lines.append(line)
+        included.append((group["name"], group["category"], group["count"]))
+
+    left_out_groups = total_groups - len(included)
+    if left_out_groups > 0:
+        left_out_items = total_items - sum(count for _, _, count in included)
+        lines.append(f"- ...and {left_out_items} more items of {left_out_groups} other kinds")
+    return "\n".join(lines), included
+
+def materials_fingerprint(materials: Iterable[Tuple[Any, ...]], is_christmas: bool) -> str:
+    """Stable hash of the approved materials and season flag (the cache key)"""
+    payload = json.dumps([sorted(list(map(str, material)) for material in materials), is_christmas])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def clean_ai_text(text: str) -> str:
+    """Strip the markdown asterisks the model adds despite the prompt"""
+    return text.replace('*', '')
+
+def suggestions_count_for(items_count: int) -> str:
+    """How many suggestions to ask for, based on inventory size"""
+    if items_count <= 5:
+        return "3-5"
+    elif items_count <= 15:
+        return "7-10"
+    elif items_count <= 30:
+        return "10-15"
+    return "15-20"
+
+def build_recommendation_prompt(materials_context: str, items_count: int, is_christmas: bool) -> str:
+    """Prompt for reuse ideas (not personalized, so responses can be shared between users)"""
+    suggestions_count = suggestions_count_for(items_count)
+    return f"""Welcome to GreenHouse AI! Here are the {items_count} recyclable items from your PUP community, grouped by material with counts (most common first):
+
+{materials_context}
+
+Based on these {items_count} available materials, give {suggestions_count} creative Filipino ways to reuse them:
+
+{"🎄 Include Christmas parol ideas since it's Christmas season!" if is_christmas else ""}
+
+Make the suggestions practical and versatile for:
+- Home use (any living situation)
+- School projects and activities
+- Community events and celebrations
+- Creative arts and crafts
+- Practical everyday solutions
+
+Group similar materials together and suggest combination projects when possible.
+Be specific about which items from the list to use for each suggestion.
+
+Format your response cleanly with numbered suggestions (1, 2, 3...) without asterisks or special formatting.
+Use simple, clean formatting - no asterisks, no bold markers, just clear numbered lists."""
+
+def prepare_recommendations(groups: List[Any], total_items: int, total_groups: int,
+                            is_christmas: bool) -> Tuple[str, str]:
+    """Cache key and prompt for this inventory"""
+    materials_context, included = build_materials_context(groups, total_items, total_groups)
+    key = materials_fingerprint(included + [("total", total_items, total_groups)], is_christmas)
+    return key, build_recommendation_prompt(materials_context, total_items, is_christmas)
+
+# Per-user request timestamps for the sliding-window quota
+_user_requests: Dict[str, Deque[float]] = {}
+
+def check_user_quota(user_id: str):
+    """Count a request against the user's window; raises AIThrottled (429) when it is full"""
+    now = time.monotonic()
+    cutoff = now - AI_USER_QUOTA_WINDOW
+    if len(_user_requests) > 10000:
+        # Forget users whose whole window has expired
+        for stale in [uid for uid, stamps in _user_requests.items() if stamps[-1] <= cutoff]:
+            del _user_requests[stale]
+
+    stamps = _user_requests.setdefault(user_id, deque())
+    while stamps and stamps[0] <= cutoff:
+        stamps.popleft()
+    if len(stamps) >= AI_USER_QUOTA:
+        ai_stats["throttled_user"] += 1
+        raise AIThrottled(429, "Too many AI requests, please try again later", stamps[0] - cutoff)
+    stamps.append(now)
+
+_model_slots = asyncio.Semaphore(AI_MAX_CONCURRENT_CALLS)
+
+@asynccontextmanager
+async def _model_slot():
+    """Hold one of the AI_MAX_CONCURRENT_CALLS slots; raises AIThrottled (503) if none frees up in time"""
+    try:
+        await asyncio.wait_for(_model_slots.acquire(), timeout=AI_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        ai_stats["throttled_busy"] += 1
+        raise AIThrottled(503, "AI service is busy, please try again shortly", AI_QUEUE_TIMEOUT)
+    try:
+        yield
+    finally:
+        _model_slots.release()
+
+_STREAM_DONE = object()
+
+async def stream_text(model, prompt: str, idle_timeout: float = AI_TIMEOUT_SECONDS) -> AsyncIterator[str]:
+    """Yield cleaned text chunks as the model produces them.
+
+    The blocking Gemini iterator runs on the AI pool and hands chunks to the
+    loop through a queue. Closing this generator (client gone) tells the
+    worker to stop after the chunk it is waiting on. Raises AITimeoutError if
+    no chunk arrives within idle_timeout.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass  # loop already closed (shutdown)
+
+    def produce():
+        try:
+            for chunk in model.generate_content(prompt, generation_config=GENERATION_CONFIG, stream=True):
+                if cancelled.is_set():
+                    break
+                try:
+                    put(chunk.text)
+                except ValueError:
+                    continue  # chunk without text parts (e.g. a safety stop)
+        except Exception as e:
+            put(e)
+        finally:
+            put(_STREAM_DONE)
+
+    loop.run_in_executor(ai_executor, produce)
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=idle_timeout)
+            except asyncio.TimeoutError:
+                raise AITimeoutError(f"AI service went quiet for {idle_timeout:.0f} seconds")
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            # Asterisk removal is per character, so cleaning chunk by chunk
+            # matches cleaning the whole text
+            text = clean_ai_text(item)
+            if text:
+                yield text
+    finally:
+        cancelled.set()
+
+# Generations in progress, by materials fingerprint
+_inflight: Dict[str, "Flight"] = {}
+
+class Flight:
+    """One model generation shared by every request with the same fingerprint.
+
+    The generation runs as its own task and keeps its chunks, so a request
+    that joins late replays what it missed and then follows live. It is
+    cancelled only when the last request following it goes away.
+    """
+
+    def __init__(self, model, key: str, prompt: str):
+        self.key = key
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.followers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._run(model, prompt))
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _run(self, model, prompt: str):
+        generation = recommendation_cache.generation
+        try:
+            async with _model_slot():
+                async for text in stream_text(model, prompt):
+                    self.chunks.append(text)
+                    self._notify()
+            recommendation_cache.set(self.key, "".join(self.chunks), generation=generation)
+        except asyncio.CancelledError:
+            ai_stats["abandoned"] += 1
+            self.error = AIStreamAbandoned("Generation cancelled")
+            raise
+        except Exception as e:
+            if not isinstance(e, AIThrottled):
+                ai_stats["errors"] += 1
+            self.error = e
+        finally:
+            self.done = True
+            if _inflight.get(self.key) is self:
+                del _inflight[self.key]
+            self._notify()
+
+    async def follow(self) -> AsyncIterator[str]:
+        """Yield every chunk from the start, then new ones until the generation ends"""
+        self.followers += 1
+        sent = 0
+        try:
+            while True:
+                while sent < len(self.chunks):
+                    yield self.chunks[sent]
+                    sent += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.followers -= 1
+            if self.followers == 0 and not self.done:
+                # Nobody is listening any more; let the next request start fresh
+                if _inflight.get(self.key) is self:
+                    del _inflight[self.key]
+                self.task.cancel()
+
+async def _replay(text: str) -> AsyncIterator[str]:
+    yield text
+
+def open_recommendations(model, groups: List[Any], total_items: int, total_groups: int,
+                         is_christmas: bool) -> Tuple[AsyncIterator[str], str]:
+    """Recommendation text chunks for this inventory.
+
+    Returns (chunks, source), where source is "cache", "coalesced" (joined a
+    generation already in flight) or "model" (started a new one).
+    """
+    key, prompt = prepare_recommendations(groups, total_items, total_groups, is_christmas)
+    cached = recommendation_cache.get(key)
+    if cached is not MISSING:
+        ai_stats["cache_hits"] += 1
+        return _replay(cached), "cache"
+
+    flight = _inflight.get(key)
+    if flight is not None:
+        ai_stats["coalesced"] += 1
+        return flight.follow(), "coalesced"
+
+    ai_stats["model_calls"] += 1
+    flight = Flight(model, key, prompt)
+    _inflight[key] = flight
+    return flight.follow(), "model"
+
+async def get_recommendations(model, groups: List[Any], total_items: int, total_groups: int,
+                              is_christmas: bool, timeout: float = AI_TIMEOUT_SECONDS) -> Tuple[str, str]:
+    """Whole recommendation text; returns (text, source) as in open_recommendations.
+
+    Raises AITimeoutError if it takes longer than timeout. The shared
+    generation keeps going if other requests are still following it.
+    """
+    chunks, source = open_recommendations(model, groups, total_items, total_groups, is_christmas)
+
+    async def collect():
+        return "".join([text async for text in chunks])
+
+    try:
+        text = await asyncio.wait_for(collect(), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise AITimeoutError(f"AI service did not respond within {timeout:.0f} seconds")
+    ai_stats["served"] += 1
+    return text, source
+
+def get_ai_stats() -> Dict[str, Any]:
+    """Recommendation counters for this worker"""
+    return {
+        **ai_stats,
+        "in_flight": len(_inflight),
+        "max_concurrent_calls": AI_MAX_CONCURRENT_CALLS,
+        "user_quota": AI_USER_QUOTA,
+        "user_quota_window_seconds": AI_USER_QUOTA_WINDOW,
+        "tracked_users": len(_user_requests)
+    }
+
+def _sse(payload: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def sse_recommendations(request, greeting: str, chunks: AsyncIterator[str], done: Dict[str, Any]):
+    """Server-Sent Events body: chunk events, then a done (or error) event"""
+    yield _sse({"type": "chunk", "text": greeting})
+    try:
+        async for text in chunks:
+            if await request.is_disconnected():
+                print("🔌 Client left, cancelling AI stream")
+                return
+            yield _sse({"type": "chunk", "text": text})
+    except AITimeoutError as e:
+        print(f"⏰ {e}")
+        yield _sse({"type": "error", "error": "AI service timed out"})
+        return
+    except AIThrottled as e:
+        yield _sse({"type": "error", "error": e.detail, "retry_after": e.retry_after})
+        return
+    except Exception as e:
+        print(f"❌ AI stream error: {e}")
+        yield _sse({"type": "error", "error": str(e)})
+        return
+    finally:
+        await chunks.aclose()
+    ai_stats["served"] += 1
+    yield _sse({"type": "done", **done})
+
+def load_model(api_key: Optional[str]):
+    """Gemini model, the stub when AI_STUB_MODEL is set, or None without a key"""
+    if AI_STUB_MODEL:
+        print("🧪 Using stub AI model")
+        return StubModel()
+    if not api_key:
+        return None
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('gemini-1.5-flash')
+
+async def _demo():
+    """Check caching, coalescing, quotas and that generations don't block the loop (stub model)"""
+    model = StubModel(delay=0.5)
+    groups = [
+        {"name": "Plastic bottle", "category": "Plastic Bottles", "count": 12},
+        {"name": "Box", "category": "Cardboard", "count": 3}
+    ]
+
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    beat = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    _, source = await get_recommendations(model, groups, 15, 2, False)
+    first = time.perf_counter() - started
+    started = time.perf_counter()
+    _, source_again = await get_recommendations(model, groups, 15, 2, False)
+    second = time.perf_counter() - started
+    beat.cancel()
+
+    print(f"🤖 first call {first * 1000:.0f} ms ({source}), repeat {second * 1000:.2f} ms ({source_again})")
+    print(f"⏱️ event loop ticked {ticks} times during generation (0 would mean it was blocked)")
+
+    recommendation_cache.clear()
+    started = time.perf_counter()
+    first_chunk = None
+    chunks, _ = open_recommendations(model, groups, 15, 2, True)
+    async for _ in chunks:
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - started
+    total = time.perf_counter() - started
+    print(f"🌊 streamed: first chunk after {first_chunk * 1000:.0f} ms, complete after {total * 1000:.0f} ms")
+
+    chunks, _ = open_recommendations(model, groups, 15, 2, False)
+    async for _ in chunks:
+        break
+    await chunks.aclose()
+    await asyncio.sleep(model.delay)
+    print(f"🔌 abandoned stream was cancelled and not cached: cache size {recommendation_cache.stats()['size']}")
+
+    recommendation_cache.clear()
+    calls_before = model.calls
+
+    async def stream_all(chunks):
+        return "".join([text async for text in chunks])
+
+    burst = [get_recommendations(model, groups, 15, 2, False) for _ in range(40)]
+    burst += [stream_all(open_recommendations(model, groups, 15, 2, False)[0]) for _ in range(10)]
+    results = await asyncio.gather(*burst)
+    texts = {result[0] if isinstance(result, tuple) else result for result in results}
+    print(f"👥 50 concurrent requests -> {model.calls - calls_before} model call(s), {len(texts)} distinct text(s)")
+
+    throttled = 0
+    for _ in range(AI_USER_QUOTA + 5):
+        try:
+            check_user_quota("demo-user")
+        except AIThrottled as e:
+            throttled += 1
+            retry_after = e.retry_after
+    print(f"🚦 {AI_USER_QUOTA + 5} requests from one user -> {throttled} throttled (retry after {retry_after}s)")
+    print(f"📊 {get_ai_stats()}")
+
+async def benchmark(sizes: List[int], runs: int = 10):
+    """Compare the grouped, budgeted prompt with one line per item (development databases only).
+
+    Seeds benchmark items up to each size in turn, so run it against an
+    otherwise empty database to get exact item counts. Seeded names are all
+    distinct, which is the worst case for grouping.
+    """
+    import migrations
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        for size in sizes:
+            existing = await conn.fetchval("SELECT COUNT(*) FROM items WHERE item_id LIKE 'bench-%'")
+            if existing < size:
+                await migrations.seed_benchmark_data(conn, size)
+
+            async def timed(query: str, *params):
+                timings = []
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    rows = await conn.fetch(query, *params)
+                    timings.append((time.perf_counter() - started) * 1000)
+                return rows, statistics.median(timings)
+
+            all_rows, all_ms = await timed("SELECT * FROM items WHERE approved = true")
+            old_context = "\n".join(f"- {row['name']} ({row['category']})" for row in all_rows)
+
+            groups, grouped_ms = await timed(MATERIAL_GROUPS_QUERY, AI_MAX_MATERIAL_GROUPS)
+            total_items = int(groups[0]["total_items"]) if groups else 0
+            total_groups = groups[0]["total_groups"] if groups else 0
+            context, included = build_materials_context(groups, total_items, total_groups)
+
+            print(f"\n📦 {len(all_rows)} approved items ({total_groups} distinct materials)")
+            print(f"   SELECT * per item:  {all_ms:8.2f} ms, prompt ~{estimate_tokens(old_context):7d} tokens")
+            print(f"   GROUP BY + budget:  {grouped_ms:8.2f} ms, prompt ~{estimate_tokens(context):7d} tokens "
+                  f"({len(included)} materials listed)")
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    # Usage:
+    #   python ai.py --demo                     stub-model cache and event-loop check
+    #   python ai.py --benchmark [sizes...]     prompt query/size at 100, 10k and 100k items
+    args = sys.argv[1:]
+    if args[:1] == ["--demo"]:
+        asyncio.run(_demo())
+    elif args[:1] == ["--benchmark"]:
+        asyncio.run(benchmark([int(size) for size in args[1:]] or [100, 10000, 100000]))
+    else:
+        print("Usage: python ai.py [--demo | --benchmark [sizes...]]")
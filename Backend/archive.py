@@ -0,0 +1,102 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from jobs import LockedJob, run_cli
+
+# Completed, rejected and expired items older than this leave the hot table.
+# Claimants still see archived items in /my-claims and can read their chat
+# history; /items/{item_id}, claiming and sending chat messages only look at
+# live items, so those return 404 once an item is archived.
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", 30))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", 3600))  # seconds
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 1000))
+# Arbitrary key so only one worker archives at a time
+ARCHIVE_LOCK_KEY = 4815162345
+
+# Columns shared by items and items_archive
+ARCHIVE_COLUMNS = [
+    "item_id", "name", "quantity", "category", "location", "owner_id", "owner_name", "owner_email",
+    "expiry_date", "duration_days", "comments", "contact_info", "image_urls", "status", "approved",
+    "claimed_by", "claimant_email", "claim_expires_at", "rejection_reason", "rejected_at",
+    "approved_at", "completed_at", "created_at", "thumbnail_urls", "medium_urls"
+]
+_COLUMN_LIST = ", ".join(ARCHIVE_COLUMNS)
+
+archive_job = LockedJob("archive", ARCHIVE_LOCK_KEY, "archived")
+archive_stats = archive_job.stats
+
+def items_source(include_archived: bool, alias: str = "items") -> str:
+    """FROM target for item queries; with archives it is a UNION ALL aliased as alias"""
+    if not include_archived:
+        return "items" if alias == "items" else f"items AS {alias}"
+    return f"(SELECT {_COLUMN_LIST} FROM items UNION ALL SELECT {_COLUMN_LIST} FROM items_archive) AS {alias}"
+
+async def archive_item_batch(conn, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> List[Any]:
+    """Move one batch of finished items to items_archive in a single statement"""
+    return await conn.fetch(f"""
+        WITH doomed AS (
+            SELECT item_id
+            FROM items
+            WHERE (status = 'completed' AND COALESCE(completed_at, created_at) < $1)
+               OR (rejection_reason IS NOT NULL AND COALESCE(rejected_at, created_at) < $1)
+               OR (status = 'available' AND expiry_date < $1)
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        ), moved AS (
+            DELETE FROM items i
+            USING doomed d
+            WHERE i.item_id = d.item_id
+            RETURNING i.*
+        )
+        INSERT INTO items_archive ({_COLUMN_LIST}, archive_reason, archived_at)
+        SELECT {_COLUMN_LIST},
+               CASE WHEN status = 'completed' THEN 'completed'
+                    WHEN rejection_reason IS NOT NULL THEN 'rejected'
+                    ELSE 'expired' END,
+               NOW()
+        FROM moved
+        ON CONFLICT (item_id) DO UPDATE
+        SET ({_COLUMN_LIST}, archive_reason, archived_at) =
+            ({", ".join(f"EXCLUDED.{column}" for column in ARCHIVE_COLUMNS)}, EXCLUDED.archive_reason, EXCLUDED.archived_at)
+        RETURNING item_id, category, status, approved, created_at, archive_reason
+    """, cutoff, batch_size)
+
+async def archive_finished_items(conn, older_than_days: float = ARCHIVE_AFTER_DAYS,
+                                 batch_size: int = ARCHIVE_BATCH_SIZE) -> Optional[List[Any]]:
+    """Archive every eligible item in batches.
+
+    Returns the archived rows, or None if another worker holds the archive lock.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archived = await archive_job.run_batches(conn, lambda: archive_item_batch(conn, cutoff, batch_size), batch_size)
+    if archived is None:
+        return None
+
+    if archived:
+        print(f"📦 Archived {len(archived)} finished item(s)")
+    return archived
+
+def get_archive_stats() -> Dict[str, Any]:
+    """Archival job counters for this process"""
+    return {
+        **archive_stats,
+        "interval_seconds": ARCHIVE_INTERVAL,
+        "older_than_days": ARCHIVE_AFTER_DAYS,
+        "batch_size": ARCHIVE_BATCH_SIZE
+    }
+
+async def main(conn, args: List[str]):
+    if "--run" in args:
+        archived = await archive_finished_items(conn)
+        if archived is None:
+            print("⏳ Another worker is archiving")
+    elif "--status" in args:
+        hot = await conn.fetchval("SELECT COUNT(*) FROM items")
+        cold = await conn.fetchval("SELECT COUNT(*) FROM items_archive")
+        print(f"🔥 items: {hot}  📦 items_archive: {cold}")
+    else:
+        print("Usage: python archive.py [--run | --status]")
+
+if __name__ == "__main__":
+    run_cli(main)
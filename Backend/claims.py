@@ -0,0 +1,230 @@
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import asyncpg
+
+from jobs import DATABASE_URL, LockedJob, run_cli
+from notifications import create_notifications
+
+# How long a claimant holds an item before it is released
+CLAIM_HOLD_DAYS = float(os.getenv("CLAIM_HOLD_DAYS", 3))
+
+# Expired-claim sweeper
+CLAIM_SWEEP_INTERVAL = float(os.getenv("CLAIM_SWEEP_INTERVAL", 300))  # seconds
+CLAIM_SWEEP_BATCH_SIZE = int(os.getenv("CLAIM_SWEEP_BATCH_SIZE", 500))
+# Arbitrary key so only one worker sweeps at a time
+CLAIM_SWEEP_LOCK_KEY = 4815162344
+
+sweeper_job = LockedJob("claim sweeper", CLAIM_SWEEP_LOCK_KEY, "released")
+sweeper_stats = sweeper_job.stats
+
+class ClaimRejected(Exception):
+    """A claim that lost or was not allowed; status_code/detail map onto an HTTP error"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+async def claim_item(conn, item_id: str, user_id: str) -> Any:
+    """Claim an item with one conditional UPDATE.
+
+    Every precondition is in the WHERE clause, so concurrent claimers serialize
+    on the row lock and only the first one matches. Returns the claimed item
+    row (plus claimant_name); raises ClaimRejected otherwise.
+    """
+    row = await conn.fetchrow("""
+        UPDATE items i
+        SET status = 'claimed', claimed_by = u.user_id, claimant_email = u.email, claim_expires_at = $3
+        FROM users u
+        WHERE i.item_id = $1
+          AND u.user_id = $2
+          AND i.approved = true
+          AND i.status = 'available'
+          AND i.owner_id IS DISTINCT FROM $2
+        RETURNING i.*, u.name AS claimant_name
+    """, item_id, user_id, datetime.utcnow() + timedelta(days=CLAIM_HOLD_DAYS))
+
+    if row is None:
+        await _explain_rejected_claim(conn, item_id, user_id)
+    return row
+
+async def _explain_rejected_claim(conn, item_id: str, user_id: str):
+    """Work out why a claim matched nothing (only runs on the losing path)"""
+    state = await conn.fetchrow("""
+        SELECT i.approved, i.status, i.owner_id,
+               EXISTS (SELECT 1 FROM users WHERE user_id = $2) AS user_exists
+        FROM items i
+        WHERE i.item_id = $1
+    """, item_id, user_id)
+
+    if state is None:
+        raise ClaimRejected(404, "Item not found")
+    if not state["approved"]:
+        raise ClaimRejected(400, "Item not approved")
+    if state["owner_id"] == user_id:
+        raise ClaimRejected(400, "Cannot claim your own item")
+    if not state["user_exists"]:
+        raise ClaimRejected(404, "User not found")
+    if state["status"] == "claimed":
+        raise ClaimRejected(409, "Item was already claimed by someone else")
+    raise ClaimRejected(400, "Item not available")
+
+async def release_expired_claim_batch(conn, batch_size: int = CLAIM_SWEEP_BATCH_SIZE) -> List[Any]:
+    """Release one batch of expired claims and notify owners and claimants.
+
+    One UPDATE ... RETURNING does the release; SKIP LOCKED leaves rows that a
+    request is touching right now for the next batch.
+    """
+    async with conn.transaction():
+        released = await conn.fetch("""
+            WITH expired AS (
+                SELECT item_id, claimed_by
+                FROM items
+                WHERE status = 'claimed' AND claim_expires_at < $1
+                ORDER BY claim_expires_at
+                LIMIT $2
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE items i
+            SET status = 'available', claimed_by = NULL, claimant_email = NULL, claim_expires_at = NULL
+            FROM expired e
+            WHERE i.item_id = e.item_id
+            RETURNING i.*, e.claimed_by AS previous_claimant
+        """, datetime.utcnow(), batch_size)
+
+        notifications = []
+        for row in released:
+            notifications.append({
+                "user_id": row["owner_id"],
+                "title": "⏰ Claim Expired",
+                "message": f'The claim on your "{row["name"]}" expired, so it is available again.',
+                "notification_type": "claim_expired",
+                "related_item_id": row["item_id"],
+                "action_url": "/dashboard"
+            })
+            if row["previous_claimant"]:
+                notifications.append({
+                    "user_id": row["previous_claimant"],
+                    "title": "⏰ Your Claim Expired",
+                    "message": f'Your claim on "{row["name"]}" expired and the item was released.',
+                    "notification_type": "claim_expired",
+                    "related_item_id": row["item_id"],
+                    "action_url": "/dashboard"
+                })
+        await create_notifications(conn, notifications)
+    return released
+
+async def release_expired_claims(conn, batch_size: int = CLAIM_SWEEP_BATCH_SIZE) -> Optional[List[Any]]:
+    """Release every expired claim in batches.
+
+    Returns the released item rows, or None if another worker holds the sweep lock.
+    """
+    released = await sweeper_job.run_batches(conn, lambda: release_expired_claim_batch(conn, batch_size), batch_size)
+    if released is None:
+        return None
+
+    if released:
+        print(f"⏰ Released {len(released)} expired claim(s)")
+    return released
+
+def get_sweeper_stats() -> Dict[str, Any]:
+    """Expired-claim sweeper counters for this process"""
+    return {**sweeper_stats, "interval_seconds": CLAIM_SWEEP_INTERVAL, "batch_size": CLAIM_SWEEP_BATCH_SIZE}
+
+async def sweep_forever():
+    """Standalone sweeper worker (when the API runs with CLAIM_SWEEPER_ENABLED=false).
+
+    Each sweep acquires from a one-connection pool, which replaces a closed
+    connection, so the worker recovers once Postgres is reachable again.
+    """
+    pool = await asyncpg.create_pool(DATABASE_URL, min_size=0, max_size=1)
+    try:
+        while True:
+            try:
+                async with pool.acquire() as conn:
+                    await release_expired_claims(conn)
+            except Exception as e:
+                print(f"❌ Claim sweep failed: {e}")
+            await asyncio.sleep(CLAIM_SWEEP_INTERVAL)
+    finally:
+        await pool.close()
+
+async def claim_race(claimants: int):
+    """Fire many simultaneous claims at one item and check exactly one wins.
+
+    Creates (and removes) its own throwaway users and item - development databases only.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    item_id = f"race-item-{run_id}"
+    user_ids = [f"race-user-{run_id}-{i}" for i in range(claimants)]
+
+    pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=min(claimants, 50))
+    try:
+        async with pool.acquire() as conn:
+            await conn.executemany(
+                "INSERT INTO users (user_id, email, name) VALUES ($1, $2, $3)",
+                [(uid, f"{uid}@example.com", uid) for uid in user_ids + [f"race-owner-{run_id}"]]
+            )
+            await conn.execute("""
+                INSERT INTO items (item_id, name, quantity, category, location, owner_id, status, approved)
+                VALUES ($1, 'Race item', 1, 'Cardboard', 'Main Building', $2, 'available', true)
+            """, item_id, f"race-owner-{run_id}")
+
+        gate = asyncio.Event()
+
+        async def attempt(user_id: str) -> Optional[int]:
+            async with pool.acquire() as conn:
+                await gate.wait()
+                try:
+                    await claim_item(conn, item_id, user_id)
+                    return 200
+                except ClaimRejected as rejected:
+                    return rejected.status_code
+
+        tasks = [asyncio.create_task(attempt(uid)) for uid in user_ids]
+        await asyncio.sleep(0.5)  # let the first wave of tasks hold connections before releasing them together
+        gate.set()
+        results = await asyncio.gather(*tasks)
+
+        async with pool.acquire() as conn:
+            claimed_by = await conn.fetchval("SELECT claimed_by FROM items WHERE item_id = $1", item_id)
+
+        winners = results.count(200)
+        conflicts = results.count(409)
+        print(f"🎯 {claimants} claimants: {winners} won, {conflicts} got 409, "
+              f"{claimants - winners - conflicts} other; item claimed by {claimed_by}")
+        ok = winners == 1 and conflicts == claimants - 1 and claimed_by in user_ids
+        print("✅ Exactly one claim won" if ok else "❌ Claim race check failed")
+        return ok
+    finally:
+        async with pool.acquire() as conn:
+            await conn.execute("DELETE FROM items WHERE item_id = $1", item_id)
+            await conn.execute("DELETE FROM users WHERE user_id LIKE $1", f"race-%-{run_id}%")
+        await pool.close()
+
+async def main(conn, args: List[str]):
+    if args[:1] == ["--race"]:
+        if not await claim_race(int(args[1]) if len(args) > 1 else 200):
+            sys.exit(1)
+    elif args[:1] == ["--sweep"]:
+        released = await release_expired_claims(conn)
+        if released is None:
+            print("⏳ Another worker is sweeping")
+        else:
+            print(f"✅ Sweep complete: {len(released)} claim(s) released")
+    else:
+        print("Usage: python claims.py [--race [claimants] | --sweep | --sweep-forever]")
+
+if __name__ == "__main__":
+    # Usage:
+    #   python claims.py --race [claimants]   concurrency check (exactly one claim wins)
+    #   python claims.py --sweep              release expired claims once
+    #   python claims.py --sweep-forever      run the sweeper as a separate worker
+    if sys.argv[1:2] == ["--sweep-forever"]:
+        asyncio.run(sweep_forever())
+    else:
+        run_cli(main)
@@ -0,0 +1,110 @@
+import io
+import os
+from typing import Dict, List, Optional
+
+from jobs import run_cli
+
+# Cloudinary delivery transformations for responsive variants. Variants are
+# rendered by the CDN on first request and cached there, so uploads stay fast.
+THUMBNAIL_TRANSFORMATION = os.getenv("THUMBNAIL_TRANSFORMATION", "c_fill,w_320,h_320,q_auto,f_auto")
+MEDIUM_TRANSFORMATION = os.getenv("MEDIUM_TRANSFORMATION", "c_limit,w_800,q_auto,f_auto")
+
+CLOUDINARY_UPLOAD_MARKER = "/image/upload/"
+
+# Self-hosted backends (local, s3) store pre-rendered JPEG variants next to the
+# original, matching the Cloudinary transformations above
+THUMBNAIL_SIZE = (320, 320)  # center crop
+MEDIUM_MAX_WIDTH = 800
+VARIANT_JPEG_QUALITY = int(os.getenv("VARIANT_JPEG_QUALITY", 80))
+
+def _jpeg(image) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=VARIANT_JPEG_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+def render_variants(content: bytes) -> Dict[str, bytes]:
+    """JPEG thumbnail and medium renditions of an image (blocking; run it on an executor)"""
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(content)) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    thumbnail = ImageOps.fit(image, THUMBNAIL_SIZE, Image.LANCZOS)
+    medium = image
+    if medium.width > MEDIUM_MAX_WIDTH:
+        medium = medium.resize((MEDIUM_MAX_WIDTH, round(medium.height * MEDIUM_MAX_WIDTH / medium.width)), Image.LANCZOS)
+    return {"thumbnail": _jpeg(thumbnail), "medium": _jpeg(medium)}
+
+def variant_url(url: Optional[str], transformation: str) -> Optional[str]:
+    """Insert a transformation into a Cloudinary delivery URL (other URLs are returned unchanged)"""
+    if not url or CLOUDINARY_UPLOAD_MARKER not in url:
+        return url
+    prefix, path = url.split(CLOUDINARY_UPLOAD_MARKER, 1)
+    return f"{prefix}{CLOUDINARY_UPLOAD_MARKER}{transformation}/{path}"
+
+def image_variants(image_urls: Optional[List[str]]) -> Dict[str, List[str]]:
+    """Thumbnail and medium URLs for each full-size image"""
+    image_urls = image_urls or []
+    return {
+        "thumbnail_urls": [variant_url(url, THUMBNAIL_TRANSFORMATION) for url in image_urls],
+        "medium_urls": [variant_url(url, MEDIUM_TRANSFORMATION) for url in image_urls]
+    }
+
+async def backfill_image_variants(conn, storage=None, batch_size: int = 500) -> int:
+    """Fill thumbnail_urls/medium_urls for items created before variants existed.
+
+    With a self-hosted storage backend the variant files are rendered too,
+    including for items that were given the originals as their variants.
+    """
+    self_hosted = storage is not None and storage.name != "cloudinary"
+    condition = "thumbnail_urls IS NULL"
+    if self_hosted:
+        condition = "(thumbnail_urls IS NULL OR thumbnail_urls = image_urls) AND cardinality(image_urls) > 0"
+
+    total = 0
+    last_item_id = ""
+    while True:
+        rows = await conn.fetch(f"""
+            SELECT item_id, image_urls FROM items
+            WHERE {condition} AND item_id > $1
+            ORDER BY item_id
+            LIMIT $2
+        """, last_item_id, batch_size)
+        if not rows:
+            break
+        last_item_id = rows[-1]["item_id"]
+
+        updates = []
+        for row in rows:
+            image_urls = row["image_urls"] or []
+            if self_hosted:
+                try:
+                    for url in image_urls:
+                        await storage.render_stored_variants(url)
+                except Exception as e:
+                    # Leave the row as it is; a later run can retry it
+                    print(f"⚠️ Could not render variants for item {row['item_id']}: {e}")
+                    continue
+                variants = storage.variants(image_urls)
+            else:
+                variants = image_variants(image_urls)
+            updates.append((variants["thumbnail_urls"], variants["medium_urls"], row["item_id"]))
+
+        await conn.executemany("""
+            UPDATE items SET thumbnail_urls = $1, medium_urls = $2
+            WHERE item_id = $3
+        """, updates)
+        total += len(updates)
+        print(f"🖼️ Backfilled image variants for {total} items")
+
+    print(f"✅ Image variant backfill complete ({total} items)")
+    return total
+
+async def main(conn, args: List[str]):
+    if "--backfill" in args:
+        from storage import get_storage_backend
+        storage = get_storage_backend(os.getenv("UPLOAD_PROVIDER", "cloudinary"))
+        await backfill_image_variants(conn, storage)
+    else:
+        print("Usage: python images.py --backfill")
+
+if __name__ == "__main__":
+    run_cli(main)
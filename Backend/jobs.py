@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+import asyncpg
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+class LockedJob:
+    """A maintenance job that only one worker runs at a time.
+
+    run() takes a session-level advisory lock (skipping the run if another
+    worker holds it), calls work(results) and keeps counters for the admin
+    stats endpoints. work appends the rows it handled to results, so the
+    counters stay right even when a later batch fails.
+    """
+
+    def __init__(self, name: str, lock_key: int, count_label: str):
+        self.name = name
+        self.lock_key = lock_key
+        self.count_label = count_label
+        self.stats: Dict[str, Any] = {
+            "runs": 0,
+            "skipped_locked": 0,
+            f"{count_label}_total": 0,
+            f"last_{count_label}": 0,
+            "last_run_at": None,
+            "last_duration_ms": 0.0,
+            "errors": 0
+        }
+
+    async def run(self, conn, work: Callable[[List[Any]], Awaitable[None]]) -> Optional[List[Any]]:
+        """Rows handled by this run, or None if another worker holds the lock"""
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", self.lock_key):
+            self.stats["skipped_locked"] += 1
+            return None
+
+        started = time.perf_counter()
+        results: List[Any] = []
+        try:
+            await work(results)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", self.lock_key)
+            self.stats["runs"] += 1
+            self.stats[f"{self.count_label}_total"] += len(results)
+            self.stats[f"last_{self.count_label}"] = len(results)
+            self.stats["last_run_at"] = datetime.utcnow().isoformat()
+            self.stats["last_duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return results
+
+    async def run_batches(self, conn, run_batch: Callable[[], Awaitable[List[Any]]],
+                          batch_size: int) -> Optional[List[Any]]:
+        """run() that repeats run_batch until it returns a short batch"""
+        async def work(results: List[Any]):
+            while True:
+                batch = await run_batch()
+                results.extend(batch)
+                if len(batch) < batch_size:
+                    break
+        return await self.run(conn, work)
+
+def run_cli(main: Callable[[Any, List[str]], Awaitable[None]]):
+    """Run a module's command-line entry point, main(conn, args), on one connection"""
+    async def runner():
+        conn = await asyncpg.connect(DATABASE_URL)
+        try:
+            await main(conn, sys.argv[1:])
+        finally:
+            await conn.close()
+    asyncio.run(runner())
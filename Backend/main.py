@@ -1,25 +1,44 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, status
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Query, Request, WebSocket, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Dict, Any
 import json
 import uuid
-from datetime import datetime, timedelta
+import time
+import asyncpg
+from datetime import datetime, timedelta, timezone
 import base64
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
 from dotenv import load_dotenv
 import jwt
-import google.generativeai as genai
 import os
 import admin_auth
+import migrations
+import claims
+import archive
+import search
+import moderation
+import ai
+from storage import get_storage_backend, CachedStaticFiles, LOCAL_UPLOAD_DIR, LOCAL_UPLOAD_MOUNT
+from cache import TTLCache, MISSING
+from notifications import (
+    create_notification, create_notifications, broadcast_notification,
+    mark_notifications_read, get_unread_count, reconcile_unread_counts
+)
+from realtime import (
+    RealtimeHub, publish_event, serve_websocket, sse_stream, issue_stream_ticket, redeem_stream_ticket,
+    REALTIME_TICKET_TTL
+)
+from serializers import (
+    compile_serializer, dumps, FastJSONResponse,
+    iso_or_none, iso_or_empty, list_or_empty
+)
 import uuid
 from typing import List, Optional
-import cloudinary
-import cloudinary.uploader
-from cloudinary.utils import cloudinary_url
-import aiofiles
 from pathlib import Path
 
 # Load environment variables
@@ -48,16 +67,68 @@ app.add_middleware(
 # Database Configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Cloudinary Configuration
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET")
-)
+# Connection pool settings
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", 10))  # seconds
+DB_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", 300))  # seconds idle
+DB_POOL_MAX_QUERIES = int(os.getenv("DB_POOL_MAX_QUERIES", 50000))  # recycle connection after N queries
+# Connections older than this are closed when released (0 disables)
+DB_POOL_MAX_CONNECTION_AGE = float(os.getenv("DB_POOL_MAX_CONNECTION_AGE", 1800))  # seconds
 
 # Upload settings
-UPLOAD_PROVIDER = os.getenv("UPLOAD_PROVIDER", "cloudinary")
+UPLOAD_PROVIDER = os.getenv("UPLOAD_PROVIDER", "cloudinary")  # cloudinary, local or s3
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+UPLOAD_CONCURRENCY_PER_REQUEST = int(os.getenv("UPLOAD_CONCURRENCY_PER_REQUEST", 3))
+UPLOAD_CONCURRENCY_GLOBAL = int(os.getenv("UPLOAD_CONCURRENCY_GLOBAL", 8))
+
+# Blocking provider SDK calls run on their own threads
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY_GLOBAL, thread_name_prefix="upload")
+upload_semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY_GLOBAL)
+
+# Storage backend for uploaded images
+storage = get_storage_backend(UPLOAD_PROVIDER, executor=upload_executor)
+print(f"✅ Upload provider: {storage.name}")
+
+if storage.name == "local":
+    # Serve local uploads directly, cached long-term by browsers and CDNs
+    app.mount(LOCAL_UPLOAD_MOUNT, CachedStaticFiles(directory=LOCAL_UPLOAD_DIR), name="uploads")
+
+# Pagination settings
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 20))
+MAX_PAGE_SIZE = 100
+# Compatibility: list endpoints called without limit/cursor return every row as a plain list
+LEGACY_UNPAGINATED_LISTS = os.getenv("LEGACY_UNPAGINATED_LISTS", "true").lower() == "true"
+
+# Newsfeed cache settings
+NEWSFEED_CACHE_TTL = float(os.getenv("NEWSFEED_CACHE_TTL", 30))  # seconds
+NEWSFEED_CACHE_SIZE = int(os.getenv("NEWSFEED_CACHE_SIZE", 256))  # cached pages
+newsfeed_cache = TTLCache("newsfeed", max_size=NEWSFEED_CACHE_SIZE, ttl=NEWSFEED_CACHE_TTL)
+
+# Push channel for notifications and chat (fed by Postgres LISTEN/NOTIFY)
+realtime_hub = RealtimeHub(DATABASE_URL)
+
+# Unread notification counts (push events invalidate them on every worker)
+UNREAD_COUNT_CACHE_TTL = float(os.getenv("UNREAD_COUNT_CACHE_TTL", 10))  # seconds
+UNREAD_COUNT_CACHE_SIZE = int(os.getenv("UNREAD_COUNT_CACHE_SIZE", 10000))  # users
+UNREAD_RECONCILE_INTERVAL = float(os.getenv("UNREAD_RECONCILE_INTERVAL", 3600))  # seconds
+unread_count_cache = TTLCache("unread_counts", max_size=UNREAD_COUNT_CACHE_SIZE, ttl=UNREAD_COUNT_CACHE_TTL)
+
+# Admin dashboard statistics (cleared on moderation actions)
+ADMIN_STATS_CACHE_TTL = float(os.getenv("ADMIN_STATS_CACHE_TTL", 15))  # seconds
+admin_stats_cache = TTLCache("admin_stats", max_size=32, ttl=ADMIN_STATS_CACHE_TTL)
+
+# Verified JWT payloads keyed by token digest (an entry never outlives the token's exp)
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 300))  # seconds
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))  # tokens
+token_cache = TTLCache("verified_tokens", max_size=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+# Periodic jobs started on startup and cancelled on shutdown
+background_tasks: List[asyncio.Task] = []
+# Set to false when running "python claims.py --sweep-forever" as a separate worker
+CLAIM_SWEEPER_ENABLED = os.getenv("CLAIM_SWEEPER_ENABLED", "true").lower() == "true"
+# Set to false when running "python archive.py --run" from cron instead
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() == "true"
 
 # Security
 security = HTTPBearer()
@@ -75,12 +146,14 @@ class UserCreate(BaseModel):
 
 class UserResponse(BaseModel):
     user_id: str
+    google_id: Optional[str] = None
     email: str
     name: str
     profile_picture: Optional[str] = None
     is_admin: bool
     is_active: bool
-    created_at: str
+    created_at: Optional[str] = None
+    last_login: Optional[str] = None
 
 class ItemCreate(BaseModel):
     name: str
@@ -116,6 +189,8 @@ class ItemResponse(BaseModel):
     comments: Optional[str] = None
     contact_info: Optional[str] = None
     image_urls: List[str]
+    thumbnail_urls: List[str] = []
+    medium_urls: List[str] = []
     status: str
     created_at: str
     approved: bool
@@ -123,6 +198,10 @@ class ItemResponse(BaseModel):
     claimant_email: Optional[str] = None
     claim_expires_at: Optional[str] = None
 
+class AdminItemResponse(ItemResponse):
+    rejection_reason: Optional[str] = None
+    rejected_at: Optional[str] = None
+
 class ClaimResponse(BaseModel):
     claim_id: str
     item_id: str
@@ -134,6 +213,15 @@ class ClaimResponse(BaseModel):
 class ChatMessage(BaseModel):
     message: str
 
+class ChatMessageResponse(BaseModel):
+    message_id: str
+    sender_id: str
+    sender_email: Optional[str] = None
+    sender_name: Optional[str] = None
+    message: str
+    timestamp: str
+    created_at: str
+
 class LocationCreate(BaseModel):
     name: str
     description: str
@@ -169,6 +257,17 @@ class NotificationCreate(BaseModel):
     related_item_id: Optional[str] = None
     action_url: Optional[str] = None
 
+class BulkModeration(BaseModel):
+    item_ids: List[str]
+    reason: Optional[str] = ""
+
+class NotificationBroadcast(BaseModel):
+    title: str
+    message: str
+    type: str = "announcement"
+    related_item_id: Optional[str] = None
+    action_url: Optional[str] = None
+
 class NotificationResponse(BaseModel):
     notification_id: str
     user_id: str
@@ -180,15 +279,182 @@ class NotificationResponse(BaseModel):
     is_read: bool
     created_at: str
 
+# Compiled row serializers for the response models above
+_ITEM_CONVERTERS = {
+    "expiry_date": iso_or_none,
+    "created_at": iso_or_empty,
+    "claim_expires_at": iso_or_none,
+    "rejected_at": iso_or_none,
+    "image_urls": list_or_empty,
+    "thumbnail_urls": list_or_empty,
+    "medium_urls": list_or_empty,
+    "images": list_or_empty
+}
+_ITEM_ALIASES = {"images": "image_urls"}  # legacy alias used by the frontend
+
+serialize_item = compile_serializer(ItemResponse, converters=_ITEM_CONVERTERS, extra=_ITEM_ALIASES)
+# Moderation fields are only returned to admins
+serialize_admin_item = compile_serializer(AdminItemResponse, converters=_ITEM_CONVERTERS, extra=_ITEM_ALIASES)
+
+serialize_claim = compile_serializer(
+    ClaimResponse,
+    columns={
+        "claim_id": "item_id",
+        "claimant_id": "claimed_by",
+        "created_at": "claim_expires_at",
+        "expires_at": "claim_expires_at"
+    },
+    converters={"created_at": iso_or_empty, "expires_at": iso_or_empty},
+    extra={"name": "name", "owner_name": "owner_name", "location": "location"}
+)
+
+serialize_chat_message = compile_serializer(
+    ChatMessageResponse,
+    converters={"timestamp": iso_or_empty, "created_at": iso_or_empty}
+)
+
+serialize_notification = compile_serializer(
+    NotificationResponse,
+    converters={"created_at": iso_or_empty}
+)
+
+serialize_user = compile_serializer(
+    UserResponse,
+    converters={"created_at": iso_or_none, "last_login": iso_or_none}
+)
+
+# Database connection pool
+db_pool: Optional[asyncpg.Pool] = None
+
+# Backend pid -> monotonic time the connection was opened
+_db_connection_opened_at: Dict[int, float] = {}
+
+db_pool_stats = {
+    "acquired_total": 0,
+    "acquire_timeouts": 0,
+    "recycled_by_age": 0,
+    "waiting": 0,
+    "acquire_time_total_ms": 0.0,
+    "acquire_time_max_ms": 0.0
+}
+
+async def _record_connection_opened(conn):
+    """Pool init hook, run once for every new connection"""
+    now = time.monotonic()
+    if len(_db_connection_opened_at) >= DB_POOL_MAX_SIZE * 2:
+        # Forget connections the pool closed on its own (idle or max_queries)
+        horizon = DB_POOL_MAX_CONNECTION_AGE + DB_POOL_MAX_INACTIVE_LIFETIME
+        for pid, opened_at in list(_db_connection_opened_at.items()):
+            if now - opened_at > horizon:
+                del _db_connection_opened_at[pid]
+    _db_connection_opened_at[conn.get_server_pid()] = now
+
+async def init_db_pool():
+    """Create the process-wide PostgreSQL connection pool"""
+    global db_pool
+    if db_pool is not None:
+        return db_pool
+    try:
+        db_pool = await asyncpg.create_pool(
+            DATABASE_URL,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            max_queries=DB_POOL_MAX_QUERIES,
+            max_inactive_connection_lifetime=DB_POOL_MAX_INACTIVE_LIFETIME,
+            init=_record_connection_opened
+        )
+        print(f"✅ Database pool created (min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE})")
+        return db_pool
+    except Exception as e:
+        print(f"❌ Database pool creation error: {e}")
+        raise
+
+async def close_db_pool():
+    """Close the connection pool, waiting for connections to be released"""
+    global db_pool
+    if db_pool is None:
+        return
+    try:
+        await asyncio.wait_for(db_pool.close(), timeout=DB_POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        print("⚠️ Timed out closing database pool, terminating connections")
+        db_pool.terminate()
+    finally:
+        db_pool = None
+        print("✅ Database pool closed")
+
 # Database connection helper
 async def get_db_connection():
-    """Get PostgreSQL database connection"""
+    """Acquire a PostgreSQL connection from the pool (release with release_db_connection)"""
+    if db_pool is None:
+        await init_db_pool()
+    
+    db_pool_stats["waiting"] += 1
+    started = time.perf_counter()
     try:
-        conn = await asyncpg.connect(DATABASE_URL)
-        return conn
+        conn = await db_pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        db_pool_stats["acquire_timeouts"] += 1
+        print(f"❌ Timed out acquiring database connection after {DB_POOL_ACQUIRE_TIMEOUT}s")
+        raise
     except Exception as e:
         print(f"❌ Database connection error: {e}")
         raise
+    finally:
+        db_pool_stats["waiting"] -= 1
+    
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    db_pool_stats["acquired_total"] += 1
+    db_pool_stats["acquire_time_total_ms"] += elapsed_ms
+    db_pool_stats["acquire_time_max_ms"] = max(db_pool_stats["acquire_time_max_ms"], elapsed_ms)
+    return conn
+
+async def release_db_connection(conn):
+    """Return a connection acquired with get_db_connection to the pool"""
+    if db_pool is None:
+        await conn.close()
+        return
+    
+    pid = conn.get_server_pid()
+    opened_at = _db_connection_opened_at.get(pid)
+    if DB_POOL_MAX_CONNECTION_AGE > 0 and opened_at is not None \
+            and time.monotonic() - opened_at > DB_POOL_MAX_CONNECTION_AGE:
+        # Closing a pooled connection hands its slot back; the pool opens a
+        # fresh connection on a later acquire
+        del _db_connection_opened_at[pid]
+        db_pool_stats["recycled_by_age"] += 1
+        await conn.close()
+        return
+    await db_pool.release(conn)
+
+async def get_db():
+    """Request-scoped dependency yielding a pooled connection"""
+    conn = await get_db_connection()
+    try:
+        yield conn
+    finally:
+        await release_db_connection(conn)
+
+def get_db_pool_stats() -> Dict[str, Any]:
+    """Snapshot of pool usage for operators"""
+    size = db_pool.get_size() if db_pool else 0
+    idle = db_pool.get_idle_size() if db_pool else 0
+    acquired = db_pool_stats["acquired_total"]
+    return {
+        "initialized": db_pool is not None,
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        "size": size,
+        "in_use": size - idle,
+        "idle": idle,
+        "waiting": db_pool_stats["waiting"],
+        "acquired_total": acquired,
+        "acquire_timeouts": db_pool_stats["acquire_timeouts"],
+        "recycled_by_age": db_pool_stats["recycled_by_age"],
+        "max_connection_age_seconds": DB_POOL_MAX_CONNECTION_AGE,
+        "acquire_time_avg_ms": round(db_pool_stats["acquire_time_total_ms"] / acquired, 3) if acquired else 0.0,
+        "acquire_time_max_ms": round(db_pool_stats["acquire_time_max_ms"], 3)
+    }
 
 # Database table creation
 async def create_tables_if_not_exist(conn):
@@ -296,12 +562,24 @@ async def create_tables_if_not_exist(conn):
 
 # Initialize admin manager with PostgreSQL
 try:
-    from admin_auth import AdminAuthManager
-    admin_manager = AdminAuthManager
+    from admin_auth import AdminAuthManager, HashingBusyError, get_hashing_stats
+    admin_manager = AdminAuthManager(acquire=get_db_connection, release=release_db_connection)
     print("✅ Admin manager initialized successfully")
 except ImportError:
     print("⚠️ admin_auth.py not found - admin features will not work")
     admin_manager = None
+    
+    class HashingBusyError(Exception):
+        pass
+
+@app.exception_handler(HashingBusyError)
+async def hashing_busy_handler(request, exc: HashingBusyError):
+    """Shed password hashing load with a retryable 503"""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": "Server is busy, please try again shortly"},
+        headers={"Retry-After": "1"}
+    )
 
 # Database initialization
 async def init_database():
@@ -309,22 +587,21 @@ async def init_database():
     conn = await get_db_connection()
     try:
         await create_tables_if_not_exist(conn)
+        await migrations.run_migrations(conn)
         print("✅ Database tables initialized")
     except Exception as e:
         print(f"❌ Database initialization error: {e}")
     finally:
-        await conn.close()
+        await release_db_connection(conn)
 
 # Initialize Gemini AI model
 try:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")    
-    if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-1.5-flash')
+    model = ai.load_model(GEMINI_API_KEY)
+    if model:
         print("✅ Gemini AI model initialized successfully")
     else:
         print("No AI detected")
-        model = None
         
 except Exception as e:
     print(f"❌ Error initializing Gemini AI: {e}")
@@ -339,27 +616,133 @@ def generate_token(user_id: str, is_admin: bool = False) -> str:
     }
     return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def decode_token(token: str) -> dict:
+    """Validate a JWT and return its payload (verified payloads are cached briefly)"""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not MISSING:
+        return dict(payload)
+    
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=["HS256"])
-        return payload
+        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    
+    # Expire the cache entry by the time the token itself expires
+    ttl = TOKEN_CACHE_TTL
+    if "exp" in payload:
+        ttl = min(ttl, float(payload["exp"]) - time.time())
+    if ttl > 0:
+        token_cache.set(key, payload, ttl=ttl)
+    return dict(payload)
+
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return decode_token(credentials.credentials)
 
 def admin_required(token_data: dict = Depends(verify_token)):
     if not token_data.get("is_admin"):
         raise HTTPException(status_code=403, detail="Admin access required")
     return token_data
 
-async def upload_to_cloudinary(file: UploadFile, folder: str) -> str:
-    """Upload file to Cloudinary"""
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    """Build an opaque keyset cursor from the last row of a page"""
+    raw = json.dumps({"created_at": created_at.isoformat(), "item_id": item_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    """Parse a keyset cursor back into (created_at, item_id)"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        # Cursors we issue are naive UTC like created_at; normalize any offset
+        # so the comparison cannot fail against the TIMESTAMP column
+        return to_naive_utc(datetime.fromisoformat(data["created_at"])), str(data["item_id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Normalize a client timestamp for the naive-UTC TIMESTAMP columns"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def resolve_page_size(limit: Optional[int], cursor: Optional[str]) -> Optional[int]:
+    """Page size for a list request, or None for the legacy unpaginated response"""
+    if limit is None and cursor is None:
+        return None if LEGACY_UNPAGINATED_LISTS else DEFAULT_PAGE_SIZE
+    return limit or DEFAULT_PAGE_SIZE
+
+def apply_keyset_page(query: str, params: list, cursor: Optional[str], page_size: Optional[int]):
+    """Append keyset condition, ordering and limit to an items query"""
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        params = params + [created_at, item_id]
+        query += f" AND (created_at, item_id) < (${len(params) - 1}, ${len(params)})"
+    
+    query += " ORDER BY created_at DESC, item_id DESC"
+    
+    if page_size is not None:
+        # Fetch one extra row to know whether another page exists
+        params = params + [page_size + 1]
+        query += f" LIMIT ${len(params)}"
+    
+    return query, params
+
+def split_page(rows, page_size: Optional[int]):
+    """Trim the look-ahead row and compute next_cursor"""
+    if page_size is None or len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(last["created_at"], last["item_id"])
+
+def page_response(items: list, page_size: Optional[int], next_cursor: Optional[str]):
+    """Plain list for legacy clients, otherwise items plus next_cursor"""
+    if page_size is None:
+        return items
+    return {"items": items, "next_cursor": next_cursor}
+
+def _feed_page_includes(key, item: Dict[str, Any]) -> bool:
+    """Could a cached feed page (category, status, approved_only, cursor, size) contain this item state?"""
+    category, status, approved_only, cursor_position, _ = key
+    if category and item.get("category") != category:
+        return False
+    if status and item.get("status") != status:
+        return False
+    if approved_only and not item.get("approved"):
+        return False
+    # Keyset pages only hold rows older than their cursor
+    if cursor_position and item.get("created_at") and item.get("item_id"):
+        return (item["created_at"], item["item_id"]) < cursor_position
+    return True
+
+def invalidate_newsfeed(*item_states):
+    """Drop cached feed pages affected by an item's before/after state"""
+    states = [dict(state) for state in item_states if state]
+    if not states:
+        return
+    newsfeed_cache.invalidate_where(lambda key: any(_feed_page_includes(key, state) for state in states))
+
+def invalidate_unread_counts(event: Dict[str, Any]):
+    """Drop cached unread counts for the recipients of a push event"""
+    if event.get("type") not in ("notification", "notifications_read", "resync"):
+        return
+    if event.get("broadcast"):
+        unread_count_cache.clear()
+    else:
+        for user_id in event.get("user_ids", []):
+            unread_count_cache.delete(user_id)
+
+realtime_hub.add_event_handler(invalidate_unread_counts)
+
+async def upload_to_storage(file: UploadFile, folder: str) -> Dict[str, Any]:
+    """Upload file to the configured storage backend; returns url, public_id and timing"""
     try:
         if not file.filename:
             raise ValueError("No filename provided")
             
-        print(f"📸 Starting Cloudinary upload: {file.filename}")
+        print(f"📸 Starting {storage.name} upload: {file.filename}")
         
         # Validate file
         if file.size and file.size > MAX_FILE_SIZE:
@@ -372,56 +755,58 @@ async def upload_to_cloudinary(file: UploadFile, folder: str) -> str:
         if len(file_content) == 0:
             raise ValueError("Empty file")
         
-        # Upload to Cloudinary
-        result = cloudinary.uploader.upload(
-            file_content,
-            folder=folder,
-            resource_type="auto",
-            format="jpg",
-            quality="auto",
-            fetch_format="auto"
-        )
+        # Upload (bounded across all requests)
+        async with upload_semaphore:
+            started = time.perf_counter()
+            result = await storage.save(file_content, file.filename, file.content_type, folder)
+            elapsed_ms = (time.perf_counter() - started) * 1000
         
-        url = result.get('secure_url')
-        print(f"✅ Cloudinary upload successful: {url}")
+        url = result.get("url")
+        if not url:
+            raise ValueError("Upload returned no URL")
+        print(f"✅ {storage.name} upload successful in {elapsed_ms:.0f} ms: {url}")
         
-        return url
+        return {
+            "url": url,
+            "public_id": result.get("public_id"),
+            "filename": file.filename,
+            "elapsed_ms": round(elapsed_ms, 1)
+        }
         
     except Exception as e:
-        print(f"❌ Cloudinary upload error: {str(e)}")
+        print(f"❌ {storage.name} upload error: {str(e)}")
         raise
 
-async def create_notification(user_id: str, title: str, message: str, notification_type: str, 
-                            related_item_id: str = None, action_url: str = None):
-    """Create a new notification for a user"""
+async def delete_from_storage(public_id: str):
+    """Delete an uploaded image (best effort cleanup)"""
     try:
-        notification_id = str(uuid.uuid4())
-        
-        conn = await get_db_connection()
-        try:
-            await conn.execute("""
-                INSERT INTO notifications (notification_id, user_id, title, message, type, related_item_id, action_url, is_read, created_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-            """, 
-            notification_id,
-            user_id,
-            title,
-            message,
-            notification_type,
-            related_item_id,
-            action_url,
-            False,
-            datetime.utcnow()
-            )
-        finally:
-            await conn.close()
-        
-        print(f"✅ Notification created for user {user_id}: {title}")
-        return notification_id
-        
+        await storage.delete(public_id)
+        print(f"🧹 Removed uploaded image: {public_id}")
     except Exception as e:
-        print(f"❌ Error creating notification: {e}")
-        return None
+        print(f"⚠️ Failed to remove uploaded image {public_id}: {e}")
+
+async def upload_images(images: List[UploadFile], folder: str) -> List[Dict[str, Any]]:
+    """Upload images in parallel; if any fails, remove the ones that succeeded and raise"""
+    request_semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY_PER_REQUEST)
+    
+    async def upload_one(index: int, image: UploadFile):
+        async with request_semaphore:
+            print(f"📸 Uploading image {index + 1}/{len(images)}: {image.filename}")
+            return await upload_to_storage(image, folder)
+    
+    results = await asyncio.gather(
+        *(upload_one(i, image) for i, image in enumerate(images)),
+        return_exceptions=True
+    )
+    
+    failures = [(images[i], result) for i, result in enumerate(results) if isinstance(result, BaseException)]
+    if failures:
+        uploaded = [result for result in results if isinstance(result, dict) and result.get("public_id")]
+        await asyncio.gather(*(delete_from_storage(result["public_id"]) for result in uploaded))
+        image, error = failures[0]
+        raise ValueError(f"Failed to upload image {image.filename}: {error}")
+    
+    return results
 
 # Authentication Endpoints
 @app.post("/auth/login")
@@ -483,7 +868,7 @@ async def login(user_data: UserCreate):
                 print(f"✅ User saved successfully!")
             
         finally:
-            await conn.close()  # Always close the connection
+            await release_db_connection(conn)  # Always close the connection
         
         # Generate token using google_id as user_id (same as before)
         token = generate_token(user_data.google_id, user.get("is_admin", False))
@@ -511,7 +896,7 @@ async def login(user_data: UserCreate):
 async def check_admin_setup():
     """Check if admin setup is needed"""
     try:
-        is_first_time = admin_manager.check_first_time_setup()
+        is_first_time = await admin_manager.check_first_time_setup()
         return {
             "first_time_setup": is_first_time,
             "message": "Admin setup required" if is_first_time else "Admin already exists"
@@ -540,7 +925,7 @@ async def setup_admin(admin_data: AdminSetup):
             return {"success": False, "error": "Password must contain at least one number"}
         
         # Create admin
-        result = admin_manager.create_admin(
+        result = await admin_manager.create_admin(
             name=admin_data.name,
             email=admin_data.email,
             password=admin_data.password
@@ -553,6 +938,8 @@ async def setup_admin(admin_data: AdminSetup):
             print(f"❌ Admin creation failed: {result['error']}")
             return result
             
+    except HashingBusyError:
+        raise
     except Exception as e:
         print(f"❌ Error in admin setup: {e}")
         return {"success": False, "error": str(e)}
@@ -564,7 +951,7 @@ async def admin_login_new(login_data: AdminLogin):
         print(f"🔍 Admin login attempt: {login_data.email}")
         
         # Authenticate admin
-        result = admin_manager.authenticate_admin(login_data.email, login_data.password)
+        result = await admin_manager.authenticate_admin(login_data.email, login_data.password)
         
         if result["success"]:
             # Generate JWT token
@@ -580,33 +967,32 @@ async def admin_login_new(login_data: AdminLogin):
             print(f"❌ Admin login failed: {result['error']}")
             raise HTTPException(status_code=401, detail=result["error"])
             
-    except HTTPException:
+    except (HTTPException, HashingBusyError):
         raise
     except Exception as e:
         print(f"❌ Error in admin login: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/admin/profile")
-async def get_admin_profile(token_data: dict = Depends(admin_required)):
+async def get_admin_profile(
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Get current admin profile"""
     try:
-        conn = await get_db_connection()
-        try:
-            admin_row = await conn.fetchrow("SELECT * FROM app_settings WHERE setting_key = $1", "admin_profile")
-            
-            if not admin_row:
-                raise HTTPException(status_code=404, detail="Admin profile not found")
-            
-            # Parse admin data from settings
-            admin_data = json.loads(admin_row["setting_value"])
-            return {
-                "name": admin_data.get("name"),
-                "email": admin_data.get("email"),
-                "created_at": admin_data.get("created_at"),
-                "last_login": admin_data.get("last_login")
-            }
-        finally:
-            await conn.close()
+        admin_row = await conn.fetchrow("SELECT * FROM app_settings WHERE setting_key = $1", "admin_profile")
+        
+        if not admin_row:
+            raise HTTPException(status_code=404, detail="Admin profile not found")
+        
+        # Parse admin data from settings
+        admin_data = json.loads(admin_row["setting_value"])
+        return {
+            "name": admin_data.get("name"),
+            "email": admin_data.get("email"),
+            "created_at": admin_data.get("created_at"),
+            "last_login": admin_data.get("last_login")
+        }
         
     except HTTPException:
         raise
@@ -628,7 +1014,7 @@ async def update_admin_profile(
                 return {"success": False, "error": "Password must be at least 8 characters"}
         
         # Update profile
-        result = admin_manager.update_admin_profile(
+        result = await admin_manager.update_admin_profile(
             current_email=profile_data.current_email,
             new_name=profile_data.new_name,
             new_email=profile_data.new_email,
@@ -642,6 +1028,8 @@ async def update_admin_profile(
             print(f"❌ Profile update failed: {result['error']}")
             return result
             
+    except HashingBusyError:
+        raise
     except Exception as e:
         print(f"❌ Error updating admin profile: {e}")
         return {"success": False, "error": str(e)}
@@ -658,7 +1046,7 @@ async def admin_forgot_password(request: dict):
         print(f"📧 Password reset requested for: {email}")
         
         # Generate reset token (includes security check)
-        result = admin_manager.generate_reset_token(email)
+        result = await admin_manager.generate_reset_token(email)
         
         if not result["success"]:
             print(f"❌ Reset token generation failed: {result['error']}")
@@ -671,7 +1059,7 @@ async def admin_forgot_password(request: dict):
         reset_token = result["reset_token"]
         admin_name = result["admin_name"]
         
-        email_sent = admin_manager.send_reset_email(email, reset_token, admin_name)
+        email_sent = await admin_manager.send_reset_email_async(email, reset_token, admin_name)
         
         if email_sent:
             print(f"✅ Reset email sent to: {email}")
@@ -704,7 +1092,7 @@ async def admin_reset_password(reset_data: ResetPassword):
             return {"success": False, "error": "Password must be at least 8 characters"}
         
         # Reset password
-        result = admin_manager.reset_password(reset_data.token, reset_data.new_password)
+        result = await admin_manager.reset_password(reset_data.token, reset_data.new_password)
         
         if result["success"]:
             print(f"✅ Password reset successful")
@@ -713,6 +1101,8 @@ async def admin_reset_password(reset_data: ResetPassword):
             print(f"❌ Password reset failed: {result['error']}")
             return result
             
+    except HashingBusyError:
+        raise
     except Exception as e:
         print(f"❌ Error resetting password: {e}")
         return {"success": False, "error": str(e)}
@@ -726,7 +1116,7 @@ async def admin_login_legacy(username: str = Form(), password: str = Form()):
         # Check if this is the old hardcoded admin
         if username == "admin" and password == "1admin@123!":
             # Check if new admin system is set up
-            is_first_time = admin_manager.check_first_time_setup()
+            is_first_time = await admin_manager.check_first_time_setup()
             
             if is_first_time:
                 # Allow legacy login but indicate setup needed
@@ -752,7 +1142,7 @@ async def admin_login_legacy(username: str = Form(), password: str = Form()):
         
         # Try new login system
         try:
-            result = admin_manager.authenticate_admin(username, password)
+            result = await admin_manager.authenticate_admin(username, password)
             if result["success"]:
                 admin_data = result["admin"]
                 token = generate_token(admin_data["user_id"], is_admin=True)
@@ -761,13 +1151,15 @@ async def admin_login_legacy(username: str = Form(), password: str = Form()):
                     "access_token": token,
                     "user": admin_data
                 }
+        except HashingBusyError:
+            raise
         except:
             pass
         
         # Invalid credentials
         raise HTTPException(status_code=401, detail="Invalid credentials")
         
-    except HTTPException:
+    except (HTTPException, HashingBusyError):
         raise
     except Exception as e:
         print(f"❌ Legacy admin login error: {e}")
@@ -775,34 +1167,20 @@ async def admin_login_legacy(username: str = Form(), password: str = Form()):
 
 # User Management Endpoints
 @app.get("/users")
-async def get_users(token_data: dict = Depends(admin_required)):
+async def get_users(
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Get all users (Admin only)"""
     try:
         print("🔍 Admin getting users...")
         
-        conn = await get_db_connection()
-        try:
-            users_rows = await conn.fetch("SELECT * FROM users")
-            
-            users = []
-            for user_row in users_rows:
-                user_data = {
-                    "user_id": user_row["user_id"],
-                    "google_id": user_row["google_id"],
-                    "name": user_row["name"],
-                    "email": user_row["email"],
-                    "profile_picture": user_row["profile_picture"],
-                    "is_active": user_row["is_active"],
-                    "created_at": user_row["created_at"].isoformat() if user_row["created_at"] else None,
-                    "last_login": user_row["last_login"].isoformat() if user_row["last_login"] else None
-                }
-                users.append(user_data)
-                print(f"✅ Added user: {user_row['name']}")
-            
-            print(f"🎯 Returning {len(users)} users to admin")
-            return users
-        finally:
-            await conn.close()
+        users_rows = await conn.fetch("SELECT * FROM users")
+        
+        users = [serialize_user(user_row) for user_row in users_rows]
+        
+        print(f"🎯 Returning {len(users)} users to admin")
+        return FastJSONResponse(users)
         
     except Exception as e:
         print(f"❌ Error getting users: {e}")
@@ -812,21 +1190,19 @@ async def get_users(token_data: dict = Depends(admin_required)):
 async def update_user_status(
     google_id: str, 
     is_active: bool,
-    token_data: dict = Depends(admin_required)
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
 ):
     """Suspend/activate user account (Admin only)"""
     try:
         print(f"🔄 Updating user status: {google_id} -> {is_active}")
         
-        conn = await get_db_connection()
-        try:
-            await conn.execute(
-                "UPDATE users SET is_active = $1 WHERE user_id = $2",
-                is_active,
-                google_id
-            )
-        finally:
-            await conn.close()
+        await conn.execute(
+            "UPDATE users SET is_active = $1 WHERE user_id = $2",
+            is_active,
+            google_id
+        )
+        admin_stats_cache.clear()
         
         print(f"✅ User status updated successfully")
         return {"message": "User status updated successfully"}
@@ -939,51 +1315,42 @@ async def create_item(
         conn = await get_db_connection()
         try:
             user_row = await conn.fetchrow("SELECT * FROM users WHERE user_id = $1", token_data["user_id"])
-            
-            if not user_row:
-                print(f"❌ User not found: {token_data['user_id']}")
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            user = dict(user_row)
-            print(f"✅ Found user: {user.get('name', 'Unknown')}")
-            
-            # Upload images to Cloudinary
-            image_urls = []
-            print(f"📸 Uploading {len(images)} images...")
-            
-            for i, image in enumerate(images):
-                try:
-                    print(f"📸 Uploading image {i+1}/{len(images)}: {image.filename}")
-                    url = await upload_to_cloudinary(image, "items")
-                    if url:
-                        image_urls.append(url)
-                        print(f"✅ Image {i+1} uploaded: {url}")
-                    else:
-                        print(f"❌ Failed to upload image {i+1}: {image.filename}")
-                        raise HTTPException(
-                            status_code=500, 
-                            detail=f"Failed to upload image: {image.filename}"
-                        )
-                except Exception as e:
-                    print(f"❌ Error uploading image {i+1}: {e}")
-                    raise HTTPException(
-                        status_code=500, 
-                        detail=f"Failed to upload image {image.filename}: {str(e)}"
-                    )
-            
-            # Ensure at least one image was uploaded successfully
-            if not image_urls:
-                print("❌ No images uploaded successfully")
-                raise HTTPException(status_code=500, detail="Failed to upload any images")
-            
-            # Create item
-            item_id = str(uuid.uuid4())
-            
+        finally:
+            # Don't hold a pooled connection while uploading
+            await release_db_connection(conn)
+        
+        if not user_row:
+            print(f"❌ User not found: {token_data['user_id']}")
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        user = dict(user_row)
+        print(f"✅ Found user: {user.get('name', 'Unknown')}")
+        
+        # Upload images in parallel
+        print(f"📸 Uploading {len(images)} images...")
+        try:
+            uploads = await upload_images(images, "items")
+        except Exception as e:
+            print(f"❌ Error uploading images: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        image_urls = [upload["url"] for upload in uploads]
+        variants = storage.variants(image_urls)
+        upload_timings = [{"filename": upload["filename"], "elapsed_ms": upload["elapsed_ms"]} for upload in uploads]
+        print(f"⏱️ Upload timings: {upload_timings}")
+        
+        # Create item
+        item_id = str(uuid.uuid4())
+        created_at = datetime.utcnow()
+        
+        conn = await get_db_connection()
+        try:
             # Save item to PostgreSQL
             await conn.execute("""
                 INSERT INTO items (item_id, name, quantity, category, location, owner_id, owner_name, owner_email, 
-                                  expiry_date, duration_days, comments, contact_info, image_urls, status, approved, created_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
+                                  expiry_date, duration_days, comments, contact_info, image_urls, status, approved, created_at,
+                                  thumbnail_urls, medium_urls)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18)
             """,
             item_id,
             name.strip(),
@@ -1000,9 +1367,18 @@ async def create_item(
             image_urls,
             "available",
             False,  # Requires admin approval
-            datetime.utcnow()
+            created_at,
+            variants["thumbnail_urls"],
+            variants["medium_urls"]
             )
             
+            invalidate_newsfeed({
+                "item_id": item_id,
+                "category": category.strip(),
+                "status": "available",
+                "approved": False,
+                "created_at": created_at
+            })
             print(f"💾 Item saved successfully: {item_id}")
             
             return {
@@ -1017,11 +1393,17 @@ async def create_item(
                     "location": location.strip(),
                     "status": "available",
                     "image_count": len(image_urls),
+                    "thumbnail_urls": variants["thumbnail_urls"],
+                    "upload_timings": upload_timings,
                     "created_at": datetime.utcnow().isoformat()
                 }
             }
+        except Exception:
+            # Don't leave orphaned images behind if the item wasn't saved
+            await asyncio.gather(*(delete_from_storage(upload["public_id"]) for upload in uploads if upload.get("public_id")))
+            raise
         finally:
-            await conn.close()
+            await release_db_connection(conn)
         
     except HTTPException:
         raise
@@ -1035,12 +1417,22 @@ async def create_item(
 async def get_items(
     category: Optional[str] = None,
     status: Optional[str] = None,
-    approved_only: bool = True
+    approved_only: bool = True,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
 ):
-    """Get all items (newsfeed)"""
+    """Get all items (newsfeed) - pass limit/cursor for keyset pagination"""
     try:
         print(f"🔍 GET /items called with: category={category}, status={status}, approved_only={approved_only}")
         
+        page_size = resolve_page_size(limit, cursor)
+        cache_key = (category, status, approved_only, decode_cursor(cursor) if cursor else None, page_size)
+        cached = newsfeed_cache.get(cache_key)
+        if cached is not MISSING:
+            print(f"⚡ Newsfeed cache hit")
+            return FastJSONResponse(cached)
+        generation = newsfeed_cache.generation
+        
         conn = await get_db_connection()
         try:
             # Build query based on filters
@@ -1063,81 +1455,65 @@ async def get_items(
                 query += f" AND status = ${param_count}"
                 params.append(status)
             
-            query += " ORDER BY created_at DESC"
+            query, params = apply_keyset_page(query, params, cursor, page_size)
             
             items_rows = await conn.fetch(query, *params)
+            items_rows, next_cursor = split_page(items_rows, page_size)
             
-            items = []
-            for item_row in items_rows:
-                item_response_data = {
-                    "item_id": item_row["item_id"],
-                    "name": item_row["name"],
-                    "quantity": item_row["quantity"],
-                    "category": item_row["category"],
-                    "location": item_row["location"],
-                    "owner_id": item_row["owner_id"],
-                    "owner_name": item_row["owner_name"],
-                    "owner_email": item_row["owner_email"],
-                    "expiry_date": item_row["expiry_date"].isoformat() if item_row["expiry_date"] else None,
-                    "duration_days": item_row["duration_days"],
-                    "comments": item_row["comments"],
-                    "contact_info": item_row["contact_info"],
-                    "image_urls": item_row["image_urls"] or [],
-                    "images": item_row["image_urls"] or [],
-                    "status": item_row["status"],
-                    "created_at": item_row["created_at"].isoformat() if item_row["created_at"] else "",
-                    "approved": item_row["approved"],
-                    "claimed_by": item_row["claimed_by"],
-                    "claimant_email": item_row["claimant_email"],
-                    "claim_expires_at": item_row["claim_expires_at"].isoformat() if item_row["claim_expires_at"] else None
-                }
-                items.append(item_response_data)
+            items = [serialize_item(item_row) for item_row in items_rows]
             
             print(f"🎯 Returning {len(items)} items")
-            return items
+            # Cache the rendered body so hits skip serialization entirely
+            body = dumps(page_response(items, page_size, next_cursor))
+            newsfeed_cache.set(cache_key, body, generation=generation)
+            return FastJSONResponse(body)
         finally:
-            await conn.close()
+            await release_db_connection(conn)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error getting items: {e}")
         import traceback
         traceback.print_exc()
         return []
 
+@app.get("/items/search")
+async def search_items(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Search approved items by relevance (full text plus typo-tolerant name matching)"""
+    try:
+        print(f"🔎 Searching items: {q!r}")
+        
+        items_rows, next_cursor = await search.search_items(conn, q, limit, category, status, cursor)
+        
+        items = [{**serialize_item(item_row), "rank": item_row["rank"]} for item_row in items_rows]
+        
+        print(f"🎯 Search returned {len(items)} items")
+        return FastJSONResponse({"items": items, "next_cursor": next_cursor})
+        
+    except search.InvalidSearchCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except Exception as e:
+        print(f"❌ Error searching items: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/items/{item_id}")
-async def get_item(item_id: str):
+async def get_item(item_id: str, conn: asyncpg.Connection = Depends(get_db)):
     """Get specific item details"""
     try:
-        conn = await get_db_connection()
-        try:
-            item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
-            
-            if not item_row:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
-            return {
-                "item_id": item_row["item_id"],
-                "name": item_row["name"],
-                "quantity": item_row["quantity"],
-                "category": item_row["category"],
-                "location": item_row["location"],
-                "owner_id": item_row["owner_id"],
-                "owner_name": item_row["owner_name"],
-                "owner_email": item_row["owner_email"],
-                "expiry_date": item_row["expiry_date"].isoformat() if item_row["expiry_date"] else None,
-                "duration_days": item_row["duration_days"],
-                "comments": item_row["comments"],
-                "contact_info": item_row["contact_info"],
-                "image_urls": item_row["image_urls"] or [],
-                "status": item_row["status"],
-                "created_at": item_row["created_at"].isoformat() if item_row["created_at"] else "",
-                "approved": item_row["approved"],
-                "claimed_by": item_row["claimed_by"],
-                "claimant_email": item_row["claimant_email"],
-                "claim_expires_at": item_row["claim_expires_at"].isoformat() if item_row["claim_expires_at"] else None
-            }
-        finally:
-            await conn.close()
+        item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
+        
+        if not item_row:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        return FastJSONResponse(serialize_item(item_row))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1146,118 +1522,110 @@ async def get_item(item_id: str):
 async def update_item(
     item_id: str,
     item_update: ItemUpdate,
-    token_data: dict = Depends(verify_token)
+    token_data: dict = Depends(verify_token),
+    conn: asyncpg.Connection = Depends(get_db)
 ):
     """Update item (owner only)"""
     try:
-        conn = await get_db_connection()
-        try:
-            # Find item
-            item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
-            
-            if not item_row:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
-            # Check ownership or admin
-            if item_row["owner_id"] != token_data["user_id"] and not token_data.get("is_admin"):
-                raise HTTPException(status_code=403, detail="Not authorized to update this item")
-            
-            # Build update query
-            update_fields = []
-            params = []
-            param_count = 0
-            
-            for field, value in item_update.dict(exclude_unset=True).items():
-                if value is not None:
-                    param_count += 1
-                    update_fields.append(f"{field} = ${param_count}")
-                    params.append(value)
-            
-            # Add approved = false if not admin (requires re-approval)
-            if not token_data.get("is_admin"):
+        # Find item
+        item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
+        
+        if not item_row:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        # Check ownership or admin
+        if item_row["owner_id"] != token_data["user_id"] and not token_data.get("is_admin"):
+            raise HTTPException(status_code=403, detail="Not authorized to update this item")
+        
+        # Build update query
+        update_fields = []
+        params = []
+        param_count = 0
+        
+        for field, value in item_update.dict(exclude_unset=True).items():
+            if value is not None:
                 param_count += 1
-                update_fields.append(f"approved = ${param_count}")
-                params.append(False)
+                update_fields.append(f"{field} = ${param_count}")
+                params.append(value)
+        
+        # Add approved = false if not admin (requires re-approval)
+        if not token_data.get("is_admin"):
+            param_count += 1
+            update_fields.append(f"approved = ${param_count}")
+            params.append(False)
+        
+        if update_fields:
+            param_count += 1
+            query = f"UPDATE items SET {', '.join(update_fields)} WHERE item_id = ${param_count}"
+            params.append(item_id)
             
-            if update_fields:
-                param_count += 1
-                query = f"UPDATE items SET {', '.join(update_fields)} WHERE item_id = ${param_count}"
-                params.append(item_id)
-                
-                await conn.execute(query, *params)
+            await conn.execute(query, *params)
             
-            return {"message": "Item updated successfully"}
-        finally:
-            await conn.close()
+            updated_item = {**dict(item_row), **item_update.dict(exclude_unset=True, exclude_none=True)}
+            if not token_data.get("is_admin"):
+                updated_item["approved"] = False
+            invalidate_newsfeed(item_row, updated_item)
+        
+        return {"message": "Item updated successfully"}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/items/{item_id}")
-async def delete_item(item_id: str, token_data: dict = Depends(verify_token)):
+async def delete_item(
+    item_id: str,
+    token_data: dict = Depends(verify_token),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Delete item (owner only)"""
     try:
-        conn = await get_db_connection()
-        try:
-            # Find item
-            item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
-            
-            if not item_row:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
-            # Check ownership or admin
-            if item_row["owner_id"] != token_data["user_id"] and not token_data.get("is_admin"):
-                raise HTTPException(status_code=403, detail="Not authorized to delete this item")
-            
-            # Delete item
-            await conn.execute("DELETE FROM items WHERE item_id = $1", item_id)
-            
-            return {"message": "Item deleted successfully"}
-        finally:
-            await conn.close()
+        # Find item
+        item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
+        
+        if not item_row:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        # Check ownership or admin
+        if item_row["owner_id"] != token_data["user_id"] and not token_data.get("is_admin"):
+            raise HTTPException(status_code=403, detail="Not authorized to delete this item")
+        
+        # Delete item
+        await conn.execute("DELETE FROM items WHERE item_id = $1", item_id)
+        invalidate_newsfeed(item_row)
+        admin_stats_cache.clear()
+        
+        return {"message": "Item deleted successfully"}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Admin Item Management
 @app.get("/admin/items/pending")
-async def get_pending_items(token_data: dict = Depends(admin_required)):
+async def get_pending_items(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Get pending items awaiting approval (Admin only)"""
     try:
         print("🔍 Getting pending items...")
         
-        conn = await get_db_connection()
-        try:
-            items_rows = await conn.fetch("""
-                SELECT * FROM items 
-                WHERE approved = false AND rejection_reason IS NULL 
-                ORDER BY created_at DESC
-            """)
-            
-            items = []
-            for item_row in items_rows:
-                formatted_item = {
-                    "item_id": item_row["item_id"],
-                    "name": item_row["name"],
-                    "quantity": item_row["quantity"],
-                    "category": item_row["category"],
-                    "location": item_row["location"],
-                    "owner_email": item_row["owner_email"],
-                    "owner_name": item_row["owner_name"],
-                    "status": item_row["status"],
-                    "created_at": item_row["created_at"].isoformat() if item_row["created_at"] else "",
-                    "comments": item_row["comments"],
-                    "images": item_row["image_urls"] or [],
-                    "image_urls": item_row["image_urls"] or []
-                }
-                items.append(formatted_item)
-                print(f"✅ Including pending item: {item_row['name']}")
-            
-            print(f"📊 Returning {len(items)} pending items")
-            return items
-        finally:
-            await conn.close()
+        page_size = resolve_page_size(limit, cursor)
+        query, params = apply_keyset_page(
+            "SELECT * FROM items WHERE approved = false AND rejection_reason IS NULL",
+            [], cursor, page_size
+        )
+        items_rows = await conn.fetch(query, *params)
+        items_rows, next_cursor = split_page(items_rows, page_size)
+        
+        items = [serialize_admin_item(item_row) for item_row in items_rows]
         
+        print(f"📊 Returning {len(items)} pending items")
+        return FastJSONResponse(page_response(items, page_size, next_cursor))
+        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error getting pending items: {e}")
         import traceback
@@ -1265,96 +1633,123 @@ async def get_pending_items(token_data: dict = Depends(admin_required)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/admin/items/approved")
-async def get_approved_items(token_data: dict = Depends(admin_required)):
+async def get_approved_items(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Get all approved items (Admin only)"""
     try:
         print("✅ Getting approved items...")
         
-        conn = await get_db_connection()
-        try:
-            items_rows = await conn.fetch("SELECT * FROM items WHERE approved = true ORDER BY created_at DESC")
-            
-            items = []
-            for item_row in items_rows:
-                formatted_item = {
-                    "item_id": item_row["item_id"],
-                    "name": item_row["name"],
-                    "quantity": item_row["quantity"],
-                    "category": item_row["category"],
-                    "location": item_row["location"],
-                    "owner_email": item_row["owner_email"],
-                    "owner_name": item_row["owner_name"],
-                    "status": item_row["status"],
-                    "approved": item_row["approved"],
-                    "created_at": item_row["created_at"].isoformat() if item_row["created_at"] else "",
-                    "images": item_row["image_urls"] or [],
-                    "image_urls": item_row["image_urls"] or []
-                }
-                items.append(formatted_item)
-            
-            print(f"📊 Returning {len(items)} approved items")
-            return items
-        finally:
-            await conn.close()
+        page_size = resolve_page_size(limit, cursor)
+        query, params = apply_keyset_page(
+            f"SELECT * FROM {archive.items_source(include_archived)} WHERE approved = true", [], cursor, page_size
+        )
+        items_rows = await conn.fetch(query, *params)
+        items_rows, next_cursor = split_page(items_rows, page_size)
+        
+        items = [serialize_admin_item(item_row) for item_row in items_rows]
         
+        print(f"📊 Returning {len(items)} approved items")
+        return FastJSONResponse(page_response(items, page_size, next_cursor))
+        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error getting approved items: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/admin/items/rejected")
-async def get_rejected_items(token_data: dict = Depends(admin_required)):
+async def get_rejected_items(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Get all rejected items (Admin only)"""
     try:
         print("❌ Getting rejected items...")
         
-        conn = await get_db_connection()
-        try:
-            items_rows = await conn.fetch("SELECT * FROM items WHERE rejection_reason IS NOT NULL ORDER BY created_at DESC")
-            
-            items = []
-            for item_row in items_rows:
-                formatted_item = {
-                    "item_id": item_row["item_id"],
-                    "name": item_row["name"],
-                    "quantity": item_row["quantity"],
-                    "category": item_row["category"],
-                    "location": item_row["location"],
-                    "owner_email": item_row["owner_email"],
-                    "owner_name": item_row["owner_name"],
-                    "status": item_row["status"],
-                    "approved": item_row["approved"],
-                    "rejection_reason": item_row["rejection_reason"],
-                    "rejected_at": item_row["rejected_at"].isoformat() if item_row["rejected_at"] else None,
-                    "created_at": item_row["created_at"].isoformat() if item_row["created_at"] else "",
-                    "images": item_row["image_urls"] or [],
-                    "image_urls": item_row["image_urls"] or []
-                }
-                items.append(formatted_item)
-                print(f"🔍 Including rejected item: {item_row['name']} (reason: {item_row['rejection_reason']})")
-            
-            print(f"📊 Returning {len(items)} rejected items")
-            return items
-        finally:
-            await conn.close()
+        page_size = resolve_page_size(limit, cursor)
+        query, params = apply_keyset_page(
+            f"SELECT * FROM {archive.items_source(include_archived)} WHERE rejection_reason IS NOT NULL", [], cursor, page_size
+        )
+        items_rows = await conn.fetch(query, *params)
+        items_rows, next_cursor = split_page(items_rows, page_size)
+        
+        items = [serialize_admin_item(item_row) for item_row in items_rows]
         
+        print(f"📊 Returning {len(items)} rejected items")
+        return FastJSONResponse(page_response(items, page_size, next_cursor))
+        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error getting rejected items: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/admin/items/archived")
+async def get_archived_items(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    reason: Optional[str] = Query(None, pattern="^(completed|rejected|expired)$"),
+    owner_id: Optional[str] = None,
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Get archived items, optionally by archive reason or owner (Admin only)"""
+    try:
+        print("📦 Getting archived items...")
+        
+        page_size = limit or DEFAULT_PAGE_SIZE
+        query = "SELECT * FROM items_archive WHERE true"
+        params: List[Any] = []
+        if reason:
+            params.append(reason)
+            query += f" AND archive_reason = ${len(params)}"
+        if owner_id:
+            params.append(owner_id)
+            query += f" AND owner_id = ${len(params)}"
+        
+        query, params = apply_keyset_page(query, params, cursor, page_size)
+        items_rows = await conn.fetch(query, *params)
+        items_rows, next_cursor = split_page(items_rows, page_size)
+        
+        items = [
+            {**serialize_admin_item(item_row), "archive_reason": item_row["archive_reason"], "archived_at": iso_or_none(item_row["archived_at"])}
+            for item_row in items_rows
+        ]
+        
+        print(f"📊 Returning {len(items)} archived items")
+        return FastJSONResponse(page_response(items, page_size, next_cursor))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error getting archived items: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.put("/admin/items/{item_id}/approve")
-async def approve_item(item_id: str, token_data: dict = Depends(admin_required)):
+async def approve_item(
+    item_id: str,
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Approve pending item (Admin only) - WITH NOTIFICATION"""
     try:
         print(f"✅ Admin approving item: {item_id}")
         
-        conn = await get_db_connection()
-        try:
-            # Find the item
-            item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
-            
-            if not item_row:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
+        # Find the item
+        item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
+        
+        if not item_row:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        async with conn.transaction():
             # Update the item to approved
             await conn.execute("""
                 UPDATE items 
@@ -1366,8 +1761,9 @@ async def approve_item(item_id: str, token_data: dict = Depends(admin_required))
             item_id
             )
             
-            # Create notification
+            # Create notification (commits with the approval)
             await create_notification(
+                conn,
                 user_id=item_row["owner_id"],
                 title="🎉 Item Approved!",
                 message=f'Your item "{item_row["name"]}" has been approved and is now live!',
@@ -1375,11 +1771,11 @@ async def approve_item(item_id: str, token_data: dict = Depends(admin_required))
                 related_item_id=item_id,
                 action_url=f"/dashboard"
             )
-            
-            print(f"✅ Item approved and notification sent: {item_row['name']}")
-            return {"message": "Item approved successfully"}
-        finally:
-            await conn.close()
+        invalidate_newsfeed(item_row, {**dict(item_row), "approved": True})
+        admin_stats_cache.clear()
+        
+        print(f"✅ Item approved and notification sent: {item_row['name']}")
+        return {"message": "Item approved successfully"}
         
     except Exception as e:
         print(f"❌ Error approving item: {e}")
@@ -1389,21 +1785,21 @@ async def approve_item(item_id: str, token_data: dict = Depends(admin_required))
 async def reject_item(
     item_id: str,
     request: dict,
-    token_data: dict = Depends(admin_required)
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
 ):
     """Reject an item (Admin only) - WITH NOTIFICATION"""
     try:
         reason = request.get("reason", "")
         print(f"❌ Admin rejecting item: {item_id}, reason: {reason}")
         
-        conn = await get_db_connection()
-        try:
-            # Find the item
-            item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
-            
-            if not item_row:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
+        # Find the item
+        item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
+        
+        if not item_row:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        async with conn.transaction():
             # Update item as rejected
             await conn.execute("""
                 UPDATE items 
@@ -1416,8 +1812,9 @@ async def reject_item(
             item_id
             )
             
-            # Create notification
+            # Create notification (commits with the rejection)
             await create_notification(
+                conn,
                 user_id=item_row["owner_id"],
                 title="❌ Item Rejected",
                 message=f'Your item "{item_row["name"]}" was rejected. Reason: {reason}',
@@ -1425,11 +1822,11 @@ async def reject_item(
                 related_item_id=item_id,
                 action_url=f"/dashboard"
             )
-            
-            print(f"✅ Item rejected and notification sent: {item_row['name']}")
-            return {"message": "Item rejected successfully"}
-        finally:
-            await conn.close()
+        invalidate_newsfeed(item_row, {**dict(item_row), "approved": False})
+        admin_stats_cache.clear()
+        
+        print(f"✅ Item rejected and notification sent: {item_row['name']}")
+        return {"message": "Item rejected successfully"}
         
     except HTTPException:
         raise
@@ -1437,98 +1834,121 @@ async def reject_item(
         print(f"❌ Error rejecting item: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Claims System
-@app.post("/items/{item_id}/claim")
-async def claim_item(item_id: str, token_data: dict = Depends(verify_token)):
-    """Claim an available item - WITH NOTIFICATION"""
+def validate_bulk_item_ids(item_ids: List[str]):
+    if not item_ids:
+        raise HTTPException(status_code=400, detail="item_ids must not be empty")
+    if len(item_ids) > moderation.MAX_BULK_MODERATION:
+        raise HTTPException(status_code=400, detail=f"At most {moderation.MAX_BULK_MODERATION} items per request")
+
+@app.post("/admin/items/bulk-approve")
+async def bulk_approve_items(
+    request: BulkModeration,
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Approve many items in one request (Admin only) - WITH NOTIFICATIONS"""
     try:
-        print(f"🎯 User {token_data['user_id']} attempting to claim item: {item_id}")
+        validate_bulk_item_ids(request.item_ids)
+        print(f"✅ Admin bulk approving {len(request.item_ids)} items")
         
-        conn = await get_db_connection()
-        try:
-            # Find item
-            item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
-            
-            if not item_row:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
-            # Validation checks
-            if not item_row["approved"]:
-                raise HTTPException(status_code=400, detail="Item not approved")
-            
-            if item_row["status"] != "available":
-                raise HTTPException(status_code=400, detail="Item not available")
-            
-            if item_row["owner_id"] == token_data["user_id"]:
-                raise HTTPException(status_code=400, detail="Cannot claim your own item")
-            
-            # Get claimant info
-            claimant_row = await conn.fetchrow("SELECT * FROM users WHERE user_id = $1", token_data["user_id"])
-            
-            if not claimant_row:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            # Update item to claimed
-            await conn.execute("""
-                UPDATE items 
-                SET status = $1, claimed_by = $2, claimant_email = $3, claim_expires_at = $4 
-                WHERE item_id = $5
-            """,
-            "claimed",
-            token_data["user_id"],
-            claimant_row["email"],
-            datetime.utcnow() + timedelta(days=3),
-            item_id
-            )
+        outcomes, approved = await moderation.bulk_approve(conn, request.item_ids)
+        
+        if approved:
+            invalidate_newsfeed(*approved, *({**dict(row), "approved": False} for row in approved))
+            admin_stats_cache.clear()
+        
+        print(f"✅ Bulk approved {len(approved)} items")
+        return {"message": f"Approved {len(approved)} items", "approved": len(approved), "results": outcomes}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error bulk approving items: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/admin/items/bulk-reject")
+async def bulk_reject_items(
+    request: BulkModeration,
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Reject many items in one request (Admin only) - WITH NOTIFICATIONS"""
+    try:
+        validate_bulk_item_ids(request.item_ids)
+        reason = request.reason or ""
+        print(f"❌ Admin bulk rejecting {len(request.item_ids)} items, reason: {reason}")
+        
+        outcomes, rejected = await moderation.bulk_reject(conn, request.item_ids, reason)
+        
+        if rejected:
+            # Rejected items may have been live before
+            invalidate_newsfeed(*rejected, *({**dict(row), "approved": True} for row in rejected))
+            admin_stats_cache.clear()
+        
+        print(f"✅ Bulk rejected {len(rejected)} items")
+        return {"message": f"Rejected {len(rejected)} items", "rejected": len(rejected), "results": outcomes}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error bulk rejecting items: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Claims System
+@app.post("/items/{item_id}/claim")
+async def claim_item(
+    item_id: str,
+    token_data: dict = Depends(verify_token),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Claim an available item - WITH NOTIFICATION"""
+    try:
+        print(f"🎯 User {token_data['user_id']} attempting to claim item: {item_id}")
+        
+        async with conn.transaction():
+            # Check and claim in one conditional update; concurrent claimers get a 409
+            item_row = await claims.claim_item(conn, item_id, token_data["user_id"])
             
-            # Create notification for item owner
+            # Create notification for item owner (commits with the claim)
             await create_notification(
+                conn,
                 user_id=item_row["owner_id"],
                 title="🎯 Someone Claimed Your Item!",
-                message=f'{claimant_row["name"]} wants to claim your "{item_row["name"]}". You can now chat with them!',
+                message=f'{item_row["claimant_name"]} wants to claim your "{item_row["name"]}". You can now chat with them!',
                 notification_type="item_claimed",
                 related_item_id=item_id,
                 action_url=f"/dashboard"
             )
-            
-            print(f"✅ Item claimed and notification sent to owner")
-            return {"message": "Item claimed successfully"}
-        finally:
-            await conn.close()
+        invalidate_newsfeed({**dict(item_row), "status": "available"}, item_row)
+        
+        print(f"✅ Item claimed and notification sent to owner")
+        return {"message": "Item claimed successfully"}
         
+    except claims.ClaimRejected as e:
+        print(f"⚠️ Claim rejected for item {item_id}: {e.detail}")
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         print(f"❌ Error claiming item: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/my-claims")
-async def get_my_claims(token_data: dict = Depends(verify_token)):
+async def get_my_claims(
+    token_data: dict = Depends(verify_token),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Get user's claims"""
     try:
         print(f"🔍 Getting claims for user: {token_data['user_id']}")
         
-        conn = await get_db_connection()
-        try:
-            items_rows = await conn.fetch("SELECT * FROM items WHERE claimed_by = $1", token_data["user_id"])
-            
-            claims = []
-            for item_row in items_rows:
-                claim_data = {
-                    "claim_id": item_row["item_id"],
-                    "item_id": item_row["item_id"],
-                    "claimant_id": token_data["user_id"],
-                    "status": item_row["status"],
-                    "created_at": item_row["claim_expires_at"].isoformat() if item_row["claim_expires_at"] else "",
-                    "expires_at": item_row["claim_expires_at"].isoformat() if item_row["claim_expires_at"] else "",
-                    "name": item_row["name"],
-                    "owner_name": item_row["owner_name"],
-                    "location": item_row["location"]
-                }
-                claims.append(claim_data)
-            
-            print(f"📊 Found {len(claims)} claims for user")
-            return claims
-        finally:
-            await conn.close()
+        # Archived items stay listed, so finished claims do not disappear
+        items_rows = await conn.fetch(
+            f"SELECT * FROM {archive.items_source(True)} WHERE claimed_by = $1", token_data["user_id"]
+        )
+        
+        claims = [serialize_claim(item_row) for item_row in items_rows]
+        
+        print(f"📊 Found {len(claims)} claims for user")
+        return FastJSONResponse(claims)
         
     except Exception as e:
         print(f"❌ Error getting claims: {e}")
@@ -1539,30 +1959,34 @@ async def get_my_claims(token_data: dict = Depends(verify_token)):
 async def send_message(
     item_id: str,
     message: ChatMessage,
-    token_data: dict = Depends(verify_token)
+    token_data: dict = Depends(verify_token),
+    conn: asyncpg.Connection = Depends(get_db)
 ):
     """Send chat message - WITH NOTIFICATION"""
     try:
         print(f"💬 Sending message for item: {item_id}")
         
-        conn = await get_db_connection()
-        try:
-            # Find item
-            item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
-            
-            if not item_row:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
-            # Check authorization
-            if token_data["user_id"] not in [item_row["owner_id"], item_row["claimed_by"]]:
-                raise HTTPException(status_code=403, detail="Not authorized to chat for this item")
-            
-            # Get sender info
-            sender_row = await conn.fetchrow("SELECT * FROM users WHERE user_id = $1", token_data["user_id"])
-            sender = dict(sender_row) if sender_row else {}
-            
+        # Find item
+        item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
+        
+        if not item_row:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        # Check authorization
+        if token_data["user_id"] not in [item_row["owner_id"], item_row["claimed_by"]]:
+            raise HTTPException(status_code=403, detail="Not authorized to chat for this item")
+        
+        # Get sender info
+        sender_row = await conn.fetchrow("SELECT * FROM users WHERE user_id = $1", token_data["user_id"])
+        sender = dict(sender_row) if sender_row else {}
+        
+        # Notify the other person (not the sender)
+        recipient_id = item_row["claimed_by"] if token_data["user_id"] == item_row["owner_id"] else item_row["owner_id"]
+        
+        message_id = str(uuid.uuid4())
+        sent_at = datetime.utcnow()
+        async with conn.transaction():
             # Create message
-            message_id = str(uuid.uuid4())
             await conn.execute("""
                 INSERT INTO chat_messages (message_id, item_id, sender_id, sender_email, sender_name, message, timestamp, created_at)
                 VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
@@ -1573,15 +1997,25 @@ async def send_message(
             sender.get("email", ""),
             sender.get("name", ""),
             message.message,
-            datetime.utcnow(),
-            datetime.utcnow()
+            sent_at,
+            sent_at
             )
             
-            # Notify the other person (not the sender)
-            recipient_id = item_row["claimed_by"] if token_data["user_id"] == item_row["owner_id"] else item_row["owner_id"]
+            # Push the message to both participants once committed
+            await publish_event(conn, "chat_message", [item_row["owner_id"], item_row["claimed_by"]], {
+                "item_id": item_id,
+                "message_id": message_id,
+                "sender_id": token_data["user_id"],
+                "sender_email": sender.get("email", ""),
+                "sender_name": sender.get("name", ""),
+                "message": message.message,
+                "timestamp": sent_at.isoformat(),
+                "created_at": sent_at.isoformat()
+            })
             
             if recipient_id:
                 await create_notification(
+                    conn,
                     user_id=recipient_id,
                     title="💬 New Message",
                     message=f'{sender.get("name")} sent you a message about "{item_row["name"]}"',
@@ -1589,117 +2023,137 @@ async def send_message(
                     related_item_id=item_id,
                     action_url=f"/dashboard"
                 )
-            
-            print(f"✅ Message sent and notification created")
-            return {"message": "Message sent successfully", "message_id": message_id}
-        finally:
-            await conn.close()
+        
+        print(f"✅ Message sent and notification created")
+        return {"message": "Message sent successfully", "message_id": message_id}
         
     except Exception as e:
         print(f"❌ Error sending message: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/items/{item_id}/chat/messages")
-async def get_chat_messages(item_id: str, token_data: dict = Depends(verify_token)):
-    """Get chat messages for item (only owner and claimant)"""
+async def get_chat_messages(
+    item_id: str,
+    since: Optional[datetime] = None,
+    before: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    token_data: dict = Depends(verify_token),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Get chat messages for item (only owner and claimant).
+
+    since: only messages newer than this timestamp (incremental polling)
+    before + limit: page backwards through older history
+    limit alone: the latest messages. Results are always oldest first.
+    """
     try:
         print(f"💬 Getting messages for item: {item_id}")
         
-        conn = await get_db_connection()
-        try:
-            # Find item
-            item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
-            
-            if not item_row:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
-            # Check if user is owner or claimant
-            if token_data["user_id"] not in [item_row["owner_id"], item_row["claimed_by"]]:
-                raise HTTPException(status_code=403, detail="Not authorized to view chat for this item")
-            
-            # Get messages
-            messages_rows = await conn.fetch("""
-                SELECT * FROM chat_messages 
-                WHERE item_id = $1 
-                ORDER BY timestamp ASC
-            """, item_id)
-            
-            messages = []
-            for msg_row in messages_rows:
-                messages.append({
-                    "message_id": msg_row["message_id"],
-                    "sender_id": msg_row["sender_id"],
-                    "sender_email": msg_row["sender_email"],
-                    "sender_name": msg_row["sender_name"],
-                    "message": msg_row["message"],
-                    "timestamp": msg_row["timestamp"].isoformat() if msg_row["timestamp"] else "",
-                    "created_at": msg_row["created_at"].isoformat() if msg_row["created_at"] else ""
-                })
-            
-            print(f"📊 Found {len(messages)} messages")
-            return messages
-        finally:
-            await conn.close()
+        # Authorization is part of the lateral join, so one query both checks
+        # access and fetches messages (none are read for outsiders)
+        params: List[Any] = [item_id, token_data["user_id"]]
+        conditions = ["c.item_id = i.item_id", "$2 IN (i.owner_id, i.claimed_by)"]
+        # JS toISOString() values end in Z; the column is naive UTC
+        since = to_naive_utc(since)
+        before = to_naive_utc(before)
+        if since:
+            params.append(since)
+            conditions.append(f"c.timestamp > ${len(params)}")
+        if before:
+            params.append(before)
+            conditions.append(f"c.timestamp < ${len(params)}")
+        
+        # Walk backwards from the newest (or from `before`) unless reading forward from `since`
+        newest_first = limit is not None and since is None
+        order = "DESC" if newest_first else "ASC"
+        limit_clause = f"LIMIT {limit}" if limit else ""
+        query = f"""
+            SELECT i.owner_id, i.claimed_by, m.*
+            FROM {archive.items_source(True, "i")}
+            LEFT JOIN LATERAL (
+                SELECT c.message_id, c.sender_id, c.sender_email, c.sender_name, c.message, c.timestamp, c.created_at
+                FROM chat_messages c
+                WHERE {' AND '.join(conditions)}
+                ORDER BY c.timestamp {order}
+                {limit_clause}
+            ) m ON true
+            WHERE i.item_id = $1
+        """
+        
+        rows = await conn.fetch(query, *params)
+        
+        if not rows:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        # Check if user is owner or claimant
+        if token_data["user_id"] not in [rows[0]["owner_id"], rows[0]["claimed_by"]]:
+            raise HTTPException(status_code=403, detail="Not authorized to view chat for this item")
+        
+        messages = [serialize_chat_message(row) for row in rows if row["message_id"] is not None]
+        if newest_first:
+            messages.reverse()
+        
+        print(f"📊 Found {len(messages)} messages")
+        return FastJSONResponse(messages)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error getting messages: {e}")
-        return []
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/items/{item_id}/complete")
-async def complete_transaction(item_id: str, token_data: dict = Depends(verify_token)):
+async def complete_transaction(
+    item_id: str,
+    token_data: dict = Depends(verify_token),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Mark item as completed (owner or claimant)"""
     try:
-        conn = await get_db_connection()
-        try:
-            # Find item
-            item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
-            
-            if not item_row:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
-            # Check if user is owner or claimant
-            if token_data["user_id"] not in [item_row["owner_id"], item_row["claimed_by"]]:
-                raise HTTPException(status_code=403, detail="Not authorized to complete this transaction")
-            
-            # Update item status
-            await conn.execute("""
-                UPDATE items 
-                SET status = $1, completed_at = $2 
-                WHERE item_id = $3
-            """,
-            "completed",
-            datetime.utcnow(),
-            item_id
-            )
-            
-            return {"message": "Transaction completed successfully"}
-        finally:
-            await conn.close()
+        # Find item
+        item_row = await conn.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
+        
+        if not item_row:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        # Check if user is owner or claimant
+        if token_data["user_id"] not in [item_row["owner_id"], item_row["claimed_by"]]:
+            raise HTTPException(status_code=403, detail="Not authorized to complete this transaction")
+        
+        # Update item status
+        await conn.execute("""
+            UPDATE items 
+            SET status = $1, completed_at = $2 
+            WHERE item_id = $3
+        """,
+        "completed",
+        datetime.utcnow(),
+        item_id
+        )
+        invalidate_newsfeed(item_row, {**dict(item_row), "status": "completed"})
+        
+        return {"message": "Transaction completed successfully"}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Location Management
 @app.get("/locations")
-async def get_locations():
+async def get_locations(conn: asyncpg.Connection = Depends(get_db)):
     """Get all available locations"""
     try:
-        conn = await get_db_connection()
-        try:
-            locations_rows = await conn.fetch("SELECT * FROM locations WHERE is_active = true")
-            
-            locations = []
-            for location_row in locations_rows:
-                locations.append({
-                    "location_id": location_row["location_id"],
-                    "name": location_row["name"],
-                    "description": location_row["description"]
-                })
-            
-            print(f"Found {len(locations)} locations")
-            return locations
-        finally:
-            await conn.close()
+        locations_rows = await conn.fetch("SELECT * FROM locations WHERE is_active = true")
+        
+        locations = []
+        for location_row in locations_rows:
+            locations.append({
+                "location_id": location_row["location_id"],
+                "name": location_row["name"],
+                "description": location_row["description"]
+            })
+        
+        print(f"Found {len(locations)} locations")
+        return locations
         
     except Exception as e:
         print(f"Error in get_locations: {e}")
@@ -1708,28 +2162,28 @@ async def get_locations():
         return []
 
 @app.post("/admin/locations")
-async def create_location(location: LocationCreate, token_data: dict = Depends(admin_required)):
+async def create_location(
+    location: LocationCreate,
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Create new location (Admin only)"""
     try:
         location_id = str(uuid.uuid4())
         
-        conn = await get_db_connection()
-        try:
-            await conn.execute("""
-                INSERT INTO locations (location_id, name, description, is_active, created_at)
-                VALUES ($1, $2, $3, $4, $5)
-            """,
-            location_id,
-            location.name,
-            location.description,
-            True,
-            datetime.utcnow()
-            )
-            
-            print(f"Location created successfully: {location.name}")
-            return {"message": "Location created successfully", "location_id": location_id}
-        finally:
-            await conn.close()
+        await conn.execute("""
+            INSERT INTO locations (location_id, name, description, is_active, created_at)
+            VALUES ($1, $2, $3, $4, $5)
+        """,
+        location_id,
+        location.name,
+        location.description,
+        True,
+        datetime.utcnow()
+        )
+        
+        print(f"Location created successfully: {location.name}")
+        return {"message": "Location created successfully", "location_id": location_id}
         
     except Exception as e:
         print(f"Error creating location: {e}")
@@ -1740,24 +2194,21 @@ async def create_location(location: LocationCreate, token_data: dict = Depends(a
 @app.delete("/admin/locations/{location_id}")
 async def delete_location(
     location_id: str,
-    token_data: dict = Depends(admin_required)
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
 ):
     """Delete a location (Admin only)"""
     try:
         print(f"🗑️ Admin deleting location: {location_id}")
         
-        conn = await get_db_connection()
-        try:
-            # Delete from PostgreSQL
-            result = await conn.execute("DELETE FROM locations WHERE location_id = $1", location_id)
-            
-            if result == "DELETE 0":
-                raise HTTPException(status_code=404, detail="Location not found")
-            
-            print(f"✅ Location deleted successfully")
-            return {"message": "Location deleted successfully"}
-        finally:
-            await conn.close()
+        # Delete from PostgreSQL
+        result = await conn.execute("DELETE FROM locations WHERE location_id = $1", location_id)
+        
+        if result == "DELETE 0":
+            raise HTTPException(status_code=404, detail="Location not found")
+        
+        print(f"✅ Location deleted successfully")
+        return {"message": "Location deleted successfully"}
         
     except HTTPException:
         raise
@@ -1766,23 +2217,21 @@ async def delete_location(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/terms-content")
-async def get_terms_content():
+async def get_terms_content(conn: asyncpg.Connection = Depends(get_db)):
     """Get current terms and conditions content"""
     try:
         print("📋 Getting terms content...")
         
-        conn = await get_db_connection()
-        try:
-            terms_row = await conn.fetchrow("SELECT * FROM app_settings WHERE setting_key = $1", "TERMS_CONTENT")
-            
-            if terms_row:
-                content = terms_row["setting_value"]
-                print(f"✅ Found custom terms content ({len(content)} chars)")
-                return {"content": content}
-            else:
-                # Return default terms if none set
-                print("🔍 Using default terms content")
-                default_terms = """Welcome to Eco Pantry - PUP Community Exchange!
+        terms_row = await conn.fetchrow("SELECT * FROM app_settings WHERE setting_key = $1", "TERMS_CONTENT")
+        
+        if terms_row:
+            content = terms_row["setting_value"]
+            print(f"✅ Found custom terms content ({len(content)} chars)")
+            return {"content": content}
+        else:
+            # Return default terms if none set
+            print("🔍 Using default terms content")
+            default_terms = """Welcome to Eco Pantry - PUP Community Exchange!
 
 By using this application, you agree to the following terms:
 
@@ -1814,10 +2263,8 @@ By using this application, you agree to the following terms:
 By clicking "I Accept", you agree to these terms and conditions.
 
 Last updated: August 2025"""
-                
-                return {"content": default_terms}
-        finally:
-            await conn.close()
+            
+            return {"content": default_terms}
             
     except Exception as e:
         print(f"❌ Error getting terms content: {e}")
@@ -1826,35 +2273,32 @@ Last updated: August 2025"""
 @app.put("/admin/terms-content")
 async def update_terms_content(
     request: dict,
-    token_data: dict = Depends(admin_required)
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
 ):
     """Update terms and conditions content (Admin only)"""
     try:
         content = request.get("content", "")
         print(f"🔍 Admin updating terms content ({len(content)} chars)")
         
-        conn = await get_db_connection()
-        try:
-            # Use UPSERT (INSERT ... ON CONFLICT)
-            await conn.execute("""
-                INSERT INTO app_settings (setting_key, setting_value, updated_at, updated_by)
-                VALUES ($1, $2, $3, $4)
-                ON CONFLICT (setting_key) 
-                DO UPDATE SET 
-                    setting_value = EXCLUDED.setting_value,
-                    updated_at = EXCLUDED.updated_at,
-                    updated_by = EXCLUDED.updated_by
-            """,
-            "TERMS_CONTENT",
-            content,
-            datetime.utcnow(),
-            token_data["user_id"]
-            )
-            
-            print("✅ Terms content updated successfully")
-            return {"message": "Terms content updated successfully"}
-        finally:
-            await conn.close()
+        # Use UPSERT (INSERT ... ON CONFLICT)
+        await conn.execute("""
+            INSERT INTO app_settings (setting_key, setting_value, updated_at, updated_by)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (setting_key) 
+            DO UPDATE SET 
+                setting_value = EXCLUDED.setting_value,
+                updated_at = EXCLUDED.updated_at,
+                updated_by = EXCLUDED.updated_by
+        """,
+        "TERMS_CONTENT",
+        content,
+        datetime.utcnow(),
+        token_data["user_id"]
+        )
+        
+        print("✅ Terms content updated successfully")
+        return {"message": "Terms content updated successfully"}
         
     except Exception as e:
         print(f"❌ Error updating terms content: {e}")
@@ -1884,244 +2328,368 @@ async def get_ai_recommendations(token_data: dict = Depends(verify_token)):
         if not model:
             return {"success": False, "error": "AI service not available"}
         
+        try:
+            ai.check_user_quota(token_data["user_id"])
+        except ai.AIThrottled as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+        
         # Get user info for personalization
         conn = await get_db_connection()
         try:
-            user_row = await conn.fetchrow("SELECT * FROM users WHERE user_id = $1", token_data["user_id"])
+            user_row = await conn.fetchrow("SELECT name FROM users WHERE user_id = $1", token_data["user_id"])
             user_name = "Friend"
             if user_row:
                 user_name = user_row["name"].split()[0] if user_row["name"] else "Friend"
             
-            # Get current approved items
-            items_rows = await conn.fetch("SELECT * FROM items WHERE approved = true")
-            
-            # Create materials context with ALL items
-            materials_context = "\n".join([f"- {item_row['name']} ({item_row['category']})" for item_row in items_rows])
-            
-            # Calculate suggestions count based on items
-            items_count = len(items_rows)
-            if items_count <= 5:
-                suggestions_count = "3-5"
-            elif items_count <= 15:
-                suggestions_count = "7-10"
-            elif items_count <= 30:
-                suggestions_count = "10-15"
-            else:
-                suggestions_count = "15-20"
-            
-            # Check if Christmas season
-            current_month = datetime.now().month
-            is_christmas = current_month in [11, 12, 1]
-            
-            prompt = f"""Hello {user_name}! 👋
-
-Welcome to GreenHouse AI! Here are ALL {items_count} recyclable materials from your PUP community:
-
-{materials_context}
-
-Based on these {items_count} available materials, give {suggestions_count} creative Filipino ways to reuse them:
-
-{"🎄 Include Christmas parol ideas since it's Christmas season!" if is_christmas else ""}
-
-Make the suggestions practical and versatile for:
-- Home use (any living situation)
-- School projects and activities 
-- Community events and celebrations
-- Creative arts and crafts
-- Practical everyday solutions
-
-Group similar materials together and suggest combination projects when possible.
-Be specific about which items from the list to use for each suggestion.
+            # Approved materials grouped with counts, most common first
+            groups, items_count, groups_count = await ai.fetch_material_groups(conn)
+        finally:
+            # Don't hold a pooled connection while the model is thinking
+            await release_db_connection(conn)
+        
+        # Check if Christmas season
+        current_month = datetime.now().month
+        is_christmas = current_month in [11, 12, 1]
+        
+        try:
+            ai_text, source = await ai.get_recommendations(model, groups, items_count, groups_count, is_christmas)
+        except ai.AITimeoutError as e:
+            print(f"⏰ {e}")
+            return {"success": False, "error": "AI service timed out"}
+        except ai.AIThrottled as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+        
+        return {
+            "success": True,
+            "recommendations": f"Hello {user_name}! 👋\n\n{ai_text}",
+            "available_items_count": items_count,
+            "suggestions_count": ai.suggestions_count_for(items_count),
+            "cached": source == "cache",
+            "coalesced": source == "coalesced"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ AI error: {e}")
+        return {"success": False, "error": str(e)}
 
-Format your response cleanly with numbered suggestions (1, 2, 3...) without asterisks or special formatting.
-Use simple, clean formatting - no asterisks, no bold markers, just clear numbered lists."""
-            
-            # Generate AI response
-            ai_response = model.generate_content(
-                prompt,
-                generation_config={
-                    'max_output_tokens': 2000,
-                    'temperature': 0.8,
-                }
-            )
-            
-            # Clean up the formatting
-            ai_text = ai_response.text
-            ai_text = ai_text.replace('**', '')   # Remove double asterisks
-            ai_text = ai_text.replace('***', '')  # Remove triple asterisks
-            ai_text = ai_text.replace('*', '')    # Remove single asterisks
+@app.post("/get-ai-recommendations/stream")
+async def stream_ai_recommendations(request: Request, token_data: dict = Depends(verify_token)):
+    """Stream AI recommendations as Server-Sent Events while the model generates them"""
+    try:
+        print(f"🌊 Streaming AI recommendations for user: {token_data.get('user_id')}")
+        
+        if not model:
+            return {"success": False, "error": "AI service not available"}
+        
+        try:
+            ai.check_user_quota(token_data["user_id"])
+        except ai.AIThrottled as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+        
+        conn = await get_db_connection()
+        try:
+            user_row = await conn.fetchrow("SELECT name FROM users WHERE user_id = $1", token_data["user_id"])
+            user_name = "Friend"
+            if user_row:
+                user_name = user_row["name"].split()[0] if user_row["name"] else "Friend"
             
-            return {
-                "success": True,
-                "recommendations": ai_text,
-                "available_items_count": len(items_rows),
-                "suggestions_count": suggestions_count
-            }
+            groups, items_count, groups_count = await ai.fetch_material_groups(conn)
         finally:
-            await conn.close()
+            await release_db_connection(conn)
+        
+        current_month = datetime.now().month
+        is_christmas = current_month in [11, 12, 1]
+        
+        chunks, source = ai.open_recommendations(model, groups, items_count, groups_count, is_christmas)
+        return StreamingResponse(
+            ai.sse_recommendations(request, f"Hello {user_name}! 👋\n\n", chunks, {
+                "available_items_count": items_count,
+                "suggestions_count": ai.suggestions_count_for(items_count),
+                "cached": source == "cache",
+                "coalesced": source == "coalesced"
+            }),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ AI error: {e}")
         return {"success": False, "error": str(e)}
 
 # Notification endpoints
 @app.get("/notifications")
-async def get_user_notifications(token_data: dict = Depends(verify_token)):
+async def get_user_notifications(
+    token_data: dict = Depends(verify_token),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Get all notifications for the current user"""
     try:
         user_id = token_data["user_id"]
         print(f"📬 Getting notifications for user: {user_id}")
         
-        conn = await get_db_connection()
-        try:
-            notifications_rows = await conn.fetch("""
-                SELECT * FROM notifications 
-                WHERE user_id = $1 
-                ORDER BY created_at DESC
-            """, user_id)
-            
-            notifications = []
-            for notif_row in notifications_rows:
-                notification = {
-                    "notification_id": notif_row["notification_id"],
-                    "user_id": notif_row["user_id"],
-                    "title": notif_row["title"],
-                    "message": notif_row["message"],
-                    "type": notif_row["type"],
-                    "related_item_id": notif_row["related_item_id"],
-                    "action_url": notif_row["action_url"],
-                    "is_read": notif_row["is_read"],
-                    "created_at": notif_row["created_at"].isoformat() if notif_row["created_at"] else ""
-                }
-                notifications.append(notification)
-            
-            print(f"📨 Found {len(notifications)} notifications")
-            return notifications
-        finally:
-            await conn.close()
+        notifications_rows = await conn.fetch("""
+            SELECT * FROM notifications 
+            WHERE user_id = $1 
+            ORDER BY created_at DESC
+        """, user_id)
+        
+        notifications = [serialize_notification(notif_row) for notif_row in notifications_rows]
+        
+        print(f"📨 Found {len(notifications)} notifications")
+        return FastJSONResponse(notifications)
         
     except Exception as e:
         print(f"❌ Error getting notifications: {e}")
         return []
 
 @app.put("/notifications/{notification_id}/read")
-async def mark_notification_read(notification_id: str, token_data: dict = Depends(verify_token)):
+async def mark_notification_read(
+    notification_id: str,
+    token_data: dict = Depends(verify_token),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Mark a notification as read"""
     try:
         user_id = token_data["user_id"]
         print(f"👁️ Marking notification as read: {notification_id}")
         
-        conn = await get_db_connection()
-        try:
-            result = await conn.execute("""
-                UPDATE notifications 
-                SET is_read = true 
-                WHERE notification_id = $1 AND user_id = $2
-            """, notification_id, user_id)
+        found, _ = await mark_notifications_read(conn, user_id, notification_id)
+        unread_count_cache.delete(user_id)
+        
+        if not found:
+            raise HTTPException(status_code=404, detail="Notification not found")
             
-            if result == "UPDATE 0":
-                raise HTTPException(status_code=404, detail="Notification not found")
-                
-            print(f"✅ Notification marked as read")
-            return {"message": "Notification marked as read"}
-        finally:
-            await conn.close()
+        print(f"✅ Notification marked as read")
+        return {"message": "Notification marked as read"}
             
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error marking notification as read: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/notifications/mark-all-read")
-async def mark_all_notifications_read(token_data: dict = Depends(verify_token)):
+async def mark_all_notifications_read(
+    token_data: dict = Depends(verify_token),
+    conn: asyncpg.Connection = Depends(get_db)
+):
     """Mark all notifications as read for the current user"""
     try:
         user_id = token_data["user_id"]
         print(f"👁️ Marking all notifications as read for user: {user_id}")
         
-        conn = await get_db_connection()
-        try:
-            result = await conn.execute("""
-                UPDATE notifications 
-                SET is_read = true 
-                WHERE user_id = $1 AND is_read = false
-            """, user_id)
-            
-            # Extract count from result (format is "UPDATE n")
-            count = int(result.split()[1]) if result.startswith("UPDATE") else 0
-            
-            print(f"✅ Marked {count} notifications as read")
-            return {"message": f"Marked {count} notifications as read"}
-        finally:
-            await conn.close()
+        _, count = await mark_notifications_read(conn, user_id)
+        unread_count_cache.delete(user_id)
+        
+        print(f"✅ Marked {count} notifications as read")
+        return {"message": f"Marked {count} notifications as read"}
         
     except Exception as e:
         print(f"❌ Error marking all notifications as read: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Credentials never go in realtime URLs: proxies and access logs record them.
+# Browsers can't set headers on WebSocket/EventSource, so the WebSocket takes
+# the JWT as a subprotocol and EventSource takes a single-use ticket.
+WS_BEARER_PROTOCOL = "bearer"
+
+def websocket_token(websocket: WebSocket) -> Optional[str]:
+    """JWT from the Authorization header or a "Sec-WebSocket-Protocol: bearer, <jwt>" header"""
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:]
+    protocols = [p.strip() for p in websocket.headers.get("sec-websocket-protocol", "").split(",")]
+    if len(protocols) == 2 and protocols[0] == WS_BEARER_PROTOCOL:
+        return protocols[1]
+    return None
+
+@app.websocket("/realtime/ws")
+async def realtime_websocket(websocket: WebSocket):
+    """Push new notifications and chat messages over a WebSocket"""
+    token = websocket_token(websocket)
+    try:
+        if token is None:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        token_data = decode_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    # Echo the protocol back, otherwise browsers drop the connection
+    offered = websocket.headers.get("sec-websocket-protocol")
+    await websocket.accept(subprotocol=WS_BEARER_PROTOCOL if offered else None)
+    subscriber = realtime_hub.subscribe(token_data["user_id"])
+    try:
+        await serve_websocket(websocket, subscriber)
+    finally:
+        realtime_hub.unsubscribe(subscriber)
+
+@app.post("/realtime/ticket")
+async def create_realtime_ticket(
+    token_data: dict = Depends(verify_token),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Single-use ticket for opening /realtime/events?ticket=... (EventSource can't send headers)"""
+    ticket = await issue_stream_ticket(conn, token_data["user_id"])
+    return {"ticket": ticket, "expires_in": REALTIME_TICKET_TTL}
+
+@app.get("/realtime/events")
+async def realtime_events(request: Request, ticket: Optional[str] = None):
+    """Server-Sent Events fallback for clients without WebSocket support"""
+    if ticket:
+        conn = await get_db_connection()
+        try:
+            user_id = await redeem_stream_ticket(conn, ticket)
+        finally:
+            await release_db_connection(conn)
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired ticket")
+    else:
+        authorization = request.headers.get("authorization", "")
+        if not authorization.lower().startswith("bearer "):
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        user_id = decode_token(authorization[7:])["user_id"]
+    
+    subscriber = realtime_hub.subscribe(user_id)
+    return StreamingResponse(
+        sse_stream(request, subscriber, on_close=realtime_hub.unsubscribe),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/notifications/unread-count")
 async def get_unread_notification_count(token_data: dict = Depends(verify_token)):
-    """Get count of unread notifications"""
+    """Get count of unread notifications (maintained counter, cached briefly)"""
     try:
         user_id = token_data["user_id"]
         
+        count = unread_count_cache.get(user_id)
+        if count is not MISSING:
+            return {"unread_count": count}
+        
+        generation = unread_count_cache.generation
         conn = await get_db_connection()
         try:
-            count_row = await conn.fetchval("""
-                SELECT COUNT(*) FROM notifications 
-                WHERE user_id = $1 AND is_read = false
-            """, user_id)
-            
-            count = count_row or 0
-            return {"unread_count": count}
+            count = await get_unread_count(conn, user_id)
         finally:
-            await conn.close()
+            await release_db_connection(conn)
+        
+        unread_count_cache.set(user_id, count, generation=generation)
+        return {"unread_count": count}
         
     except Exception as e:
         print(f"❌ Error getting unread count: {e}")
         return {"unread_count": 0}
 
+@app.post("/admin/notifications")
+async def send_notifications(
+    notifications: List[NotificationCreate],
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Send many notifications in one insert (Admin only)"""
+    try:
+        notification_ids = await create_notifications(conn, [{
+            "user_id": notification.user_id,
+            "title": notification.title,
+            "message": notification.message,
+            "notification_type": notification.type,
+            "related_item_id": notification.related_item_id,
+            "action_url": notification.action_url
+        } for notification in notifications])
+        
+        return {"message": f"Sent {len(notification_ids)} notifications", "notification_ids": notification_ids}
+        
+    except Exception as e:
+        print(f"❌ Error sending notifications: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/admin/notifications/reconcile-unread")
+async def reconcile_unread_notification_counts(
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Correct drifted unread counters now instead of waiting for the periodic job (Admin only)"""
+    try:
+        fixed = await reconcile_unread_counters(conn)
+        
+        return {"message": f"Fixed {len(fixed)} unread counters", "fixed_user_ids": fixed}
+        
+    except Exception as e:
+        print(f"❌ Error reconciling unread counters: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/admin/notifications/broadcast")
+async def broadcast_to_all_users(
+    broadcast: NotificationBroadcast,
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Notify every active user (Admin only)"""
+    try:
+        count = await broadcast_notification(
+            conn,
+            title=broadcast.title,
+            message=broadcast.message,
+            notification_type=broadcast.type,
+            related_item_id=broadcast.related_item_id,
+            action_url=broadcast.action_url
+        )
+        
+        return {"message": f"Notification sent to {count} users", "recipients": count}
+        
+    except Exception as e:
+        print(f"❌ Error broadcasting notification: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.delete("/admin/users/{google_id}")
 async def delete_user_permanently(
     google_id: str,
-    token_data: dict = Depends(admin_required)
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
 ):
     """Permanently delete a user and all their data (Admin only)"""
     try:
         print(f"🗑️ Admin permanently deleting user: {google_id}")
         
-        conn = await get_db_connection()
-        try:
-            # Get user info before deletion
-            user_row = await conn.fetchrow("SELECT * FROM users WHERE user_id = $1", google_id)
-            
-            if not user_row:
-                raise HTTPException(status_code=404, detail=f"User {google_id} not found")
-            
-            user_name = user_row["name"]
-            
-            # Delete user's items
-            deleted_items_result = await conn.execute("DELETE FROM items WHERE owner_id = $1", google_id)
-            deleted_items = int(deleted_items_result.split()[1]) if deleted_items_result.startswith("DELETE") else 0
-            
-            # Delete user's chat messages
-            await conn.execute("DELETE FROM chat_messages WHERE sender_id = $1", google_id)
-            
-            # Delete user's notifications
-            await conn.execute("DELETE FROM notifications WHERE user_id = $1", google_id)
-            
-            # Delete user
-            await conn.execute("DELETE FROM users WHERE user_id = $1", google_id)
-            
-            print(f"✅ User deleted: {user_name} (ID: {google_id})")
-            print(f"📊 Also deleted {deleted_items} items belonging to user")
-            
-            return {
-                "message": f"User {user_name} deleted permanently",
-                "deleted_items": deleted_items,
-                "user_name": user_name
-            }
-        finally:
-            await conn.close()
+        # Get user info before deletion
+        user_row = await conn.fetchrow("SELECT * FROM users WHERE user_id = $1", google_id)
+        
+        if not user_row:
+            raise HTTPException(status_code=404, detail=f"User {google_id} not found")
+        
+        user_name = user_row["name"]
+        
+        # Delete user's items
+        deleted_items_result = await conn.execute("DELETE FROM items WHERE owner_id = $1", google_id)
+        deleted_items = int(deleted_items_result.split()[1]) if deleted_items_result.startswith("DELETE") else 0
+        await conn.execute("DELETE FROM items_archive WHERE owner_id = $1", google_id)
+        
+        # Delete user's chat messages
+        await conn.execute("DELETE FROM chat_messages WHERE sender_id = $1", google_id)
+        
+        # Delete user's notifications
+        await conn.execute("DELETE FROM notifications WHERE user_id = $1", google_id)
+        await conn.execute("DELETE FROM notification_unread_counts WHERE user_id = $1", google_id)
+        unread_count_cache.delete(google_id)
+        
+        # Delete user
+        await conn.execute("DELETE FROM users WHERE user_id = $1", google_id)
+        newsfeed_cache.clear()
+        admin_stats_cache.clear()
+        
+        print(f"✅ User deleted: {user_name} (ID: {google_id})")
+        print(f"📊 Also deleted {deleted_items} items belonging to user")
+        
+        return {
+            "message": f"User {user_name} deleted permanently",
+            "deleted_items": deleted_items,
+            "user_name": user_name
+        }
         
     except HTTPException:
         raise
@@ -2136,128 +2704,176 @@ async def verify_current_password(request: dict, token_data: dict = Depends(admi
         email = request.get("email")
         password = request.get("password")
         
-        result = admin_manager.authenticate_admin(email, password)
+        result = await admin_manager.authenticate_admin(email, password)
         
         return {"success": result["success"]}
         
+    except HashingBusyError:
+        raise
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 # Debug endpoints
 @app.get("/debug/admin-items")
-async def debug_admin_items():
+async def debug_admin_items(conn: asyncpg.Connection = Depends(get_db)):
     """Debug what admin sees in pending items"""
     try:
+        items_rows = await conn.fetch("SELECT * FROM items WHERE approved = false")
+        
+        items = []
+        for item_row in items_rows:
+            items.append({
+                "name": item_row["name"],
+                "item_id": item_row["item_id"],
+                "owner_name": item_row["owner_name"],
+                "approved": item_row["approved"],
+                "rejection_reason": item_row["rejection_reason"]
+            })
+        
+        return {"pending_items": items}
+        
+    except Exception as e:
+        return {"error": str(e)}
+
+ADMIN_STATS_QUERY = """
+    WITH item_counts AS (
+        SELECT
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE approved = false AND rejection_reason IS NULL) AS pending,
+            COUNT(*) FILTER (WHERE approved = true) AS approved,
+            COUNT(*) FILTER (WHERE rejection_reason IS NOT NULL) AS rejected
+        FROM items
+    ), user_counts AS (
+        SELECT
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE is_active) AS active_accounts,
+            COUNT(*) FILTER (WHERE is_admin) AS admins,
+            COUNT(*) FILTER (WHERE last_login >= $1) AS active_recently
+        FROM users
+    )
+    SELECT
+        (SELECT row_to_json(item_counts) FROM item_counts) AS items,
+        (SELECT row_to_json(user_counts) FROM user_counts) AS users,
+        (SELECT COALESCE(json_object_agg(COALESCE(status, 'unknown'), n), '{}')
+         FROM (SELECT status, COUNT(*) AS n FROM items GROUP BY status) s) AS by_status,
+        (SELECT COALESCE(json_object_agg(category, n), '{}')
+         FROM (SELECT category, COUNT(*) AS n FROM items GROUP BY category) c) AS by_category,
+        (SELECT COALESCE(json_object_agg(location, n), '{}')
+         FROM (SELECT location, COUNT(*) AS n FROM items GROUP BY location) l) AS by_location,
+        (SELECT COUNT(*) FROM items_archive) AS archived
+"""
+
+@app.get("/admin/stats")
+async def get_admin_stats(
+    active_days: int = Query(7, ge=1, le=365),
+    token_data: dict = Depends(admin_required)
+):
+    """Dashboard counts computed with GROUP BY in one round trip (Admin only, cached briefly)"""
+    try:
+        cached = admin_stats_cache.get(active_days)
+        if cached is not MISSING:
+            return FastJSONResponse(cached)
+        generation = admin_stats_cache.generation
+        
         conn = await get_db_connection()
         try:
-            items_rows = await conn.fetch("SELECT * FROM items WHERE approved = false")
-            
-            items = []
-            for item_row in items_rows:
-                items.append({
-                    "name": item_row["name"],
-                    "item_id": item_row["item_id"],
-                    "owner_name": item_row["owner_name"],
-                    "approved": item_row["approved"],
-                    "rejection_reason": item_row["rejection_reason"]
-                })
-            
-            return {"pending_items": items}
+            row = await conn.fetchrow(ADMIN_STATS_QUERY, datetime.utcnow() - timedelta(days=active_days))
         finally:
-            await conn.close()
+            await release_db_connection(conn)
+        
+        stats = {
+            "items": {
+                **json.loads(row["items"]),
+                "archived": row["archived"],
+                "by_status": json.loads(row["by_status"]),
+                "by_category": json.loads(row["by_category"]),
+                "by_location": json.loads(row["by_location"])
+            },
+            "users": {**json.loads(row["users"]), "active_days": active_days},
+            "generated_at": datetime.utcnow().isoformat()
+        }
+        
+        body = dumps(stats)
+        admin_stats_cache.set(active_days, body, generation=generation)
+        return FastJSONResponse(body)
         
     except Exception as e:
-        return {"error": str(e)}
+        print(f"❌ Error getting admin stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/debug/items-status")
-async def debug_items_status():
+async def debug_items_status(conn: asyncpg.Connection = Depends(get_db)):
     """Debug endpoint to check item approval status"""
     try:
-        conn = await get_db_connection()
-        try:
-            items_rows = await conn.fetch("SELECT * FROM items")
-            
-            items_status = []
-            for item_row in items_rows:
-                items_status.append({
-                    "name": item_row["name"],
-                    "approved": item_row["approved"],
-                    "status": item_row["status"],
-                    "owner": item_row["owner_name"],
-                    "created_at": item_row["created_at"].isoformat() if item_row["created_at"] else ""
-                })
-            
-            return {
-                "total_items": len(items_status),
-                "items": items_status
-            }
-        finally:
-            await conn.close()
+        items_rows = await conn.fetch("SELECT * FROM items")
+        
+        items_status = []
+        for item_row in items_rows:
+            items_status.append({
+                "name": item_row["name"],
+                "approved": item_row["approved"],
+                "status": item_row["status"],
+                "owner": item_row["owner_name"],
+                "created_at": item_row["created_at"].isoformat() if item_row["created_at"] else ""
+            })
+        
+        return {
+            "total_items": len(items_status),
+            "items": items_status
+        }
         
     except Exception as e:
         return {"error": str(e)}
 
 @app.get("/debug/items")
-async def debug_items():
+async def debug_items(conn: asyncpg.Connection = Depends(get_db)):
     """Debug endpoint to check items in database"""
     try:
-        conn = await get_db_connection()
-        try:
-            items_rows = await conn.fetch("SELECT * FROM items")
+        items_rows = await conn.fetch("SELECT * FROM items")
+        
+        print(f"Found {len(items_rows)} items")
+        for item_row in items_rows:
+            print(f"Item: {dict(item_row)}")
             
-            print(f"Found {len(items_rows)} items")
-            for item_row in items_rows:
-                print(f"Item: {dict(item_row)}")
-                
-            return {
-                "count": len(items_rows),
-                "items": [dict(item_row) for item_row in items_rows]
-            }
-        finally:
-            await conn.close()
+        return FastJSONResponse({
+            "count": len(items_rows),
+            "items": [serialize_item(item_row) for item_row in items_rows]
+        })
     except Exception as e:
         return {"error": str(e)}
 
 @app.get("/debug/users")
-async def debug_users():
+async def debug_users(conn: asyncpg.Connection = Depends(get_db)):
     """Debug endpoint to check users in database"""
     try:
-        conn = await get_db_connection()
-        try:
-            users_rows = await conn.fetch("SELECT * FROM users")
+        users_rows = await conn.fetch("SELECT * FROM users")
+        
+        print(f"Found {len(users_rows)} user profiles")
+        for user_row in users_rows:
+            print(f"User: {dict(user_row)}")
             
-            print(f"Found {len(users_rows)} user profiles")
-            for user_row in users_rows:
-                print(f"User: {dict(user_row)}")
-                
-            return {
-                "count": len(users_rows),
-                "users": [dict(user_row) for user_row in users_rows]
-            }
-        finally:
-            await conn.close()
+        return FastJSONResponse({
+            "count": len(users_rows),
+            "users": [serialize_user(user_row) for user_row in users_rows]
+        })
     except Exception as e:
         return {"error": str(e)}
 
 @app.get("/debug/table")
-async def debug_table():
+async def debug_table(conn: asyncpg.Connection = Depends(get_db)):
     """Debug endpoint to check table contents"""
     try:
-        conn = await get_db_connection()
-        try:
-            # Get table names
-            tables_rows = await conn.fetch("""
-                SELECT table_name FROM information_schema.tables 
-                WHERE table_schema = 'public'
-            """)
-            
-            tables = [row["table_name"] for row in tables_rows]
-            return {
-                "tables": tables,
-                "database_url": DATABASE_URL[:50] + "..." if DATABASE_URL else "Not set"
-            }
-        finally:
-            await conn.close()
+        # Get table names
+        tables_rows = await conn.fetch("""
+            SELECT table_name FROM information_schema.tables 
+            WHERE table_schema = 'public'
+        """)
+        
+        tables = [row["table_name"] for row in tables_rows]
+        return {
+            "tables": tables,
+            "database_url": DATABASE_URL[:50] + "..." if DATABASE_URL else "Not set"
+        }
     except Exception as e:
         return {"error": str(e)}
 
@@ -2266,17 +2882,187 @@ async def debug_table():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+@app.get("/admin/db-pool")
+async def get_db_pool_status(token_data: dict = Depends(admin_required)):
+    """Get database connection pool statistics (Admin only)"""
+    return get_db_pool_stats()
+
+@app.get("/admin/hashing-stats")
+async def get_password_hashing_stats(token_data: dict = Depends(admin_required)):
+    """Get password hashing pool statistics (Admin only)"""
+    return get_hashing_stats()
+
+@app.get("/admin/cache-stats")
+async def get_cache_stats(token_data: dict = Depends(admin_required)):
+    """Get in-process cache hit/miss/eviction counters (Admin only)"""
+    return {
+        "newsfeed": newsfeed_cache.stats(),
+        "unread_counts": unread_count_cache.stats(),
+        "admin_stats": admin_stats_cache.stats(),
+        "ai_recommendations": ai.recommendation_cache.stats(),
+        "verified_tokens": token_cache.stats()
+    }
+
+@app.get("/admin/claim-sweeper-stats")
+async def get_claim_sweeper_stats(token_data: dict = Depends(admin_required)):
+    """Get expired-claim sweeper counters for this worker (Admin only)"""
+    return claims.get_sweeper_stats()
+
+@app.post("/admin/claims/release-expired")
+async def release_expired_claims_now(
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Run the expired-claim sweep immediately (Admin only)"""
+    try:
+        released = await sweep_expired_claims(conn)
+        
+        if released is None:
+            raise HTTPException(status_code=409, detail="A sweep is already running")
+        return {"message": f"Released {len(released)} expired claims", "item_ids": [row["item_id"] for row in released]}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error releasing expired claims: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/admin/archive-stats")
+async def get_item_archive_stats(token_data: dict = Depends(admin_required)):
+    """Get archival job counters for this worker (Admin only)"""
+    return archive.get_archive_stats()
+
+@app.post("/admin/items/archive-finished")
+async def archive_finished_items_now(
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Run item archival immediately (Admin only)"""
+    try:
+        archived = await archive_finished_items(conn)
+        
+        if archived is None:
+            raise HTTPException(status_code=409, detail="Archival is already running")
+        return {"message": f"Archived {len(archived)} items", "item_ids": [row["item_id"] for row in archived]}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error archiving items: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/admin/ai-stats")
+async def get_ai_stats(token_data: dict = Depends(admin_required)):
+    """Get AI recommendation counters (served, coalesced, throttled) for this worker (Admin only)"""
+    return ai.get_ai_stats()
+
+@app.get("/admin/realtime-stats")
+async def get_realtime_stats(
+    token_data: dict = Depends(admin_required),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Get push channel connection and delivery counters for this worker (Admin only)"""
+    return realtime_hub.get_stats()
+
+async def run_periodically(name: str, interval: float, job):
+    """Run job(conn) every interval seconds on a pooled connection"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job(conn)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ {name} failed: {e}")
+
+async def reconcile_unread_counters(conn) -> List[str]:
+    """Fix drifted unread counters and drop their cached values"""
+    fixed = await reconcile_unread_counts(conn)
+    for user_id in fixed:
+        unread_count_cache.delete(user_id)
+    return fixed
+
+async def sweep_expired_claims(conn):
+    """Release expired claims and refresh the feed pages they reappear on"""
+    released = await claims.release_expired_claims(conn)
+    for row in released or []:
+        invalidate_newsfeed(
+            {**dict(row), "status": "claimed", "claimed_by": row["previous_claimant"]},
+            row
+        )
+    return released
+
+async def archive_finished_items(conn):
+    """Archive finished items and drop feed pages that still list them"""
+    archived = await archive.archive_finished_items(conn)
+    if archived:
+        invalidate_newsfeed(*archived)
+    return archived
+
 # Startup event to initialize database
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup"""
     try:
+        await init_db_pool()
         await init_database()
+        await realtime_hub.start()
+        background_tasks.append(asyncio.create_task(
+            run_periodically("Unread counter reconciliation", UNREAD_RECONCILE_INTERVAL, reconcile_unread_counters)
+        ))
+        if CLAIM_SWEEPER_ENABLED:
+            background_tasks.append(asyncio.create_task(
+                run_periodically("Expired claim sweep", claims.CLAIM_SWEEP_INTERVAL, sweep_expired_claims)
+            ))
+        if ARCHIVE_ENABLED:
+            background_tasks.append(asyncio.create_task(
+                run_periodically("Item archival", archive.ARCHIVE_INTERVAL, archive_finished_items)
+            ))
         print("🚀 Application startup complete")
     except Exception as e:
         print(f"❌ Startup error: {e}")
 
+# Shutdown event to release database connections
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close database pool on shutdown"""
+    try:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        background_tasks.clear()
+        await realtime_hub.stop()
+        await close_db_pool()
+    except Exception as e:
+        print(f"❌ Shutdown error: {e}")
+
+def auth_benchmark(requests_count: int):
+    """Authentication cost per request with and without the token cache"""
+    token = generate_token("bench-user", is_admin=True)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    
+    def timed(label: str, clear_cache: bool):
+        started = time.perf_counter()
+        for _ in range(requests_count):
+            if clear_cache:
+                token_cache.clear()
+            admin_required(verify_token(credentials))
+        per_request = (time.perf_counter() - started) / requests_count * 1e6
+        print(f"{label:>24}: {per_request:6.2f} µs per request")
+        return per_request
+    
+    uncached = timed("full jwt.decode", clear_cache=True)
+    token_cache.clear()
+    cached = timed("cached verification", clear_cache=False)
+    print(f"⚡ {uncached / cached:.1f}x faster; {token_cache.stats()}")
+
 if __name__ == "__main__":
+    import sys
+    if sys.argv[1:2] == ["--auth-benchmark"]:
+        # python main.py --auth-benchmark [requests]
+        auth_benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
+        sys.exit(0)
+    
     import uvicorn
     print("🚀 Starting server...")
     print(f"🌐 Server will run on port: {PORT}")
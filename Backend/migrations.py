@@ -0,0 +1,259 @@
+from datetime import datetime
+from typing import List, Tuple
+
+from jobs import run_cli
+from search import SEARCH_VECTOR_SQL
+
+# Arbitrary key so only one process applies migrations at a time
+MIGRATIONS_LOCK_KEY = 4815162342
+
+# Numbered migrations, applied in order. Never edit an applied migration -
+# add a new one with the next version number instead.
+MIGRATIONS: List[Tuple[int, str, str]] = [
+    (1, "hot_query_indexes", """
+        -- Keyset pagination: GET /items newsfeed (optionally by category),
+        -- /admin/items/pending and /admin/items/rejected all page through
+        -- ORDER BY created_at DESC, item_id DESC
+        CREATE INDEX IF NOT EXISTS idx_items_feed_keyset
+            ON items (created_at DESC, item_id DESC) WHERE approved = true;
+        CREATE INDEX IF NOT EXISTS idx_items_category_feed_keyset
+            ON items (category, created_at DESC, item_id DESC) WHERE approved = true;
+        CREATE INDEX IF NOT EXISTS idx_items_pending_keyset
+            ON items (created_at DESC, item_id DESC) WHERE approved = false AND rejection_reason IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_items_rejected_keyset
+            ON items (created_at DESC, item_id DESC) WHERE rejection_reason IS NOT NULL;
+
+        -- /my-claims and owner lookups
+        CREATE INDEX IF NOT EXISTS idx_items_claimed_by
+            ON items (claimed_by) WHERE claimed_by IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_items_owner_id
+            ON items (owner_id);
+
+        -- Chat history: item_id ORDER BY timestamp
+        CREATE INDEX IF NOT EXISTS idx_chat_messages_item_timestamp
+            ON chat_messages (item_id, timestamp);
+
+        -- /notifications and /notifications/unread-count
+        CREATE INDEX IF NOT EXISTS idx_notifications_user_created
+            ON notifications (user_id, created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_notifications_user_unread
+            ON notifications (user_id) WHERE is_read = false;
+    """),
+    (2, "item_image_variants", """
+        -- Responsive image variants (backfill existing rows with: python images.py --backfill)
+        ALTER TABLE items ADD COLUMN IF NOT EXISTS thumbnail_urls TEXT[];
+        ALTER TABLE items ADD COLUMN IF NOT EXISTS medium_urls TEXT[];
+    """),
+    (3, "notification_unread_counts", """
+        -- Maintained by notifications.py; corrected by reconcile_unread_counts()
+        CREATE TABLE IF NOT EXISTS notification_unread_counts (
+            user_id VARCHAR(255) PRIMARY KEY,
+            unread_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT INTO notification_unread_counts (user_id, unread_count)
+        SELECT user_id, COUNT(*) FILTER (WHERE is_read = false)
+        FROM notifications
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+        ON CONFLICT (user_id) DO NOTHING;
+    """),
+    (4, "claim_expiry_index", """
+        -- Expired-claim sweeper: status = 'claimed' AND claim_expires_at < now
+        CREATE INDEX IF NOT EXISTS idx_items_claim_expiry
+            ON items (claim_expires_at) WHERE status = 'claimed';
+    """),
+    (5, "items_archive", """
+        -- Finished items moved out of the hot table by archive.py
+        CREATE TABLE IF NOT EXISTS items_archive (
+            item_id VARCHAR(255) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            quantity INTEGER NOT NULL,
+            category VARCHAR(255) NOT NULL,
+            location VARCHAR(255) NOT NULL,
+            owner_id VARCHAR(255),
+            owner_name VARCHAR(255),
+            owner_email VARCHAR(255),
+            expiry_date TIMESTAMP,
+            duration_days INTEGER,
+            comments TEXT,
+            contact_info VARCHAR(255),
+            image_urls TEXT[],
+            status VARCHAR(50),
+            approved BOOLEAN,
+            claimed_by VARCHAR(255),
+            claimant_email VARCHAR(255),
+            claim_expires_at TIMESTAMP,
+            rejection_reason TEXT,
+            rejected_at TIMESTAMP,
+            approved_at TIMESTAMP,
+            completed_at TIMESTAMP,
+            created_at TIMESTAMP,
+            thumbnail_urls TEXT[],
+            medium_urls TEXT[],
+            archive_reason VARCHAR(50) NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_items_archive_keyset
+            ON items_archive (created_at DESC, item_id DESC);
+        CREATE INDEX IF NOT EXISTS idx_items_archive_owner_id
+            ON items_archive (owner_id);
+    """),
+    (6, "item_search", """
+        -- /items/search: weighted full-text vector plus trigram matching for typos.
+        -- The vector is an index expression rather than a stored column, so
+        -- SELECT * does not carry it and adding it does not rewrite the table.
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_items_search_vector
+            ON items USING GIN (""" + SEARCH_VECTOR_SQL + """) WHERE approved = true;
+        CREATE INDEX IF NOT EXISTS idx_items_name_trgm
+            ON items USING GIN (name gin_trgm_ops) WHERE approved = true;
+    """),
+    (7, "ai_material_groups_index", """
+        -- /get-ai-recommendations: GROUP BY name, category over approved items
+        -- (lets Postgres aggregate from an index-only scan instead of sorting the table)
+        CREATE INDEX IF NOT EXISTS idx_items_approved_name_category
+            ON items (name, category) WHERE approved = true;
+    """),
+    (8, "items_archive_claimed_by_index", """
+        -- /my-claims also lists the claimant's archived items
+        CREATE INDEX IF NOT EXISTS idx_items_archive_claimed_by
+            ON items_archive (claimed_by) WHERE claimed_by IS NOT NULL;
+    """),
+    (9, "realtime_tickets", """
+        -- Single-use tickets for /realtime/events (see realtime.issue_stream_ticket)
+        CREATE TABLE IF NOT EXISTS realtime_tickets (
+            ticket VARCHAR(64) PRIMARY KEY,
+            user_id VARCHAR(255) NOT NULL,
+            expires_at TIMESTAMPTZ NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_realtime_tickets_expires_at
+            ON realtime_tickets (expires_at);
+    """),
+]
+
+# Hot queries checked by --explain
+EXPLAIN_QUERIES = {
+    "newsfeed": ("SELECT * FROM items WHERE approved = true ORDER BY created_at DESC, item_id DESC LIMIT 21", []),
+    "my_claims": ("SELECT * FROM items WHERE claimed_by = $1", ["user"]),
+    "pending": (
+        "SELECT * FROM items WHERE approved = false AND rejection_reason IS NULL "
+        "ORDER BY created_at DESC, item_id DESC LIMIT 21", []
+    ),
+    "chat": ("SELECT * FROM chat_messages WHERE item_id = $1 ORDER BY timestamp ASC", ["item"]),
+    "chat_latest_page": ("SELECT * FROM chat_messages WHERE item_id = $1 ORDER BY timestamp DESC LIMIT 50", ["item"]),
+    "unread_count": ("SELECT COUNT(*) FROM notifications WHERE user_id = $1 AND is_read = false", ["user"]),
+    "ai_material_groups": (
+        "SELECT name, category, COUNT(*) FROM items WHERE approved = true "
+        "GROUP BY name, category ORDER BY COUNT(*) DESC LIMIT $1", [500]
+    ),
+}
+
+async def ensure_migrations_table(conn):
+    """Create the table tracking applied schema versions"""
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+async def get_applied_versions(conn) -> List[int]:
+    """Get versions already applied to this database"""
+    await ensure_migrations_table(conn)
+    rows = await conn.fetch("SELECT version FROM schema_migrations ORDER BY version")
+    return [row["version"] for row in rows]
+
+async def run_migrations(conn) -> List[int]:
+    """Apply all pending migrations, each in its own transaction"""
+    await ensure_migrations_table(conn)
+    applied_now = []
+
+    for version, name, sql in sorted(MIGRATIONS):
+        async with conn.transaction():
+            # Serialize concurrent workers; re-check once we hold the lock
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", MIGRATIONS_LOCK_KEY)
+            already_applied = await conn.fetchval(
+                "SELECT 1 FROM schema_migrations WHERE version = $1", version
+            )
+            if already_applied:
+                continue
+
+            print(f"🔧 Applying migration {version:04d}_{name}")
+            await conn.execute(sql)
+            await conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES ($1, $2, $3)",
+                version, name, datetime.utcnow()
+            )
+            applied_now.append(version)
+
+    if applied_now:
+        print(f"✅ Applied {len(applied_now)} migration(s): {applied_now}")
+    else:
+        print("✅ Database schema is up to date")
+    return applied_now
+
+async def explain_hot_queries(conn):
+    """Print query plans for the hot queries (compare before/after migrating)"""
+    for label, (query, params) in EXPLAIN_QUERIES.items():
+        rows = await conn.fetch(f"EXPLAIN ANALYZE {query}", *params)
+        print(f"\n📊 {label}: {query}")
+        for row in rows:
+            print(f"   {row[0]}")
+
+async def seed_benchmark_data(conn, count: int):
+    """Insert synthetic items, chat messages and notifications (development databases only)"""
+    print(f"🌱 Seeding {count} benchmark items...")
+    await conn.execute("""
+        INSERT INTO items (item_id, name, quantity, category, location, owner_id, owner_name, owner_email,
+                           duration_days, comments, image_urls, status, approved, claimed_by,
+                           rejection_reason, created_at)
+        SELECT 'bench-' || g, 'Bench item ' || g, 1 + g % 10,
+               (ARRAY['Plastic Bottles','Glass Containers','Paper Products','Cardboard'])[1 + g % 4],
+               'Main Building', 'bench-user-' || g % 500, 'Bench User', 'bench@example.com',
+               7, 'Seeded for benchmarking', ARRAY[]::TEXT[],
+               CASE WHEN g % 7 = 0 THEN 'claimed' ELSE 'available' END,
+               g % 5 <> 0,
+               CASE WHEN g % 7 = 0 THEN 'bench-user-' || (g + 1) % 500 END,
+               CASE WHEN g % 50 = 0 THEN 'Seeded rejection' END,
+               NOW() - (g || ' minutes')::INTERVAL
+        FROM generate_series(1, $1) AS g
+        ON CONFLICT (item_id) DO NOTHING
+    """, count)
+    await conn.execute("""
+        INSERT INTO chat_messages (message_id, item_id, sender_id, message, timestamp, created_at)
+        SELECT 'bench-msg-' || g, 'bench-' || (1 + g % $1), 'bench-user-' || g % 500,
+               'Seeded message', NOW() - (g || ' seconds')::INTERVAL, NOW()
+        FROM generate_series(1, $1 * 2) AS g
+        ON CONFLICT (message_id) DO NOTHING
+    """, count)
+    await conn.execute("""
+        INSERT INTO notifications (notification_id, user_id, title, message, type, is_read, created_at)
+        SELECT 'bench-notif-' || g, 'bench-user-' || g % 500, 'Seeded', 'Seeded notification',
+               'benchmark', g % 10 <> 0, NOW() - (g || ' seconds')::INTERVAL
+        FROM generate_series(1, $1 * 2) AS g
+        ON CONFLICT (notification_id) DO NOTHING
+    """, count)
+    await conn.execute("ANALYZE items; ANALYZE chat_messages; ANALYZE notifications;")
+    print("✅ Benchmark data seeded")
+
+async def main(conn, args: List[str]):
+    if "--status" in args:
+        applied = await get_applied_versions(conn)
+        for version, name, _ in sorted(MIGRATIONS):
+            mark = "✅" if version in applied else "⏳"
+            print(f"{mark} {version:04d}_{name}")
+    elif "--seed" in args:
+        count = int(args[args.index("--seed") + 1]) if len(args) > args.index("--seed") + 1 else 100000
+        await seed_benchmark_data(conn, count)
+    elif "--explain" in args:
+        await explain_hot_queries(conn)
+    else:
+        await run_migrations(conn)
+
+if __name__ == "__main__":
+    # Usage: python migrations.py [--status | --explain | --seed N]
+    # Benchmark: --seed 100000, --explain, migrate, then --explain again
+    # to compare the plans (sequential scans become index scans).
+    run_cli(main)
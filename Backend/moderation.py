@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from notifications import create_notifications
+
+# Upper bound on item ids per bulk moderation request
+MAX_BULK_MODERATION = 1000
+
+_BULK_APPROVE = """
+    WITH requested AS (
+        SELECT DISTINCT unnest($1::varchar[]) AS item_id
+    ), updated AS (
+        UPDATE items i
+        SET approved = true, approved_at = $2
+        FROM requested r
+        WHERE i.item_id = r.item_id AND i.approved = false
+        RETURNING i.*
+    )
+    SELECT r.item_id AS requested_id,
+           EXISTS (SELECT 1 FROM items x WHERE x.item_id = r.item_id) AS found,
+           u.*
+    FROM requested r
+    LEFT JOIN updated u ON u.item_id = r.item_id
+"""
+
+_BULK_REJECT = """
+    WITH requested AS (
+        SELECT DISTINCT unnest($1::varchar[]) AS item_id
+    ), updated AS (
+        UPDATE items i
+        SET approved = false, rejection_reason = $3, rejected_at = $2
+        FROM requested r
+        WHERE i.item_id = r.item_id AND i.rejection_reason IS NULL
+        RETURNING i.*
+    )
+    SELECT r.item_id AS requested_id,
+           EXISTS (SELECT 1 FROM items x WHERE x.item_id = r.item_id) AS found,
+           u.*
+    FROM requested r
+    LEFT JOIN updated u ON u.item_id = r.item_id
+"""
+
+def _outcomes(rows, changed_label: str, unchanged_label: str) -> Tuple[Dict[str, str], List[Any]]:
+    """Per-item outcome map plus the rows that actually changed"""
+    outcomes: Dict[str, str] = {}
+    changed = []
+    for row in rows:
+        if row["item_id"] is not None:
+            outcomes[row["requested_id"]] = changed_label
+            changed.append(row)
+        elif row["found"]:
+            outcomes[row["requested_id"]] = unchanged_label
+        else:
+            outcomes[row["requested_id"]] = "not_found"
+    return outcomes, changed
+
+async def bulk_approve(conn, item_ids: List[str]) -> Tuple[Dict[str, str], List[Any]]:
+    """Approve many items in one UPDATE and notify every owner in one insert.
+
+    Returns ({item_id: "approved" | "already_approved" | "not_found"}, approved rows).
+    """
+    async with conn.transaction():
+        rows = await conn.fetch(_BULK_APPROVE, item_ids, datetime.utcnow())
+        outcomes, approved = _outcomes(rows, "approved", "already_approved")
+        await create_notifications(conn, [{
+            "user_id": row["owner_id"],
+            "title": "🎉 Item Approved!",
+            "message": f'Your item "{row["name"]}" has been approved and is now live!',
+            "notification_type": "item_approved",
+            "related_item_id": row["item_id"],
+            "action_url": "/dashboard"
+        } for row in approved if row["owner_id"]])
+    return outcomes, approved
+
+async def bulk_reject(conn, item_ids: List[str], reason: str) -> Tuple[Dict[str, str], List[Any]]:
+    """Reject many items in one UPDATE and notify every owner in one insert.
+
+    Returns ({item_id: "rejected" | "already_rejected" | "not_found"}, rejected rows).
+    """
+    async with conn.transaction():
+        rows = await conn.fetch(_BULK_REJECT, item_ids, datetime.utcnow(), reason)
+        outcomes, rejected = _outcomes(rows, "rejected", "already_rejected")
+        await create_notifications(conn, [{
+            "user_id": row["owner_id"],
+            "title": "❌ Item Rejected",
+            "message": f'Your item "{row["name"]}" was rejected. Reason: {reason}',
+            "notification_type": "item_rejected",
+            "related_item_id": row["item_id"],
+            "action_url": "/dashboard"
+        } for row in rejected if row["owner_id"]])
+    return outcomes, rejected
@@ -0,0 +1,217 @@
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from jobs import LockedJob, run_cli
+from realtime import encode_event, publish_event, publish_events
+
+# Notification writes take the caller's connection, so they commit or roll back
+# together with the state change that caused them. Every notification also gets
+# a push event (pg_notify) that connected clients receive once the transaction
+# commits. The same statements keep notification_unread_counts in step, so
+# unread counts are a primary-key lookup instead of a COUNT(*) over each user's history.
+
+# Arbitrary key so only one worker reconciles unread counters at a time
+UNREAD_RECONCILE_LOCK_KEY = 4815162343
+
+reconcile_job = LockedJob("unread counter reconciliation", UNREAD_RECONCILE_LOCK_KEY, "fixed")
+
+_COUNT_INSERTED = """
+    counted AS (
+        INSERT INTO notification_unread_counts (user_id, unread_count, updated_at)
+        SELECT user_id, COUNT(*), NOW() FROM inserted GROUP BY user_id ORDER BY user_id
+        ON CONFLICT (user_id) DO UPDATE
+        SET unread_count = notification_unread_counts.unread_count + EXCLUDED.unread_count,
+            updated_at = EXCLUDED.updated_at
+    )
+"""
+
+_INSERT_NOTIFICATIONS = """
+    WITH inserted AS (
+        INSERT INTO notifications (notification_id, user_id, title, message, type, related_item_id, action_url, is_read, created_at)
+        SELECT notification_id, user_id, title, message, type, related_item_id, action_url, false, $8
+        FROM unnest($1::varchar[], $2::varchar[], $3::varchar[], $4::text[], $5::varchar[], $6::varchar[], $7::varchar[])
+            AS n(notification_id, user_id, title, message, type, related_item_id, action_url)
+        RETURNING notification_id, user_id, created_at
+    ),""" + _COUNT_INSERTED + """
+    SELECT COUNT(*) FROM inserted
+"""
+
+_BROADCAST_NOTIFICATION = """
+    WITH inserted AS (
+        INSERT INTO notifications (notification_id, user_id, title, message, type, related_item_id, action_url, is_read, created_at)
+        SELECT gen_random_uuid()::text, user_id, $1, $2, $3, $4, $5, false, $6
+        FROM users
+        WHERE is_active = true
+        RETURNING notification_id, user_id, created_at
+    ),""" + _COUNT_INSERTED + """
+    SELECT COUNT(*) FROM inserted
+"""
+
+async def create_notifications(conn, notifications: List[Dict[str, Any]]) -> List[str]:
+    """Insert many notifications (and bump unread counters) in one statement.
+
+    Each dict needs user_id, title, message and notification_type; related_item_id
+    and action_url are optional. Returns the new notification ids.
+    """
+    if not notifications:
+        return []
+
+    ids = [str(uuid.uuid4()) for _ in notifications]
+    created_at = datetime.utcnow()
+    await conn.fetchval(
+        _INSERT_NOTIFICATIONS,
+        ids,
+        [n["user_id"] for n in notifications],
+        [n["title"] for n in notifications],
+        [n["message"] for n in notifications],
+        [n["notification_type"] for n in notifications],
+        [n.get("related_item_id") for n in notifications],
+        [n.get("action_url") for n in notifications],
+        created_at
+    )
+    await publish_events(conn, [
+        encode_event("notification", [n["user_id"]], {
+            "notification_id": notification_id,
+            "user_id": n["user_id"],
+            "title": n["title"],
+            "message": n["message"],
+            "type": n["notification_type"],
+            "related_item_id": n.get("related_item_id"),
+            "action_url": n.get("action_url"),
+            "is_read": False,
+            "created_at": created_at.isoformat()
+        })
+        for notification_id, n in zip(ids, notifications)
+    ])
+    print(f"✅ Created {len(ids)} notification(s)")
+    return ids
+
+async def create_notification(conn, user_id: str, title: str, message: str, notification_type: str,
+                              related_item_id: Optional[str] = None, action_url: Optional[str] = None) -> str:
+    """Create a notification for a user on the caller's connection/transaction"""
+    ids = await create_notifications(conn, [{
+        "user_id": user_id,
+        "title": title,
+        "message": message,
+        "notification_type": notification_type,
+        "related_item_id": related_item_id,
+        "action_url": action_url
+    }])
+    return ids[0]
+
+async def broadcast_notification(conn, title: str, message: str, notification_type: str,
+                                 related_item_id: Optional[str] = None, action_url: Optional[str] = None) -> int:
+    """Notify every active user with a single INSERT ... SELECT; returns the count"""
+    count = await conn.fetchval(
+        _BROADCAST_NOTIFICATION,
+        title, message, notification_type, related_item_id, action_url, datetime.utcnow()
+    )
+    await publish_event(conn, "notification", [], {
+        "title": title,
+        "message": message,
+        "type": notification_type,
+        "related_item_id": related_item_id,
+        "action_url": action_url
+    }, broadcast=True)
+    print(f"📢 Broadcast notification to {count} users: {title}")
+    return count
+
+async def mark_notifications_read(conn, user_id: str, notification_id: Optional[str] = None) -> Tuple[bool, int]:
+    """Mark one (or all) of a user's notifications read and decrement their counter.
+
+    Only rows that actually flip from unread are subtracted, so concurrent
+    inserts and repeated calls can't push the counter out of step.
+    Returns (found, flipped); found is False when notification_id doesn't exist.
+    """
+    target = "AND notification_id = $2" if notification_id else ""
+    params = [user_id, notification_id] if notification_id else [user_id]
+    row = await conn.fetchrow(f"""
+        WITH flipped AS (
+            UPDATE notifications SET is_read = true
+            WHERE user_id = $1 {target} AND is_read = false
+            RETURNING notification_id
+        ), counted AS (
+            UPDATE notification_unread_counts
+            SET unread_count = GREATEST(unread_count - (SELECT COUNT(*) FROM flipped), 0), updated_at = NOW()
+            WHERE user_id = $1 AND EXISTS (SELECT 1 FROM flipped)
+        )
+        SELECT (SELECT COUNT(*) FROM flipped) AS flipped,
+               EXISTS (SELECT 1 FROM notifications WHERE user_id = $1 {target}) AS found
+    """, *params)
+    if row["flipped"]:
+        # Lets the user's other devices (and other workers' caches) catch up
+        await publish_event(conn, "notifications_read", [user_id], {"notification_id": notification_id})
+    return row["found"], row["flipped"]
+
+async def get_unread_count(conn, user_id: str) -> int:
+    """Maintained unread count for a user"""
+    count = await conn.fetchval(
+        "SELECT unread_count FROM notification_unread_counts WHERE user_id = $1", user_id
+    )
+    return count or 0
+
+async def reconcile_unread_counts(conn, batch_size: int = 1000) -> List[str]:
+    """Correct counters that drifted from the notifications table.
+
+    Counters are locked a batch at a time before recounting, so writers for
+    those users wait instead of racing the correction. Returns the fixed
+    user ids (empty if another worker holds the reconcile lock).
+    """
+    async def work(fixed: List[str]):
+        # Users with notifications but no counter yet
+        await conn.execute("""
+            INSERT INTO notification_unread_counts (user_id, unread_count, updated_at)
+            SELECT user_id, COUNT(*) FILTER (WHERE is_read = false), NOW()
+            FROM notifications n
+            WHERE user_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM notification_unread_counts c WHERE c.user_id = n.user_id)
+            GROUP BY user_id
+            ON CONFLICT (user_id) DO NOTHING
+        """)
+
+        last_user_id = ""
+        while True:
+            async with conn.transaction():
+                batch = await conn.fetch("""
+                    SELECT user_id FROM notification_unread_counts
+                    WHERE user_id > $1
+                    ORDER BY user_id
+                    LIMIT $2
+                    FOR UPDATE
+                """, last_user_id, batch_size)
+                if not batch:
+                    break
+                user_ids = [row["user_id"] for row in batch]
+                last_user_id = user_ids[-1]
+
+                # A new statement, so the recount sees everything committed before the locks
+                rows = await conn.fetch("""
+                    UPDATE notification_unread_counts c
+                    SET unread_count = actual.unread, updated_at = NOW()
+                    FROM (
+                        SELECT u.user_id,
+                               (SELECT COUNT(*) FROM notifications n
+                                WHERE n.user_id = u.user_id AND n.is_read = false) AS unread
+                        FROM unnest($1::varchar[]) AS u(user_id)
+                    ) actual
+                    WHERE c.user_id = actual.user_id AND c.unread_count <> actual.unread
+                    RETURNING c.user_id
+                """, user_ids)
+                fixed.extend(row["user_id"] for row in rows)
+
+    fixed = await reconcile_job.run(conn, work)
+    if fixed is None:
+        return []
+
+    print(f"🔢 Unread counter reconciliation fixed {len(fixed)} user(s)")
+    return fixed
+
+async def main(conn, args: List[str]):
+    if "--reconcile" in args:
+        await reconcile_unread_counts(conn)
+    else:
+        print("Usage: python notifications.py --reconcile")
+
+if __name__ == "__main__":
+    run_cli(main)
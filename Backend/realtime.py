@@ -0,0 +1,350 @@
+import asyncio
+import json
+import os
+import secrets
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from dotenv import load_dotenv
+import asyncpg
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Postgres channel carrying push events between API workers
+REALTIME_CHANNEL = os.getenv("REALTIME_CHANNEL", "greenhouse_events")
+# Events buffered per connection before the client is told to resync
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", 100))
+REALTIME_HEARTBEAT_SECONDS = float(os.getenv("REALTIME_HEARTBEAT_SECONDS", 25))
+# A client that can't take a message within this long is disconnected
+REALTIME_SEND_TIMEOUT = float(os.getenv("REALTIME_SEND_TIMEOUT", 10))
+REALTIME_RECONNECT_SECONDS = float(os.getenv("REALTIME_RECONNECT_SECONDS", 5))
+# Single-use SSE tickets stand in for the JWT in the EventSource URL, which
+# ends up in access logs; they only need to outlive the reconnect delay
+REALTIME_TICKET_TTL = float(os.getenv("REALTIME_TICKET_TTL", 30))  # seconds
+
+# NOTIFY payloads are capped at 8000 bytes; bigger events go out without data
+MAX_NOTIFY_PAYLOAD = 7900
+
+HEARTBEAT_MESSAGE = json.dumps({"type": "ping"})
+# Sent instead of events that were dropped; clients should refetch
+RESYNC_MESSAGE = json.dumps({"type": "resync"})
+
+def encode_event(event_type: str, user_ids: Iterable[str], data: Any = None, broadcast: bool = False) -> str:
+    """Build a NOTIFY payload for the given recipients (or everyone when broadcast)"""
+    event = {"type": event_type, "user_ids": [] if broadcast else [uid for uid in user_ids if uid], "data": data}
+    if broadcast:
+        event["broadcast"] = True
+    payload = json.dumps(event, default=str, separators=(",", ":"))
+    if len(payload.encode("utf-8")) > MAX_NOTIFY_PAYLOAD:
+        event["data"] = None
+        event["truncated"] = True
+        payload = json.dumps(event, default=str, separators=(",", ":"))
+    return payload
+
+async def publish_event(conn, event_type: str, user_ids: Iterable[str], data: Any = None, broadcast: bool = False):
+    """Queue a push event on the caller's connection; delivered when its transaction commits"""
+    await conn.execute("SELECT pg_notify($1, $2)", REALTIME_CHANNEL, encode_event(event_type, user_ids, data, broadcast))
+
+async def publish_events(conn, payloads: List[str]):
+    """Queue many encoded events in one round trip"""
+    if payloads:
+        await conn.execute(
+            "SELECT pg_notify($1, payload) FROM unnest($2::text[]) AS payload",
+            REALTIME_CHANNEL, payloads
+        )
+
+class Subscriber:
+    """One connected client with a bounded event queue.
+
+    A client that falls REALTIME_QUEUE_SIZE events behind has its backlog
+    replaced by a single resync message, so slow consumers cost bounded memory.
+    """
+
+    def __init__(self, user_id: str, queue_size: int = REALTIME_QUEUE_SIZE):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.connected_at = time.time()
+
+    def offer(self, message: str) -> bool:
+        """Queue a message without blocking; returns False if the backlog was dropped"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait(RESYNC_MESSAGE)
+            return False
+
+    async def next_message(self, timeout: float = REALTIME_HEARTBEAT_SECONDS) -> Optional[str]:
+        """Next queued message, or None when it's time for a heartbeat"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class RealtimeHub:
+    """Routes LISTEN/NOTIFY events to this worker's connected clients.
+
+    Each API worker holds one dedicated listening connection (outside the
+    pool), so events published by any worker reach every subscriber.
+    """
+
+    def __init__(self, dsn: Optional[str] = DATABASE_URL, channel: str = REALTIME_CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+        self._event_handlers: List[Callable[[Dict[str, Any]], None]] = []
+        self.stats = {"events_received": 0, "deliveries": 0, "resyncs": 0, "reconnects": 0, "listening": False}
+
+    def subscribe(self, user_id: str) -> Subscriber:
+        subscriber = Subscriber(user_id)
+        self.subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self.subscribers.get(subscriber.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.user_id]
+
+    def add_event_handler(self, handler: Callable[[Dict[str, Any]], None]):
+        """Call handler(event) for every event this worker receives (e.g. cache invalidation)"""
+        self._event_handlers.append(handler)
+
+    def dispatch(self, payload: str):
+        """Fan an encoded event out to its recipients on this worker"""
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            print(f"⚠️ Ignoring malformed realtime payload: {payload[:100]}")
+            return
+        self.stats["events_received"] += 1
+
+        for handler in self._event_handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"❌ Realtime event handler error: {e}")
+
+        message = {"type": event.get("type"), "data": event.get("data")}
+        if event.get("truncated"):
+            message["truncated"] = True
+        # Encoded once and shared by every recipient
+        message = json.dumps(message, separators=(",", ":"))
+
+        if event.get("broadcast"):
+            targets = [s for subscribers in self.subscribers.values() for s in subscribers]
+        else:
+            targets = [s for uid in event.get("user_ids", []) for s in self.subscribers.get(uid, ())]
+
+        for subscriber in targets:
+            if not subscriber.offer(message):
+                self.stats["resyncs"] += 1
+        self.stats["deliveries"] += len(targets)
+
+    def resync_all(self):
+        """Tell every client and handler to refetch (events may have been missed)"""
+        for handler in self._event_handlers:
+            try:
+                handler({"type": "resync", "broadcast": True})
+            except Exception as e:
+                print(f"❌ Realtime event handler error: {e}")
+        for subscribers in self.subscribers.values():
+            for subscriber in subscribers:
+                subscriber.offer(RESYNC_MESSAGE)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.dispatch(payload)
+
+    async def start(self):
+        """Start listening in the background (reconnects on failure)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen_forever(self):
+        first_connect = True
+        while True:
+            try:
+                self._conn = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                self._conn.add_termination_listener(lambda connection: lost.set())
+                await self._conn.add_listener(self.channel, self._on_notify)
+                self.stats["listening"] = True
+                print(f"📡 Listening for realtime events on '{self.channel}'")
+
+                if not first_connect:
+                    self.stats["reconnects"] += 1
+                    self.resync_all()
+                first_connect = False
+
+                # Idle connections can die silently, so probe them on every heartbeat
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=REALTIME_HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        await self._conn.fetchval("SELECT 1")
+                print("⚠️ Realtime listener connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Realtime listener error: {e}")
+            finally:
+                self.stats["listening"] = False
+                if self._conn is not None:
+                    self._conn.terminate()
+                    self._conn = None
+            await asyncio.sleep(REALTIME_RECONNECT_SECONDS)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "users": len(self.subscribers),
+            "connections": sum(len(subscribers) for subscribers in self.subscribers.values()),
+            "queued": sum(s.queue.qsize() for subscribers in self.subscribers.values() for s in subscribers)
+        }
+
+async def issue_stream_ticket(conn, user_id: str) -> str:
+    """Create a short-lived, single-use ticket that opens one SSE stream for user_id"""
+    ticket = secrets.token_urlsafe(32)
+    await conn.execute("DELETE FROM realtime_tickets WHERE expires_at < NOW()")
+    await conn.execute(
+        "INSERT INTO realtime_tickets (ticket, user_id, expires_at) VALUES ($1, $2, NOW() + $3 * INTERVAL '1 second')",
+        ticket, user_id, REALTIME_TICKET_TTL
+    )
+    return ticket
+
+async def redeem_stream_ticket(conn, ticket: str) -> Optional[str]:
+    """Consume a ticket; returns its user id, or None if it is unknown, used or expired"""
+    return await conn.fetchval(
+        "DELETE FROM realtime_tickets WHERE ticket = $1 RETURNING CASE WHEN expires_at >= NOW() THEN user_id END",
+        ticket
+    )
+
+async def serve_websocket(websocket, subscriber: Subscriber):
+    """Push queued events (or heartbeats) to an accepted WebSocket until it goes away"""
+
+    async def drain_client():
+        # Client messages (e.g. pongs) only prove liveness; receiving also detects disconnects
+        while True:
+            await websocket.receive_text()
+
+    receiver = asyncio.create_task(drain_client())
+    try:
+        while True:
+            getter = asyncio.ensure_future(subscriber.next_message())
+            await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                getter.cancel()
+                break
+            message = getter.result()
+            await asyncio.wait_for(websocket.send_text(message or HEARTBEAT_MESSAGE), timeout=REALTIME_SEND_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"⚠️ Closing slow realtime client for user {subscriber.user_id}")
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+    except Exception:
+        pass  # disconnected
+    finally:
+        receiver.cancel()
+        try:
+            await receiver
+        except BaseException:
+            pass
+
+async def sse_stream(request, subscriber: Subscriber, on_close=None):
+    """Server-Sent Events body: queued events plus comment heartbeats"""
+    try:
+        yield f"retry: {int(REALTIME_RECONNECT_SECONDS * 1000)}\n\n"
+        while not await request.is_disconnected():
+            message = await subscriber.next_message()
+            yield f"data: {message}\n\n" if message else ": ping\n\n"
+    finally:
+        if on_close is not None:
+            on_close(subscriber)
+
+async def fanout_benchmark(subscriber_count: int, event_count: int):
+    """In-process fan-out cost with many idle subscribers (no database needed)"""
+    import tracemalloc
+    tracemalloc.start()
+    hub = RealtimeHub(dsn=None)
+    baseline = tracemalloc.get_traced_memory()[0]
+    subscribers = [hub.subscribe(f"user-{i}") for i in range(subscriber_count)]
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - baseline) / subscriber_count
+    print(f"👥 {subscriber_count} idle subscribers, ~{per_subscriber:.0f} bytes each")
+
+    direct = encode_event("notification", ["user-0"], {"title": "Hello"})
+    started = time.perf_counter()
+    for _ in range(event_count):
+        hub.dispatch(direct)
+    print(f"🎯 Targeted event: {(time.perf_counter() - started) / event_count * 1e6:.1f} µs")
+
+    broadcast = encode_event("notification", [], {"title": "Hello"}, broadcast=True)
+    started = time.perf_counter()
+    for _ in range(min(event_count, REALTIME_QUEUE_SIZE)):
+        hub.dispatch(broadcast)
+    elapsed = (time.perf_counter() - started) / min(event_count, REALTIME_QUEUE_SIZE)
+    print(f"📢 Broadcast event: {elapsed * 1000:.2f} ms for {subscriber_count} subscribers")
+    print(f"📊 {hub.get_stats()}")
+    del subscribers
+
+async def connection_load_test(url: str, token: str, connection_count: int, duration: float):
+    """Hold many idle WebSocket connections open against a running server"""
+    import websockets
+
+    connected = 0
+    failed = 0
+    heartbeats = 0
+
+    async def idle_client():
+        nonlocal connected, failed, heartbeats
+        try:
+            async with websockets.connect(url, subprotocols=["bearer", token], open_timeout=30) as ws:
+                connected += 1
+                deadline = time.monotonic() + duration
+                while time.monotonic() < deadline:
+                    try:
+                        message = await asyncio.wait_for(ws.recv(), timeout=deadline - time.monotonic())
+                    except asyncio.TimeoutError:
+                        break
+                    if json.loads(message).get("type") == "ping":
+                        heartbeats += 1
+        except Exception:
+            failed += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(idle_client() for _ in range(connection_count)))
+    print(f"🔌 {connected}/{connection_count} connected, {failed} failed, "
+          f"{heartbeats} heartbeats in {time.perf_counter() - started:.1f} s")
+
+if __name__ == "__main__":
+    # Usage:
+    #   python realtime.py --fanout [subscribers]                  in-process fan-out benchmark
+    #   python realtime.py --load-test WS_URL TOKEN [N] [SECONDS]   idle connections against a server
+    args = sys.argv[1:]
+    if args[:1] == ["--load-test"] and len(args) >= 3:
+        asyncio.run(connection_load_test(
+            args[1], args[2],
+            int(args[3]) if len(args) > 3 else 2000,
+            float(args[4]) if len(args) > 4 else REALTIME_HEARTBEAT_SECONDS * 2
+        ))
+    else:
+        asyncio.run(fanout_benchmark(int(args[1]) if len(args) > 1 else 5000, 1000))
@@ -0,0 +1,132 @@
+import base64
+import json
+import statistics
+import time
+from typing import Any, List, Optional, Tuple
+
+from jobs import run_cli
+
+# Text search configuration used by the search vector
+SEARCH_CONFIG = "english"
+
+# Weighted document vector matched by /items/search. The item_search migration
+# indexes this exact expression (idx_items_search_vector), so changing it needs
+# a new migration that rebuilds the index.
+SEARCH_VECTOR_SQL = f"""(
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(category, '')), 'B') ||
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(location, '')), 'C') ||
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(comments, '')), 'D')
+)"""
+
+class InvalidSearchCursor(ValueError):
+    pass
+
+def encode_search_cursor(rank: float, item_id: str) -> str:
+    """Opaque relevance cursor from the last row of a page"""
+    raw = json.dumps({"rank": rank, "item_id": item_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_search_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return float(data["rank"]), str(data["item_id"])
+    except Exception:
+        raise InvalidSearchCursor("Invalid cursor")
+
+def build_search_query(
+    text: str,
+    page_size: int,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> Tuple[str, List[Any]]:
+    """Ranked full-text + trigram search over approved items.
+
+    Rows match on the tsvector (name, category, location, comments) or, for
+    typos, on trigram word similarity to the name (the <% operator, tuned by
+    pg_trgm.word_similarity_threshold). Pages are keyset-paginated on
+    (rank, item_id); one extra row is fetched to detect a next page.
+    """
+    params: List[Any] = [text]
+    filters = ""
+    if category:
+        params.append(category)
+        filters += f" AND category = ${len(params)}"
+    if status:
+        params.append(status)
+        filters += f" AND status = ${len(params)}"
+
+    after = ""
+    if cursor:
+        rank, item_id = decode_search_cursor(cursor)
+        params += [rank, item_id]
+        after = f"WHERE (rank, item_id) < (${len(params) - 1}, ${len(params)})"
+
+    params.append(page_size + 1)
+    query = f"""
+        SELECT * FROM (
+            SELECT items.*,
+                   (ts_rank({SEARCH_VECTOR_SQL}, q.query) + word_similarity($1, name))::float8 AS rank
+            FROM items, websearch_to_tsquery('{SEARCH_CONFIG}', $1) AS q(query)
+            WHERE approved = true
+              AND ({SEARCH_VECTOR_SQL} @@ q.query OR $1 <% name)
+              {filters}
+        ) ranked
+        {after}
+        ORDER BY rank DESC, item_id DESC
+        LIMIT ${len(params)}
+    """
+    return query, params
+
+async def search_items(conn, text: str, page_size: int, category: Optional[str] = None,
+                       status: Optional[str] = None, cursor: Optional[str] = None):
+    """Run a search; returns (rows, next_cursor)"""
+    query, params = build_search_query(text, page_size, category, status, cursor)
+    rows = await conn.fetch(query, *params)
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_search_cursor(rows[-1]["rank"], rows[-1]["item_id"])
+
+async def benchmark(conn, item_count: int, runs: int = 20):
+    """Time searches against the old download-everything approach (development databases only)"""
+    import migrations
+    existing = await conn.fetchval("SELECT COUNT(*) FROM items WHERE item_id LIKE 'bench-%'")
+    if existing < item_count:
+        await migrations.seed_benchmark_data(conn, item_count)
+
+    async def timed(label: str, query: str, params: List[Any]):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            rows = await conn.fetch(query, *params)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{label:>32}: median {statistics.median(timings):7.2f} ms, "
+              f"p95 {sorted(timings)[int(runs * 0.95) - 1]:7.2f} ms, {len(rows)} rows")
+
+    await timed("full feed (client-side search)", "SELECT * FROM items WHERE approved = true", [])
+    for text in ("cardboard", "glass containers", "bench item 4242", "cardbaord", "plastik botles"):
+        query, params = build_search_query(text, 20)
+        await timed(f"search '{text}'", query, params)
+
+    query, params = build_search_query("bench item 4242", 20)
+    print("\n📊 Plan for 'bench item 4242':")
+    for row in await conn.fetch(f"EXPLAIN ANALYZE {query}", *params):
+        print(f"   {row[0]}")
+
+async def main(conn, args: List[str]):
+    if "--benchmark" in args:
+        index = args.index("--benchmark")
+        count = int(args[index + 1]) if len(args) > index + 1 else 100000
+        await benchmark(conn, count)
+    elif args:
+        rows, next_cursor = await search_items(conn, " ".join(args), 10)
+        for row in rows:
+            print(f"{row['rank']:.3f}  {row['name']}  ({row['category']}, {row['location']})")
+        print(f"next_cursor: {next_cursor}")
+    else:
+        print("Usage: python search.py <text> | --benchmark [items]")
+
+if __name__ == "__main__":
+    run_cli(main)
@@ -0,0 +1,143 @@
+import json
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Field converters
+def iso_or_none(value):
+    return value.isoformat() if value else None
+
+def iso_or_empty(value):
+    return value.isoformat() if value else ""
+
+def list_or_empty(value):
+    return value or []
+
+# Known converters are inlined into compiled serializers instead of called per field
+_INLINE_CONVERTERS = {
+    iso_or_none: "(_v.isoformat() if (_v := {value}) else None)",
+    iso_or_empty: "(_v.isoformat() if (_v := {value}) else \"\")",
+    list_or_empty: "({value} or [])",
+}
+
+def compile_serializer(
+    model,
+    columns: Optional[Dict[str, str]] = None,
+    converters: Optional[Dict[str, Callable]] = None,
+    extra: Optional[Dict[str, str]] = None
+) -> Callable[[Any], Dict[str, Any]]:
+    """Build a row -> dict function for a response model's fields.
+
+    The field plan is compiled once into a function returning a single dict
+    literal, which is as fast as the hand-written dicts it replaces.
+
+    model: pydantic model (or iterable of field names) defining the output keys
+    columns: output key -> source column, when they differ
+    converters: output key -> function applied to the column value
+    extra: additional output key -> source column (e.g. legacy aliases)
+    """
+    columns = columns or {}
+    converters = converters or {}
+    field_names: Iterable[str] = getattr(model, "model_fields", model)
+
+    plan = [(name, columns.get(name, name)) for name in field_names]
+    plan += list((extra or {}).items())
+
+    namespace: Dict[str, Any] = {}
+    entries = []
+    for index, (key, column) in enumerate(plan):
+        value = f"row[{column!r}]"
+        convert = converters.get(key)
+        if convert in _INLINE_CONVERTERS:
+            value = _INLINE_CONVERTERS[convert].format(value=value)
+        elif convert is not None:
+            namespace[f"_convert{index}"] = convert
+            value = f"_convert{index}({value})"
+        entries.append(f"{key!r}: {value}")
+
+    source = "def serialize(row):\n    return {" + ", ".join(entries) + "}\n"
+    exec(source, namespace)
+    serialize = namespace["serialize"]
+    serialize.fields = tuple(key for key, _ in plan)
+    return serialize
+
+def dumps(content: Any) -> bytes:
+    """Encode already-serialized content to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+class FastJSONResponse(Response):
+    """JSON response for payloads built by compiled serializers.
+
+    Returning a Response from an endpoint bypasses FastAPI's jsonable_encoder;
+    content is encoded with orjson when installed.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content  # pre-rendered (e.g. from a cache)
+        return dumps(content)
+
+if __name__ == "__main__":
+    # Micro-benchmark: python serializers.py
+    fields = ["item_id", "name", "quantity", "category", "location", "owner_id", "owner_name",
+              "owner_email", "expiry_date", "duration_days", "comments", "contact_info",
+              "image_urls", "status", "created_at", "approved", "claimed_by", "claimant_email",
+              "claim_expires_at"]
+    now = datetime.utcnow()
+    rows = [{
+        "item_id": f"item-{i}", "name": f"Item {i}", "quantity": i % 10, "category": "Cardboard",
+        "location": "Main Building", "owner_id": "owner", "owner_name": "Owner", "owner_email": "o@example.com",
+        "expiry_date": now, "duration_days": 7, "comments": "Benchmark row", "contact_info": "09171234567",
+        "image_urls": ["https://example.com/a.jpg"], "status": "available", "created_at": now,
+        "approved": True, "claimed_by": None, "claimant_email": None, "claim_expires_at": None
+    } for i in range(10000)]
+
+    serialize = compile_serializer(
+        fields,
+        converters={"expiry_date": iso_or_none, "created_at": iso_or_empty,
+                    "claim_expires_at": iso_or_none, "image_urls": list_or_empty},
+        extra={"images": "image_urls"}
+    )
+
+    def hand_built(row):
+        return {
+            "item_id": row["item_id"], "name": row["name"], "quantity": row["quantity"],
+            "category": row["category"], "location": row["location"], "owner_id": row["owner_id"],
+            "owner_name": row["owner_name"], "owner_email": row["owner_email"],
+            "expiry_date": row["expiry_date"].isoformat() if row["expiry_date"] else None,
+            "duration_days": row["duration_days"], "comments": row["comments"],
+            "contact_info": row["contact_info"], "image_urls": row["image_urls"] or [],
+            "images": row["image_urls"] or [], "status": row["status"],
+            "created_at": row["created_at"].isoformat() if row["created_at"] else "",
+            "approved": row["approved"], "claimed_by": row["claimed_by"],
+            "claimant_email": row["claimant_email"],
+            "claim_expires_at": row["claim_expires_at"].isoformat() if row["claim_expires_at"] else None
+        }
+
+    for label, func in (("hand-built dict", hand_built), ("compiled serializer", serialize)):
+        started = time.perf_counter()
+        payload = [func(row) for row in rows]
+        built = time.perf_counter()
+        body = dumps(payload)
+        done = time.perf_counter()
+        print(f"{label:>20}: build {(built - started) * 1000:7.2f} ms, "
+              f"encode {(done - built) * 1000:7.2f} ms, {len(body)} bytes")
+    print(f"encoder: {'orjson' if orjson else 'json'}")
+
+    try:
+        from fastapi.encoders import jsonable_encoder
+        payload = [hand_built(row) for row in rows]
+        started = time.perf_counter()
+        json.dumps(jsonable_encoder(payload)).encode("utf-8")
+        print(f"{'previous path':>20}: jsonable_encoder + json.dumps {(time.perf_counter() - started) * 1000:7.2f} ms")
+    except ImportError:
+        pass
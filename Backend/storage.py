@@ -0,0 +1,267 @@
+import asyncio
+import functools
+import mimetypes
+import os
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from fastapi.staticfiles import StaticFiles
+import aiofiles
+import aiofiles.os
+
+from images import image_variants, render_variants
+
+load_dotenv()
+
+# Local disk settings
+LOCAL_UPLOAD_DIR = os.getenv("LOCAL_UPLOAD_DIR", "uploads")
+LOCAL_UPLOAD_MOUNT = "/uploads"
+# Prefix for returned URLs; set to the API's public origin + /uploads when the frontend is on another domain
+LOCAL_UPLOAD_BASE_URL = os.getenv("LOCAL_UPLOAD_BASE_URL", LOCAL_UPLOAD_MOUNT)
+
+# S3-compatible settings (AWS, MinIO, R2, ...)
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_REGION = os.getenv("S3_REGION")
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL")
+
+# Uploaded files get unique names, so they can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class StorageBackend(ABC):
+    """Where uploaded images live. save() returns {"url", "public_id"}."""
+    name = "base"
+
+    def __init__(self, executor: Optional[Executor] = None):
+        # Executor for SDKs without async APIs and image resizing (None = loop default)
+        self.executor = executor
+
+    async def run_sync(self, func, *args, **kwargs):
+        """Run a blocking provider call off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    @abstractmethod
+    async def save(self, content: bytes, filename: str, content_type: Optional[str], folder: str) -> Dict[str, Any]:
+        """Store an uploaded image (and any variants the backend keeps)"""
+
+    @abstractmethod
+    async def delete(self, public_id: str):
+        """Remove an image saved by this backend"""
+
+    @abstractmethod
+    def variants(self, image_urls: List[str]) -> Dict[str, List[str]]:
+        """Thumbnail/medium URLs for each full-size image URL"""
+
+    @staticmethod
+    def unique_name(filename: str, content_type: Optional[str]) -> str:
+        extension = os.path.splitext(filename or "")[1].lower()
+        if not extension and content_type:
+            extension = mimetypes.guess_extension(content_type) or ""
+        return f"{uuid.uuid4().hex}{extension}"
+
+class SelfHostedStorage(StorageBackend):
+    """Backends without a resizing CDN: variants are rendered at upload time and stored beside the original"""
+
+    # (variant, suffix) - "items/abc.png" gets "items/abc_thumb.jpg" and "items/abc_medium.jpg"
+    VARIANTS = (("thumbnail", "_thumb.jpg"), ("medium", "_medium.jpg"))
+
+    @property
+    @abstractmethod
+    def base_url(self) -> str:
+        """Public URL prefix; an object's URL is base_url/public_id"""
+
+    @abstractmethod
+    async def put(self, key: str, content: bytes, content_type: str):
+        """Write one object"""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        """Read one object"""
+
+    @abstractmethod
+    async def remove(self, key: str):
+        """Delete one object (missing objects are ignored)"""
+
+    @classmethod
+    def variant_key(cls, key: str, variant: str) -> str:
+        suffix = dict(cls.VARIANTS)[variant]
+        return f"{os.path.splitext(key)[0]}{suffix}"
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        prefix = f"{self.base_url}/"
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+    async def render(self, content: bytes) -> Dict[str, bytes]:
+        """Variant bytes, or the original bytes if it can't be decoded as an image"""
+        try:
+            return await self.run_sync(render_variants, content)
+        except Exception as e:
+            print(f"⚠️ Could not resize image, storing the original as its variants: {e}")
+            return {variant: content for variant, _ in self.VARIANTS}
+
+    async def store_variants(self, key: str, content: bytes):
+        rendered = await self.render(content)
+        await asyncio.gather(*(
+            self.put(self.variant_key(key, variant), rendered[variant], "image/jpeg")
+            for variant, _ in self.VARIANTS
+        ))
+
+    async def render_stored_variants(self, url: str):
+        """Render variants for an image uploaded before they existed (used by the backfill)"""
+        key = self.key_for_url(url)
+        if key is None:
+            raise ValueError(f"{url} is not stored by the {self.name} backend")
+        await self.store_variants(key, await self.get(key))
+
+    async def save(self, content, filename, content_type, folder):
+        key = f"{folder}/{self.unique_name(filename, content_type)}"
+        await self.put(key, content, content_type or "application/octet-stream")
+        try:
+            await self.store_variants(key, content)
+        except Exception:
+            await self.delete(key)
+            raise
+        return {"url": f"{self.base_url}/{key}", "public_id": key}
+
+    async def delete(self, public_id):
+        await asyncio.gather(
+            self.remove(public_id),
+            *(self.remove(self.variant_key(public_id, variant)) for variant, _ in self.VARIANTS)
+        )
+
+    def variants(self, image_urls):
+        result = {"thumbnail_urls": [], "medium_urls": []}
+        for url in image_urls:
+            key = self.key_for_url(url)
+            for variant, _ in self.VARIANTS:
+                variant_url = f"{self.base_url}/{self.variant_key(key, variant)}" if key else url
+                result[f"{variant}_urls"].append(variant_url)
+        return result
+
+class CloudinaryStorage(StorageBackend):
+    name = "cloudinary"
+
+    def __init__(self, executor: Optional[Executor] = None):
+        super().__init__(executor)
+        import cloudinary
+        import cloudinary.uploader
+        self.uploader = cloudinary.uploader
+
+        cloudinary.config(
+            cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+            api_key=os.getenv("CLOUDINARY_API_KEY"),
+            api_secret=os.getenv("CLOUDINARY_API_SECRET")
+        )
+        if os.getenv("CLOUDINARY_UPLOAD_PREFIX"):
+            # Point uploads at another API host (e.g. a local stand-in server for testing)
+            cloudinary.config(upload_prefix=os.getenv("CLOUDINARY_UPLOAD_PREFIX"))
+
+    async def save(self, content, filename, content_type, folder):
+        # The SDK's module-level urllib3 pool keeps provider connections alive between uploads
+        result = await self.run_sync(
+            self.uploader.upload,
+            content,
+            folder=folder,
+            resource_type="auto",
+            format="jpg",
+            quality="auto",
+            fetch_format="auto"
+        )
+        return {"url": result.get("secure_url"), "public_id": result.get("public_id")}
+
+    async def delete(self, public_id):
+        await self.run_sync(self.uploader.destroy, public_id)
+
+    def variants(self, image_urls):
+        return image_variants(image_urls)
+
+class LocalStorage(SelfHostedStorage):
+    name = "local"
+    base_url = LOCAL_UPLOAD_BASE_URL.rstrip("/")
+
+    def __init__(self, executor: Optional[Executor] = None):
+        super().__init__(executor)
+        self.root = os.path.abspath(LOCAL_UPLOAD_DIR)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid upload key: {key}")
+        return path
+
+    async def put(self, key, content, content_type):
+        path = self._path(key)
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        async with aiofiles.open(path, "wb") as output:
+            await output.write(content)
+
+    async def get(self, key):
+        async with aiofiles.open(self._path(key), "rb") as source:
+            return await source.read()
+
+    async def remove(self, key):
+        path = self._path(key)
+        if await aiofiles.os.path.exists(path):
+            await aiofiles.os.remove(path)
+
+class S3Storage(SelfHostedStorage):
+    name = "s3"
+
+    def __init__(self, executor: Optional[Executor] = None):
+        super().__init__(executor)
+        if not S3_BUCKET:
+            raise ValueError("S3_BUCKET is required for the s3 upload provider")
+        import boto3
+        # boto3 clients are thread-safe and pool their HTTP connections
+        self.client = boto3.client("s3", endpoint_url=S3_ENDPOINT_URL, region_name=S3_REGION)
+        if S3_PUBLIC_URL:
+            self._base_url = S3_PUBLIC_URL.rstrip("/")
+        elif S3_ENDPOINT_URL:
+            self._base_url = f"{S3_ENDPOINT_URL.rstrip('/')}/{S3_BUCKET}"
+        else:
+            self._base_url = f"https://{S3_BUCKET}.s3.amazonaws.com"
+
+    @property
+    def base_url(self):
+        return self._base_url
+
+    async def put(self, key, content, content_type):
+        await self.run_sync(
+            self.client.put_object,
+            Bucket=S3_BUCKET,
+            Key=key,
+            Body=content,
+            ContentType=content_type,
+            CacheControl=IMMUTABLE_CACHE_CONTROL
+        )
+
+    async def get(self, key):
+        response = await self.run_sync(self.client.get_object, Bucket=S3_BUCKET, Key=key)
+        return await self.run_sync(response["Body"].read)
+
+    async def remove(self, key):
+        await self.run_sync(self.client.delete_object, Bucket=S3_BUCKET, Key=key)
+
+STORAGE_BACKENDS = {
+    backend.name: backend for backend in (CloudinaryStorage, LocalStorage, S3Storage)
+}
+
+def get_storage_backend(provider: str, executor: Optional[Executor] = None) -> StorageBackend:
+    """Create the backend selected by UPLOAD_PROVIDER"""
+    backend = STORAGE_BACKENDS.get(provider.lower())
+    if backend is None:
+        raise ValueError(f"Unknown UPLOAD_PROVIDER '{provider}' (expected one of: {', '.join(STORAGE_BACKENDS)})")
+    return backend(executor)
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with long-lived cache headers for immutable uploads"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
@@ -0,0 +1,169 @@
+import asyncio
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set
+
+# Stand-in Cloudinary API: each upload takes UPLOAD_DELAY seconds, and the
+# upload arriving as number fail_at (1-based) gets a 500 back
+UPLOAD_DELAY = 0.3  # seconds
+
+class StandInState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fail_at: Optional[int] = None
+        self.arrivals = 0
+        self.active = 0
+        self.max_active = 0
+        self.stored: Set[str] = set()
+        self.deleted: List[str] = []
+
+    def reset(self, fail_at: Optional[int] = None):
+        with self.lock:
+            self.fail_at = fail_at
+            self.arrivals = 0
+            self.active = 0
+            self.max_active = 0
+            self.stored.clear()
+            self.deleted.clear()
+
+state = StandInState()
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers the two Cloudinary calls the app makes: <cloud>/auto/upload and <cloud>/image/destroy"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/upload"):
+            self._upload()
+        elif self.path.endswith("/destroy"):
+            self._destroy(body)
+        else:
+            self._reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _upload(self):
+        with state.lock:
+            state.arrivals += 1
+            arrival = state.arrivals
+            state.active += 1
+            state.max_active = max(state.max_active, state.active)
+        try:
+            time.sleep(UPLOAD_DELAY)
+            if arrival == state.fail_at:
+                self._reply(500, {"error": {"message": f"Simulated failure on upload {arrival}"}})
+                return
+            public_id = f"greenhouse_items/{uuid.uuid4().hex}"
+            with state.lock:
+                state.stored.add(public_id)
+            self._reply(200, {
+                "public_id": public_id,
+                "secure_url": f"https://res.cloudinary.com/demo/image/upload/{public_id}.jpg"
+            })
+        finally:
+            with state.lock:
+                state.active -= 1
+
+    def _destroy(self, body: bytes):
+        match = re.search(rb'name="public_id"\r\n\r\n([^\r]*)\r\n', body) or re.search(rb"public_id=([^&]*)", body)
+        public_id = match.group(1).decode() if match else ""
+        with state.lock:
+            state.deleted.append(public_id)
+            state.stored.discard(public_id)
+        self._reply(200, {"result": "ok"})
+
+    def _reply(self, status: int, payload: Dict[str, Any]):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def start_stand_in() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def fake_images(count: int) -> list:
+    from fastapi import UploadFile
+    from starlette.datastructures import Headers
+    images = []
+    for i in range(count):
+        content = b"\xff\xd8\xff" + os.urandom(2048)
+        images.append(UploadFile(
+            file=io.BytesIO(content),
+            filename=f"image-{i + 1}.jpg",
+            size=len(content),
+            headers=Headers({"content-type": "image/jpeg"})
+        ))
+    return images
+
+async def run_checks(image_count: int, fail_at: int) -> bool:
+    import main
+
+    per_request = main.UPLOAD_CONCURRENCY_PER_REQUEST
+    global_limit = main.UPLOAD_CONCURRENCY_GLOBAL
+    ok = True
+
+    def check(passed: bool, message: str):
+        nonlocal ok
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} {message}")
+
+    # 1. One request uploads in parallel, up to the per-request limit
+    state.reset()
+    started = time.perf_counter()
+    results = await main.upload_images(fake_images(image_count), "greenhouse_items")
+    elapsed = time.perf_counter() - started
+    expected_parallel = min(per_request, global_limit, image_count)
+    sequential = image_count * UPLOAD_DELAY
+    check(len(results) == image_count and len(state.stored) == image_count,
+          f"{image_count} images uploaded in {elapsed:.2f}s (one at a time would take {sequential:.2f}s)")
+    check(state.max_active == expected_parallel,
+          f"per-request limit: {state.max_active} concurrent uploads (expected {expected_parallel})")
+
+    # 2. Several requests together stay under the global limit
+    state.reset()
+    await asyncio.gather(*(main.upload_images(fake_images(image_count), "greenhouse_items") for _ in range(3)))
+    check(state.max_active <= global_limit,
+          f"global limit: {state.max_active} concurrent uploads across 3 requests (limit {global_limit})")
+
+    # 3. A failed image removes the ones that already succeeded
+    state.reset(fail_at=fail_at)
+    try:
+        await main.upload_images(fake_images(image_count), "greenhouse_items")
+        check(False, f"upload {fail_at} failed but upload_images did not raise")
+    except ValueError as e:
+        check(True, f"upload {fail_at} failed and upload_images raised: {e}")
+    check(not state.stored and len(state.deleted) == image_count - 1,
+          f"cleanup: {len(state.deleted)} uploaded image(s) deleted, {len(state.stored)} left behind")
+    return ok
+
+if __name__ == "__main__":
+    # Usage: python upload_check.py [images] [fail_at]
+    # Runs main.upload_images against a local stand-in for the Cloudinary API
+    # (no credentials or network needed) and exits non-zero if a check fails.
+    args = sys.argv[1:]
+    image_count = int(args[0]) if args else 6
+    fail_at = int(args[1]) if len(args) > 1 else 3
+
+    server = start_stand_in()
+    os.environ["UPLOAD_PROVIDER"] = "cloudinary"
+    os.environ["CLOUDINARY_CLOUD_NAME"] = "demo"
+    os.environ["CLOUDINARY_API_KEY"] = "key"
+    os.environ["CLOUDINARY_API_SECRET"] = "secret"
+    os.environ["CLOUDINARY_UPLOAD_PREFIX"] = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        passed = asyncio.run(run_checks(image_count, fail_at))
+    finally:
+        server.shutdown()
+    sys.exit(0 if passed else 1)